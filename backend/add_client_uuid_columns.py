@@ -0,0 +1,30 @@
+"""
+Migration script to add client_uuid columns and their unique
+(user_id, client_uuid) indexes to workouts, nutrition_logs and body_stats
+Run this script once to update the database schema
+"""
+import sqlite3
+
+# Connect to the database
+conn = sqlite3.connect('lifelog.db')
+cursor = conn.cursor()
+
+for table in ("workouts", "nutrition_logs", "body_stats"):
+    try:
+        cursor.execute(f'''
+            ALTER TABLE {table} ADD COLUMN client_uuid VARCHAR;
+        ''')
+        print(f"[OK] Added client_uuid column to {table}")
+    except sqlite3.OperationalError as e:
+        print(f"[SKIP] {table}.client_uuid column: {e}")
+
+    cursor.execute(f'''
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_{table}_user_id_client_uuid
+        ON {table} (user_id, client_uuid);
+    ''')
+    print(f"[OK] Ensured ux_{table}_user_id_client_uuid index")
+
+conn.commit()
+conn.close()
+
+print("\n[DONE] Migration complete!")
@@ -0,0 +1,33 @@
+"""
+Migration script for the server-side exercise library.
+Creates the exercise_catalog table and loads data/exercise_catalog.json
+(or the JSON file given) into it, adding new exercises and updating
+changed ones by slug. Safe to run more than once; run it again after
+editing the catalog file.
+
+Usage: python add_exercise_catalog.py [catalog.json]
+"""
+import json
+import sys
+
+from app.db import engine, SessionLocal
+from app.exercise_catalog import CATALOG_SEED_PATH, seed_exercise_catalog
+from app.models import ExerciseCatalog
+
+path = sys.argv[1] if len(sys.argv) > 1 else CATALOG_SEED_PATH
+
+ExerciseCatalog.__table__.create(bind=engine, checkfirst=True)
+print("[OK] exercise_catalog table ready")
+
+with open(path, encoding="utf-8") as catalog_file:
+    entries = json.load(catalog_file)
+
+db = SessionLocal()
+try:
+    added, updated = seed_exercise_catalog(db, entries)
+    db.commit()
+    print(f"[OK] Added {added} and updated {updated} of {len(entries)} exercises from {path}")
+finally:
+    db.close()
+
+print("\n[DONE] Migration complete!")
@@ -0,0 +1,29 @@
+"""
+Migration script for the food catalog.
+Creates the foods table with its (name, brand, unit) index and adds
+nutrition_logs.food_id. Safe to run more than once; load the catalog
+itself with load_foods.py.
+
+Usage: python add_food_catalog.py
+"""
+from sqlalchemy import inspect
+
+from app.db import engine
+from app.models import Food
+
+Food.__table__.create(bind=engine, checkfirst=True)
+print("[OK] foods table ready")
+
+for index in Food.__table__.indexes:
+    index.create(bind=engine, checkfirst=True)
+    print(f"[OK] Ensured {index.name} on foods")
+
+with engine.begin() as connection:
+    columns = {column["name"] for column in inspect(connection).get_columns("nutrition_logs")}
+    if "food_id" not in columns:
+        connection.exec_driver_sql("ALTER TABLE nutrition_logs ADD COLUMN food_id INTEGER REFERENCES foods(id)")
+        print("[OK] Added food_id column to nutrition_logs")
+    else:
+        print("[SKIP] nutrition_logs.food_id column already exists")
+
+print("\n[DONE] Migration complete!")
@@ -0,0 +1,29 @@
+"""
+Migration script to add composite (user_id, date) indexes to the log tables
+and the exercises.workout_id index
+Run this script once to update the database schema
+"""
+from app.db import engine
+from app.models import Workout, Exercise, NutritionLog, BodyStat
+
+# Only the indexes this migration introduced; the client_uuid and
+# personal-record indexes need columns their own migrations add
+INDEX_NAMES = {
+    "ix_workouts_user_id_date",
+    "ix_nutrition_logs_user_id_date",
+    "ix_body_stats_user_id_date",
+    "ix_exercises_workout_id",
+}
+
+for model in (Workout, Exercise, NutritionLog, BodyStat):
+    for index in model.__table__.indexes:
+        if index.name not in INDEX_NAMES:
+            continue
+        index.create(bind=engine, checkfirst=True)
+        print(f"[OK] Ensured {index.name} on {model.__tablename__}")
+
+with engine.begin() as connection:
+    # Refresh planner statistics so the new indexes are picked up
+    connection.exec_driver_sql("ANALYZE")
+
+print("\n[DONE] Migration complete!")
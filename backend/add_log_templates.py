@@ -0,0 +1,16 @@
+"""
+Migration script for saved meal and routine templates.
+Creates the meal_templates, meal_template_items, routine_templates and
+routine_template_exercises tables used by /api/logs/templates. Safe to
+run more than once.
+
+Usage: python add_log_templates.py
+"""
+from app.db import engine
+from app.models import MealTemplate, MealTemplateItem, RoutineTemplate, RoutineTemplateExercise
+
+for model in (MealTemplate, MealTemplateItem, RoutineTemplate, RoutineTemplateExercise):
+    model.__table__.create(bind=engine, checkfirst=True)
+    print(f"[OK] {model.__tablename__} table ready")
+
+print("\n[DONE] Migration complete!")
@@ -0,0 +1,45 @@
+"""
+Migration script for exercise progress tracking.
+Adds exercises.user_id (backfilled from the parent workout) with its
+(user_id, name) index, creates the personal_records table and builds every
+user's records from the existing exercise history. Safe to run more than once.
+
+Usage: python add_personal_records.py
+"""
+from sqlalchemy import inspect
+
+from app.db import engine, SessionLocal
+from app.models import Exercise, PersonalRecord
+from app.records import rebuild_personal_records
+
+with engine.begin() as connection:
+    columns = {column["name"] for column in inspect(connection).get_columns("exercises")}
+    if "user_id" not in columns:
+        connection.exec_driver_sql("ALTER TABLE exercises ADD COLUMN user_id INTEGER REFERENCES users(id)")
+        print("[OK] Added user_id column to exercises")
+    else:
+        print("[SKIP] exercises.user_id column already exists")
+
+    result = connection.exec_driver_sql(
+        "UPDATE exercises SET user_id = "
+        "(SELECT workouts.user_id FROM workouts WHERE workouts.id = exercises.workout_id) "
+        "WHERE user_id IS NULL"
+    )
+    print(f"[OK] Backfilled user_id on {result.rowcount} exercises")
+
+for index in Exercise.__table__.indexes:
+    index.create(bind=engine, checkfirst=True)
+    print(f"[OK] Ensured {index.name} on exercises")
+
+PersonalRecord.__table__.create(bind=engine, checkfirst=True)
+print("[OK] personal_records table ready")
+
+db = SessionLocal()
+try:
+    row_count = rebuild_personal_records(db)
+    db.commit()
+    print(f"[OK] Rebuilt {row_count} personal records")
+finally:
+    db.close()
+
+print("\n[DONE] Migration complete!")
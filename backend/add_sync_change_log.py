@@ -0,0 +1,53 @@
+"""
+Migration script to add updated_at columns to the log tables and create the
+sync_changes log used by GET /api/sync/changes
+Existing rows are seeded as UPSERT changes so a fresh device can pull its
+full history from cursor 0
+Run this script once to update the database schema
+"""
+import sqlite3
+
+from app.db import engine
+from app.models import SyncChange
+
+TABLES = {
+    "workouts": "workouts",
+    "nutrition_logs": "nutrition",
+    "body_stats": "body_stats",
+}
+
+SyncChange.__table__.create(bind=engine, checkfirst=True)
+print("[OK] sync_changes table ready")
+
+# Connect to the database
+conn = sqlite3.connect('lifelog.db')
+cursor = conn.cursor()
+
+for table, feed_name in TABLES.items():
+    try:
+        # SQLite cannot add a column with a CURRENT_TIMESTAMP default
+        cursor.execute(f'''
+            ALTER TABLE {table} ADD COLUMN updated_at DATETIME;
+        ''')
+        cursor.execute(f'''
+            UPDATE {table} SET updated_at = created_at;
+        ''')
+        print(f"[OK] Added updated_at column to {table}")
+    except sqlite3.OperationalError as e:
+        print(f"[SKIP] {table}.updated_at column: {e}")
+
+    cursor.execute(f'''
+        INSERT INTO sync_changes (user_id, table_name, record_id, client_uuid, operation)
+        SELECT t.user_id, '{feed_name}', t.id, t.client_uuid, 'UPSERT'
+        FROM {table} t
+        WHERE NOT EXISTS (
+            SELECT 1 FROM sync_changes c
+            WHERE c.user_id = t.user_id AND c.table_name = '{feed_name}' AND c.record_id = t.id
+        );
+    ''')
+    print(f"[OK] Seeded {cursor.rowcount} {feed_name} changes")
+
+conn.commit()
+conn.close()
+
+print("\n[DONE] Migration complete!")
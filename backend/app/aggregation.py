@@ -0,0 +1,242 @@
+"""
+Range aggregation helpers shared by the analytics and summary routes.
+
+Every helper here reads the precomputed daily_rollups rows for a window with
+a fixed number of queries, so the cost of a request grows with the number of
+days in the window rather than with the size of the raw log tables.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Date
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.functions import GenericFunction
+
+from .models import DailyRollup
+from .schemas import DailySummary, WeeklySummary
+from .streaks import get_streak_status
+
+
+def day_start(day: date) -> datetime:
+    """Return midnight at the start of the given day"""
+    return datetime.combine(day, time.min)
+
+
+def day_bounds(start_date: date, end_date: date) -> Tuple[datetime, datetime]:
+    """
+    Return half-open datetime bounds covering start_date..end_date inclusive.
+
+    Filtering with `column >= start AND column < end` keeps the predicate
+    sargable, so SQLite can serve it from the (user_id, date) indexes.
+    """
+    return day_start(start_date), day_start(end_date + timedelta(days=1))
+
+
+class calendar_day(GenericFunction):
+    """
+    Calendar day of a DATETIME column, usable in GROUP BY.
+
+    Compiles to date(x) on SQLite, which stores datetimes as text, and to a
+    plain CAST(x AS DATE) everywhere else.
+    """
+    type = Date()
+    inherit_cache = True
+
+
+@compiles(calendar_day)
+def _compile_calendar_day(element, compiler, **kw):
+    return "CAST(%s AS DATE)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(calendar_day, "sqlite")
+def _compile_calendar_day_sqlite(element, compiler, **kw):
+    return "date(%s)" % compiler.process(element.clauses, **kw)
+
+
+def rollup_to_summary(
+    day: date,
+    rollup: Optional[DailyRollup],
+    weight: Optional[float] = None
+) -> DailySummary:
+    """Convert a rollup row (or its absence) into a DailySummary"""
+    if not rollup:
+        return DailySummary(
+            date=day.isoformat(),
+            total_calories=0,
+            total_protein=0.0,
+            total_carbs=0.0,
+            total_fat=0.0,
+            workout_count=0,
+            total_workout_duration=0,
+            weight=weight
+        )
+
+    return DailySummary(
+        date=day.isoformat(),
+        total_calories=int(rollup.total_calories or 0),
+        total_protein=float(rollup.total_protein or 0),
+        total_carbs=float(rollup.total_carbs or 0),
+        total_fat=float(rollup.total_fat or 0),
+        workout_count=int(rollup.workout_count or 0),
+        total_workout_duration=int(rollup.total_workout_duration or 0),
+        weight=weight
+    )
+
+
+def get_daily_range(
+    db: Session,
+    user_id: int,
+    start_date: date,
+    end_date: date
+) -> List[DailySummary]:
+    """
+    Build one DailySummary per day between start_date and end_date (inclusive).
+
+    Reads the precomputed daily_rollups rows for the window and carries the
+    latest known weight forward onto days without a weigh-in.
+    """
+    rollup_by_day, previous_weight = _load_rollups(db, user_id, start_date, end_date)
+    return _summarize_days(start_date, end_date, rollup_by_day, previous_weight)
+
+
+def _load_rollups(
+    db: Session,
+    user_id: int,
+    start_date: date,
+    end_date: date
+) -> Tuple[Dict[date, DailyRollup], Optional[float]]:
+    """The window's rollups by day and the last weigh-in before the window"""
+    rollups = db.query(DailyRollup).filter(
+        DailyRollup.user_id == user_id,
+        DailyRollup.day >= start_date,
+        DailyRollup.day <= end_date
+    ).all()
+
+    previous_weight = db.query(DailyRollup.weight).filter(
+        DailyRollup.user_id == user_id,
+        DailyRollup.day < start_date,
+        DailyRollup.weight.isnot(None)
+    ).order_by(DailyRollup.day.desc()).first()
+    return {rollup.day: rollup for rollup in rollups}, previous_weight.weight if previous_weight else None
+
+
+def _summarize_days(
+    start_date: date,
+    end_date: date,
+    rollup_by_day: Dict[date, DailyRollup],
+    current_weight: Optional[float]
+) -> List[DailySummary]:
+    summaries = []
+    current_date = start_date
+    while current_date <= end_date:
+        rollup = rollup_by_day.get(current_date)
+        if rollup and rollup.weight is not None:
+            current_weight = rollup.weight
+
+        summaries.append(rollup_to_summary(current_date, rollup, current_weight))
+        current_date += timedelta(days=1)
+
+    return summaries
+
+
+def get_week_summary(db: Session, user_id: int, week_start: date) -> WeeklySummary:
+    """Summarise the seven days starting at week_start from the rollup table"""
+    week_end = week_start + timedelta(days=6)
+    return summarize_week(week_start, get_daily_range(db, user_id, week_start, week_end))
+
+
+def summarize_week(week_start: date, daily_summaries: List[DailySummary]) -> WeeklySummary:
+    """Build a WeeklySummary from the seven DailySummary rows of the week"""
+    week_end = week_start + timedelta(days=6)
+    total_calories = sum(day.total_calories for day in daily_summaries)
+    total_protein = sum(day.total_protein for day in daily_summaries)
+
+    start_weight = daily_summaries[0].weight
+    end_weight = daily_summaries[-1].weight
+    weight_change = None
+    if start_weight is not None and end_weight is not None:
+        weight_change = end_weight - start_weight
+
+    return WeeklySummary(
+        week_start=week_start.isoformat(),
+        week_end=week_end.isoformat(),
+        avg_daily_calories=total_calories / len(daily_summaries),
+        avg_daily_protein=total_protein / len(daily_summaries),
+        total_workouts=sum(day.workout_count for day in daily_summaries),
+        total_workout_duration=sum(day.total_workout_duration for day in daily_summaries),
+        weight_change=weight_change
+    )
+
+
+def summarize_progress(
+    user_id: int,
+    start_date: date,
+    end_date: date,
+    daily_summaries: List[DailySummary]
+) -> Dict[str, Any]:
+    """Calorie and weight trends over the daily summaries of a window"""
+    calories_trend = []
+    weight_trend = []
+
+    for summary in daily_summaries:
+        calories_trend.append(summary.total_calories)
+        if summary.weight:
+            weight_trend.append(summary.weight)
+
+    return {
+        "user_id": user_id,
+        "period_days": len(daily_summaries),
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "daily_summaries": daily_summaries,
+        "calories_trend": calories_trend,
+        "weight_trend": weight_trend,
+        "avg_daily_calories": sum(calories_trend) / len(calories_trend) if calories_trend else 0,
+        "weight_change": weight_trend[-1] - weight_trend[0] if len(weight_trend) > 1 else 0
+    }
+
+
+def get_dashboard(
+    db: Session,
+    user_id: int,
+    target_date: date,
+    week_start: date,
+    days: int
+) -> Dict[str, Any]:
+    """
+    Daily, weekly, progress and streak figures for one dashboard load.
+
+    The day, its week and the progress window ending on the day are all
+    sliced from a single read of the rollups over their union, and the
+    streak comes from the persisted user_streaks row, so the whole dashboard
+    costs three queries. The week and progress figures carry the last
+    weigh-in forward like their routes do; the day's weight is only its own
+    weigh-in, as on /analytics/daily.
+    """
+    week_end = week_start + timedelta(days=6)
+    progress_start = target_date - timedelta(days=days - 1)
+    window_start = min(target_date, week_start, progress_start)
+    window_end = max(target_date, week_end)
+
+    rollup_by_day, previous_weight = _load_rollups(db, user_id, window_start, window_end)
+    summaries = _summarize_days(window_start, window_end, rollup_by_day, previous_weight)
+    day_rollup = rollup_by_day.get(target_date)
+
+    def window(start: date, end: date) -> List[DailySummary]:
+        return summaries[(start - window_start).days:(end - window_start).days + 1]
+
+    current_streak, longest_streak, last_active_day = get_streak_status(db, user_id, target_date)
+
+    return {
+        "user_id": user_id,
+        "date": target_date.isoformat(),
+        "daily": rollup_to_summary(target_date, day_rollup, day_rollup.weight if day_rollup else None),
+        "weekly": summarize_week(week_start, window(week_start, week_end)),
+        "progress": summarize_progress(user_id, progress_start, target_date, window(progress_start, target_date)),
+        "streak": {
+            "current_streak": current_streak,
+            "longest_streak": longest_streak,
+            "last_active_date": last_active_day.isoformat() if last_active_day else None
+        }
+    }
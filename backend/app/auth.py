@@ -0,0 +1,163 @@
+"""
+Signed access tokens and the shared user dependency.
+
+Login issues an HS256 JWT whose subject is the user id. Routes resolve
+their user through get_current_user_id(), which verifies the token and
+checks the user still exists. That check goes through a small TTL/LRU cache
+of active users, so the database is only asked once per user per TTL.
+"""
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import get_db
+from app.models import User
+
+logger = logging.getLogger(__name__)
+
+# Signing key, which must be the same for every worker and across restarts
+JWT_SECRET = os.getenv("LIFELOG_JWT_SECRET", "")
+# Used when LIFELOG_JWT_SECRET is unset; public, so only fit for development
+DEV_JWT_SECRET = "lifelog-development-only-jwt-secret"
+JWT_ALGORITHM = "HS256"
+ACCESS_TOKEN_TTL_MINUTES = int(os.getenv("LIFELOG_ACCESS_TOKEN_TTL_MINUTES", str(7 * 24 * 60)))
+
+# When false, requests without a bearer token may still identify the user
+# with the user_id query parameter (clients from before signed tokens)
+AUTH_REQUIRED = os.getenv("LIFELOG_AUTH_REQUIRED", "false").lower() in ("1", "true", "yes")
+
+if not JWT_SECRET:
+    if AUTH_REQUIRED:
+        raise RuntimeError(
+            "LIFELOG_AUTH_REQUIRED is set but LIFELOG_JWT_SECRET is not; "
+            "set it to a long random value shared by every worker"
+        )
+    logger.warning(
+        "LIFELOG_JWT_SECRET is not set; signing tokens with the built-in development key. "
+        "Anyone can forge tokens with it: set LIFELOG_JWT_SECRET in production."
+    )
+    JWT_SECRET = DEV_JWT_SECRET
+
+USER_CACHE_SIZE = int(os.getenv("LIFELOG_USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("LIFELOG_USER_CACHE_TTL_SECONDS", "300"))
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+@dataclass(frozen=True)
+class ActiveUser:
+    id: int
+    email: str
+    username: str
+
+    @classmethod
+    def from_model(cls, user: User) -> "ActiveUser":
+        return cls(id=user.id, email=user.email, username=user.username)
+
+class UserCache:
+    """LRU cache of active users whose entries expire after ttl seconds"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def get(self, user_id: int) -> Optional[ActiveUser]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return user
+
+    def put(self, user: ActiveUser):
+        self._entries[user.id] = (time.monotonic() + self.ttl, user)
+        self._entries.move_to_end(user.id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        self._entries.pop(user_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+user_cache = UserCache(USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS)
+
+def create_access_token(user_id: int) -> str:
+    """Issue a signed access token for the user"""
+    now = datetime.now(timezone.utc)
+    claims = {
+        "sub": str(user_id),
+        "iat": now,
+        "exp": now + timedelta(minutes=ACCESS_TOKEN_TTL_MINUTES),
+    }
+    return jwt.encode(claims, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+def decode_access_token(token: str) -> int:
+    """Return the user id from a valid token; 401 if it is invalid or expired"""
+    try:
+        claims = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        return int(claims["sub"])
+    except (JWTError, KeyError, ValueError):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+async def get_active_user(user_id: int, db: AsyncSession) -> ActiveUser:
+    """Look the user up in the cache, falling back to the database; 404 if missing"""
+    user = user_cache.get(user_id)
+    if user is None:
+        db_user = await db.get(User, user_id)
+        if not db_user:
+            raise HTTPException(status_code=404, detail="User not found")
+        user = ActiveUser.from_model(db_user)
+        user_cache.put(user)
+    return user
+
+async def resolve_user_id(
+    requested_user_id: Optional[int],
+    credentials: Optional[HTTPAuthorizationCredentials],
+    db: AsyncSession
+) -> int:
+    """
+    Work out which user a request acts as.
+
+    A bearer token decides the user; a user_id that names someone else is
+    rejected. Without a token the user_id is trusted unless auth is required.
+    """
+    if credentials is not None:
+        user_id = decode_access_token(credentials.credentials)
+        if requested_user_id is not None and requested_user_id != user_id:
+            raise HTTPException(status_code=403, detail="Token does not match user_id")
+    elif AUTH_REQUIRED or requested_user_id is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    else:
+        user_id = requested_user_id
+
+    return (await get_active_user(user_id, db)).id
+
+# Dependency resolving the current user for routes taking a user_id query parameter
+async def get_current_user_id(
+    user_id: Optional[int] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> int:
+    return await resolve_user_id(user_id, credentials, db)
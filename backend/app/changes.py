@@ -0,0 +1,110 @@
+"""
+Server -> client change feed backing GET /api/sync/changes.
+
+Every write appends to sync_changes: an UPSERT entry when a record is created
+or modified and a DELETE tombstone when it is removed. Older entries for the
+same record are compacted away, so the log holds at most one entry per
+record and a pull costs O(changes since the cursor) rather than O(history).
+
+The cursor is the autoincrement sync_changes.id. A client that has pulled
+up to id N never needs anything <= N again only if ids become visible in
+the order they are assigned, which SQLite's single writer guarantees. On
+PostgreSQL a transaction can take id N, commit after another one has
+committed N + 1, and be skipped by a client that pulled in between; running
+this feed there needs a commit-ordered cursor (e.g. the transaction id with
+pg_snapshot_xmin) or serialized writers.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, selectinload
+
+from .models import Workout, NutritionLog, BodyStat, SyncChange
+from .schemas import Workout as WorkoutSchema, NutritionLog as NutritionLogSchema, BodyStat as BodyStatSchema
+
+# table name in the change feed -> (model, response schema)
+CHANGE_TABLES = {
+    "workouts": (Workout, WorkoutSchema),
+    "nutrition": (NutritionLog, NutritionLogSchema),
+    "body_stats": (BodyStat, BodyStatSchema),
+}
+
+
+def record_changes(
+    db: Session,
+    user_id: int,
+    table_name: str,
+    records: Iterable[Tuple[int, Optional[str]]],
+    operation: str = "UPSERT"
+) -> None:
+    """
+    Append change entries for (record id, client_uuid) pairs.
+
+    operation is UPSERT for inserts and updates, DELETE for tombstones. The
+    caller remains responsible for committing.
+    """
+    latest: Dict[int, Optional[str]] = dict(records)
+    if not latest:
+        return
+
+    db.query(SyncChange).filter(
+        SyncChange.user_id == user_id,
+        SyncChange.table_name == table_name,
+        SyncChange.record_id.in_(list(latest))
+    ).delete(synchronize_session=False)
+
+    db.execute(insert(SyncChange), [
+        {
+            "user_id": user_id,
+            "table_name": table_name,
+            "record_id": record_id,
+            "client_uuid": client_uuid,
+            "operation": operation,
+        }
+        for record_id, client_uuid in latest.items()
+    ])
+
+
+def get_changes(db: Session, user_id: int, since: int, limit: int) -> Tuple[List[Dict], int, bool]:
+    """
+    Return one page of changes after the since cursor.
+
+    Returns (changes, next_cursor, has_more). Upserted records are loaded with
+    one IN query per table; tombstones carry no data.
+    """
+    entries = db.query(SyncChange).filter(
+        SyncChange.user_id == user_id,
+        SyncChange.id > since
+    ).order_by(SyncChange.id.asc()).limit(limit + 1).all()
+
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    records = {}
+    for table_name, (model, schema) in CHANGE_TABLES.items():
+        record_ids = [
+            entry.record_id for entry in entries
+            if entry.table_name == table_name and entry.operation == "UPSERT"
+        ]
+        if not record_ids:
+            continue
+        query = db.query(model).filter(model.user_id == user_id, model.id.in_(record_ids))
+        if model is Workout:
+            query = query.options(selectinload(Workout.exercises))
+        for record in query.all():
+            records[(table_name, record.id)] = schema.model_validate(record).model_dump()
+
+    changes = []
+    for entry in entries:
+        data = records.get((entry.table_name, entry.record_id))
+        changes.append({
+            "cursor": entry.id,
+            "table": entry.table_name,
+            "operation": entry.operation if entry.operation == "DELETE" or data else "DELETE",
+            "record_id": entry.record_id,
+            "client_uuid": entry.client_uuid,
+            "data": data,
+        })
+
+    next_cursor = entries[-1].id if entries else since
+    return changes, next_cursor, has_more
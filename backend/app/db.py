@@ -1,24 +1,156 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 import os
 
-# SQLite database URL
-SQLALCHEMY_DATABASE_URL = "sqlite:///./lifelog.db"
+# Database URLs; any SQLAlchemy URL works (e.g. postgresql+psycopg2://...).
+# Read-only routes use the replica when one is configured, the primary otherwise
+SQLALCHEMY_DATABASE_URL = os.getenv("LIFELOG_DATABASE_URL", "sqlite:///./lifelog.db")
+SQLALCHEMY_REPLICA_URL = os.getenv("LIFELOG_DATABASE_REPLICA_URL")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False}  # Needed for SQLite
-)
+# Engine profile: "production" tunes SQLite for concurrent sync writers and
+# dashboard readers, "default" keeps SQLite's stock settings
+DB_PROFILE = os.getenv("LIFELOG_DB_PROFILE", "production")
+
+SQLITE_PRAGMAS = {
+    "production": {
+        # Readers no longer block on writers, and commits fsync the WAL only
+        "journal_mode": os.getenv("LIFELOG_SQLITE_JOURNAL_MODE", "WAL"),
+        "synchronous": os.getenv("LIFELOG_SQLITE_SYNCHRONOUS", "NORMAL"),
+        # Negative cache_size is in KiB
+        "cache_size": -int(os.getenv("LIFELOG_SQLITE_CACHE_KB", "65536")),
+        "mmap_size": int(os.getenv("LIFELOG_SQLITE_MMAP_BYTES", str(256 * 1024 * 1024))),
+        "busy_timeout": int(os.getenv("LIFELOG_SQLITE_BUSY_TIMEOUT_MS", "5000")),
+        "temp_store": "MEMORY",
+    },
+    "default": {},
+}
+
+# Connection pool sizing
+DB_POOL_SIZE = int(os.getenv("LIFELOG_DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("LIFELOG_DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("LIFELOG_DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("LIFELOG_DB_POOL_RECYCLE", "-1"))
+
+# asyncio driver used by the request handlers for each sync URL scheme
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+if DB_PROFILE not in SQLITE_PRAGMAS:
+    raise ValueError(f"Unknown LIFELOG_DB_PROFILE: {DB_PROFILE}")
+
+def enable_sqlite_pragmas(engine, pragmas):
+    """
+    Apply PRAGMA settings to every new pooled connection.
+
+    Most pragmas are per connection, so they are issued from the connect
+    event rather than once at startup.
+    """
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def enable_sqlite_savepoints(engine):
+    """
+    Let SQLAlchemy own transaction boundaries on SQLite.
+
+    pysqlite defers BEGIN until the first DML statement, so a SAVEPOINT issued
+    before it would open (and RELEASE would commit) its own transaction.
+    Emitting BEGIN ourselves makes begin_nested() nest inside the session's
+    transaction as expected.
+    """
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _emit_begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+def create_db_engine(url: str):
+    """
+    Create an engine with the configured pool settings.
+
+    SQLite engines also get check_same_thread disabled, the PRAGMA profile
+    and SQLAlchemy-managed transactions; other dialects are used as-is with
+    pre-ping so recycled server connections are detected.
+    """
+    is_sqlite = url.startswith("sqlite")
+    db_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False} if is_sqlite else {},  # Needed for SQLite
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=not is_sqlite
+    )
+    if is_sqlite:
+        enable_sqlite_pragmas(db_engine, SQLITE_PRAGMAS[DB_PROFILE])
+        enable_sqlite_savepoints(db_engine)
+    return db_engine
+
+def to_async_url(url: str) -> str:
+    """Swap a URL's driver for its asyncio counterpart (e.g. sqlite -> sqlite+aiosqlite)"""
+    scheme, rest = url.split("://", 1)
+    backend = scheme.split("+")[0]
+    return f"{ASYNC_DRIVERS.get(backend, scheme)}://{rest}"
+
+def create_async_db_engine(url: str):
+    """
+    Async counterpart of create_db_engine() used by the request handlers.
+
+    aiosqlite defaults to NullPool, so the queue pool is requested explicitly
+    to keep the pool settings and the per-connection PRAGMAs effective.
+    """
+    is_sqlite = url.startswith("sqlite")
+    db_engine = create_async_engine(
+        to_async_url(url),
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=not is_sqlite
+    )
+    if is_sqlite:
+        enable_sqlite_pragmas(db_engine.sync_engine, SQLITE_PRAGMAS[DB_PROFILE])
+        enable_sqlite_savepoints(db_engine.sync_engine)
+    return db_engine
+
+# Sync engines for schema creation, migrations and offline scripts
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
+replica_engine = create_db_engine(SQLALCHEMY_REPLICA_URL) if SQLALCHEMY_REPLICA_URL else engine
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+
+# Async engines for the request handlers
+async_engine = create_async_db_engine(SQLALCHEMY_DATABASE_URL)
+async_replica_engine = (
+    create_async_db_engine(SQLALCHEMY_REPLICA_URL) if SQLALCHEMY_REPLICA_URL else async_engine
+)
+
+# expire_on_commit=False: handlers return ORM objects that are serialized
+# after the commit, when attribute refreshes can no longer be awaited
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+AsyncReadSessionLocal = async_sessionmaker(async_replica_engine, expire_on_commit=False, autoflush=False)
 
 Base = declarative_base()
 
 # Dependency to get DB session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Dependency for read-only routes; served by the replica when configured
+async def get_read_db():
+    async with AsyncReadSessionLocal() as db:
         yield db
-    finally:
-        db.close()
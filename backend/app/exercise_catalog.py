@@ -0,0 +1,160 @@
+"""
+Server-side exercise library.
+
+The exercise_catalog table is small and read on every keystroke of the
+workout logger, so the whole catalog is held in process memory: its
+entries as response models plus a TokenIndex over each exercise's name,
+category, equipment and muscle groups. The cache is rebuilt when the table
+changes (row count or latest updated_at), checked at most every
+EXERCISE_CATALOG_TTL_SECONDS, and right away after seed_exercise_catalog().
+
+Search ranks the exercises the user logs most first. The counts come from
+personal_records.session_count, the per-user, per-exercise day counter
+the workout write paths already maintain, in one indexed query by user_id
+instead of a scan of exercises. Logged names are matched to catalog
+entries by their normalized words, so "push ups" counts for "Push-ups".
+"""
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .models import ExerciseCatalog, PersonalRecord
+from .schemas import ExerciseCatalogEntry
+from .search_index import CatalogCache, TokenIndex, normalize_words
+
+EXERCISE_CATALOG_TTL_SECONDS = float(os.getenv("LIFELOG_EXERCISE_CATALOG_TTL_SECONDS", "60"))
+
+# Catalog shipped with the backend, loaded into empty databases at startup
+# and by add_exercise_catalog.py
+CATALOG_SEED_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "exercise_catalog.json")
+
+# Columns a seed entry may set, besides its slug
+CATALOG_FIELDS = ("name", "category", "equipment", "difficulty", "muscle_groups", "description", "instructions")
+
+
+def _name_key(name: str) -> str:
+    return " ".join(normalize_words(name))
+
+
+class Catalog:
+    """In-memory snapshot of exercise_catalog"""
+
+    def __init__(self, rows: Iterable[ExerciseCatalog]):
+        entries = [ExerciseCatalogEntry.model_validate(row) for row in rows]
+        self.entries: Dict[int, ExerciseCatalogEntry] = {entry.id: entry for entry in entries}
+        self.by_slug = {entry.slug: entry for entry in entries}
+        self.ids_by_name = {_name_key(entry.name): entry.id for entry in entries}
+        self.ordered = sorted(entries, key=lambda entry: entry.name.lower())
+        self.index = TokenIndex(
+            (
+                entry.id,
+                entry.name,
+                " ".join([entry.category, entry.equipment or "", *entry.muscle_groups])
+            )
+            for entry in entries
+        )
+
+
+def _catalog_version(db: Session) -> Tuple[int, Any]:
+    count, last_update = db.query(func.count(ExerciseCatalog.id), func.max(ExerciseCatalog.updated_at)).one()
+    return count, last_update
+
+
+_catalog: CatalogCache[Catalog] = CatalogCache(
+    lambda db: Catalog(db.query(ExerciseCatalog).all()),
+    _catalog_version,
+    EXERCISE_CATALOG_TTL_SECONDS
+)
+
+
+def get_exercise_catalog(db: Session) -> Catalog:
+    """The cached catalog, rebuilt when the table has changed"""
+    return _catalog.get(db)
+
+
+def invalidate_exercise_catalog():
+    """Drop the cached catalog so the next request reloads it"""
+    _catalog.invalidate()
+
+
+def user_exercise_counts(db: Session, user_id: int, catalog: Catalog) -> Dict[int, int]:
+    """Catalog id -> days the user has logged the exercise"""
+    counts: Dict[int, int] = {}
+    rows = db.query(PersonalRecord.exercise_name, PersonalRecord.session_count).filter(
+        PersonalRecord.user_id == user_id
+    ).all()
+    for name, session_count in rows:
+        catalog_id = catalog.ids_by_name.get(_name_key(name))
+        if catalog_id is not None and session_count:
+            counts[catalog_id] = counts.get(catalog_id, 0) + session_count
+    return counts
+
+
+def search_exercises(
+    db: Session,
+    user_id: int,
+    query: str = "",
+    limit: int = 10,
+    category: Optional[str] = None
+) -> List[Tuple[ExerciseCatalogEntry, int]]:
+    """
+    Catalog exercises matching the query as (entry, times the user logged it).
+
+    The user's most logged exercises come first. An empty query lists the
+    user's exercises and then the rest of the catalog by name.
+    """
+    catalog = get_exercise_catalog(db)
+    counts = user_exercise_counts(db, user_id, catalog)
+    frequent = sorted(counts, key=lambda catalog_id: (-counts[catalog_id], catalog.entries[catalog_id].name))
+
+    if normalize_words(query):
+        # Filtering by category afterwards needs every match, which is cheap
+        # for a catalog of this size
+        hits = catalog.index.search(query, len(catalog.index) if category else limit, frequent)
+        entries = [catalog.entries[catalog_id] for catalog_id, _ in hits]
+    else:
+        preferred = set(frequent)
+        entries = [catalog.entries[catalog_id] for catalog_id in frequent]
+        entries.extend(entry for entry in catalog.ordered if entry.id not in preferred)
+
+    if category:
+        entries = [entry for entry in entries if entry.category == category]
+    return [(entry, counts.get(entry.id, 0)) for entry in entries[:limit]]
+
+
+def seed_exercise_catalog(db: Session, entries: Iterable[Dict[str, Any]]) -> Tuple[int, int]:
+    """
+    Insert or update catalog entries by slug; returns (added, updated).
+    Entries missing from the input are left alone.
+    """
+    existing = {row.slug: row for row in db.query(ExerciseCatalog).all()}
+    added = updated = 0
+    for entry in entries:
+        values = {field: entry.get(field) for field in CATALOG_FIELDS}
+        values["muscle_groups"] = values["muscle_groups"] or []
+        values["instructions"] = values["instructions"] or []
+
+        row = existing.get(entry["slug"])
+        if row is None:
+            db.add(ExerciseCatalog(slug=entry["slug"], **values))
+            added += 1
+        elif any(getattr(row, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(row, field, value)
+            updated += 1
+    db.flush()
+    invalidate_exercise_catalog()
+    return added, updated
+
+
+def ensure_exercise_catalog(db: Session) -> int:
+    """Load the shipped catalog into an empty exercise_catalog; returns entries added"""
+    if db.query(ExerciseCatalog.id).first() is not None:
+        return 0
+    with open(CATALOG_SEED_PATH, encoding="utf-8") as catalog_file:
+        added, _ = seed_exercise_catalog(db, json.load(catalog_file))
+    db.commit()
+    return added
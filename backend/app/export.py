@@ -0,0 +1,165 @@
+"""
+Streaming export of a user's history as CSV, Parquet or Arrow.
+
+Each dataset is one Core SELECT over its table, so rows come back as plain
+tuples rather than ORM objects. The SELECT runs on a server-side cursor
+and is read in partitions of EXPORT_CHUNK_ROWS rows. Every partition is
+encoded and handed to the response before the next one is fetched, which
+keeps memory flat however long the history is.
+
+Parquet and Arrow need pyarrow, which is imported on first use.
+"""
+import csv
+import io
+import os
+from typing import AsyncIterator, Callable, Dict, List, Sequence
+
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import BodyStat, Exercise, NutritionLog, Workout
+
+EXPORT_CHUNK_ROWS = int(os.getenv("LIFELOG_EXPORT_CHUNK_ROWS", "5000"))
+
+
+def _workouts(user_id: int):
+    return select(*Workout.__table__.columns).where(
+        Workout.user_id == user_id
+    ).order_by(Workout.date, Workout.id)
+
+
+def _exercises(user_id: int):
+    # Walk the user's workouts through (user_id, date) and their exercises
+    # through workout_id, so exercises come out in workout order
+    return select(
+        *Exercise.__table__.columns,
+        Workout.date.label("workout_date")
+    ).join(Workout, Workout.id == Exercise.workout_id).where(
+        Workout.user_id == user_id
+    ).order_by(Workout.date, Workout.id, Exercise.order, Exercise.id)
+
+
+def _nutrition(user_id: int):
+    return select(*NutritionLog.__table__.columns).where(
+        NutritionLog.user_id == user_id
+    ).order_by(NutritionLog.date, NutritionLog.id)
+
+
+def _body_stats(user_id: int):
+    return select(*BodyStat.__table__.columns).where(
+        BodyStat.user_id == user_id
+    ).order_by(BodyStat.date, BodyStat.id)
+
+
+# Dataset name -> query for one user's rows
+DATASETS: Dict[str, Callable] = {
+    "workouts": _workouts,
+    "exercises": _exercises,
+    "nutrition": _nutrition,
+    "body_stats": _body_stats,
+}
+
+# Format -> (media type, file extension)
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+
+async def _partitions(db: AsyncSession, statement, chunk_rows: int) -> AsyncIterator[Sequence]:
+    # Stream on the session's connection: these are plain column tuples, so
+    # the ORM loading layer would only add per-row overhead
+    connection = await db.connection()
+    result = await connection.stream(statement.execution_options(yield_per=chunk_rows))
+    async for rows in result.partitions(chunk_rows):
+        yield rows
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file collecting what the writer emits until it is drained"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _arrow_schema(statement):
+    import pyarrow as pa
+
+    def arrow_type(column_type):
+        if isinstance(column_type, Boolean):
+            return pa.bool_()
+        if isinstance(column_type, Integer):
+            return pa.int64()
+        if isinstance(column_type, Float):
+            return pa.float64()
+        if isinstance(column_type, DateTime):
+            return pa.timestamp("us")
+        if isinstance(column_type, Date):
+            return pa.date32()
+        return pa.string()
+
+    return pa.schema([
+        pa.field(column.name, arrow_type(column.type)) for column in statement.selected_columns
+    ])
+
+
+async def stream_csv(db: AsyncSession, statement, chunk_rows: int = EXPORT_CHUNK_ROWS) -> AsyncIterator[bytes]:
+    """The query's rows as CSV with a header line, one chunk per partition"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.name for column in statement.selected_columns])
+    async for rows in _partitions(db, statement, chunk_rows):
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def stream_arrow(
+    db: AsyncSession,
+    statement,
+    file_format: str,
+    chunk_rows: int = EXPORT_CHUNK_ROWS
+) -> AsyncIterator[bytes]:
+    """
+    The query's rows as a Parquet file or an Arrow IPC stream.
+
+    Each partition becomes one record batch (one row group for Parquet).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(statement)
+    sink = _ChunkSink()
+    if file_format == "parquet":
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    try:
+        async for rows in _partitions(db, statement, chunk_rows):
+            columns = zip(*rows)
+            batch = pa.RecordBatch.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema
+            )
+            writer.write_batch(batch)
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -0,0 +1,157 @@
+"""
+Food catalog lookups and typeahead search.
+
+The catalog's search index (app.search_index.TokenIndex over each food's
+name and brand) is built on first use and rebuilt when the catalog has
+grown, which is checked at most every FOOD_INDEX_TTL_SECONDS; foods are
+only ever added by load_foods.py. A user's most frequently logged recent
+foods are matched separately and ranked ahead of the rest of the catalog.
+"""
+import os
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .models import Food, NutritionLog
+from .search_index import CatalogCache, TokenIndex, normalize_words
+
+FOOD_INDEX_TTL_SECONDS = float(os.getenv("LIFELOG_FOOD_INDEX_TTL_SECONDS", "300"))
+
+# Latest nutrition entries looked at when ranking a user's own foods first
+RECENT_FOOD_ENTRIES = 200
+
+# NutritionLog field -> Food attribute copied when an entry names a food_id
+FOOD_LOG_FIELDS = {
+    "food_name": "name",
+    "unit": "unit",
+    "calories": "calories",
+    "protein": "protein",
+    "carbs": "carbs",
+    "fat": "fat",
+    "fiber": "fiber",
+    "sugar": "sugar",
+    "sodium": "sodium",
+}
+
+# Columns of a catalog CSV; all but name, unit and calories may be blank
+FOOD_CSV_COLUMNS = (
+    "name", "brand", "category", "unit",
+    "calories", "protein", "carbs", "fat", "fiber", "sugar", "sodium",
+)
+
+# Rows per INSERT when importing a catalog
+FOOD_IMPORT_BATCH = 5000
+
+
+def _catalog_version(db: Session) -> Tuple[int, Optional[int]]:
+    count, last_id = db.query(func.count(Food.id), func.max(Food.id)).one()
+    return count, last_id
+
+
+_food_index: CatalogCache[TokenIndex] = CatalogCache(
+    lambda db: TokenIndex(db.query(Food.id, Food.name, Food.brand).all()),
+    _catalog_version,
+    FOOD_INDEX_TTL_SECONDS
+)
+
+
+def get_food_index(db: Session) -> TokenIndex:
+    """The shared search index, rebuilt when the catalog has changed"""
+    return _food_index.get(db)
+
+
+def invalidate_food_index():
+    """Drop the index so the next search rebuilds it"""
+    _food_index.invalidate()
+
+
+def recent_food_ids(db: Session, user_id: int) -> List[int]:
+    """Catalog foods among the user's latest entries, most logged first"""
+    rows = db.query(NutritionLog.food_id).filter(
+        NutritionLog.user_id == user_id
+    ).order_by(NutritionLog.date.desc()).limit(RECENT_FOOD_ENTRIES).all()
+
+    # Counter keeps first-seen order among ties, so recency breaks them
+    counts = Counter(food_id for food_id, in rows if food_id is not None)
+    return [food_id for food_id, _ in counts.most_common()]
+
+
+def search_foods(db: Session, user_id: int, query: str, limit: int = 10) -> List[Tuple[Food, bool]]:
+    """Catalog foods matching the query as (food, recently logged by the user)"""
+    if not normalize_words(query):
+        return []
+    index = get_food_index(db)
+    hits = index.search(query, limit, recent_food_ids(db, user_id))
+    if not hits:
+        return []
+
+    foods = load_foods(db, [food_id for food_id, _ in hits])
+    return [(foods[food_id], recent) for food_id, recent in hits if food_id in foods]
+
+
+def load_foods(db: Session, food_ids: Iterable[int]) -> Dict[int, Food]:
+    """Foods by id, in one query"""
+    food_ids = set(food_ids)
+    if not food_ids:
+        return {}
+    return {food.id: food for food in db.query(Food).filter(Food.id.in_(food_ids)).all()}
+
+
+def fill_from_food(values: Dict[str, Any], fields_set: Set[str], food: Optional[Food]) -> Dict[str, Any]:
+    """
+    Copy the food's name, unit and nutrient values into a nutrition entry
+    wherever the client left them out. Raises ValueError when the entry has
+    neither a food nor its own name, unit and calories.
+    """
+    if food is not None:
+        for field, attribute in FOOD_LOG_FIELDS.items():
+            if field not in fields_set or values.get(field) is None:
+                value = getattr(food, attribute)
+                values[field] = value if value is not None else 0
+
+    missing = [field for field in ("food_name", "unit", "calories") if values.get(field) is None]
+    if missing:
+        raise ValueError(f"Missing {', '.join(missing)}; send them or a food_id")
+    return values
+
+
+def parse_food_row(row: Dict[str, Optional[str]]) -> Dict[str, Any]:
+    """Catalog CSV row -> Food column values; raises ValueError on bad rows"""
+    name = (row.get("name") or "").strip()
+    unit = (row.get("unit") or "").strip()
+    if not name or not unit or not (row.get("calories") or "").strip():
+        raise ValueError("name, unit and calories are required")
+
+    values: Dict[str, Any] = {
+        "name": name,
+        "brand": (row.get("brand") or "").strip(),
+        "category": (row.get("category") or "").strip() or None,
+        "unit": unit,
+    }
+    for column in FOOD_CSV_COLUMNS[4:]:
+        text = (row.get(column) or "").strip()
+        values[column] = float(text) if text else 0.0
+    return values
+
+
+def import_foods(db: Session, rows: Iterable[Dict[str, Any]]) -> None:
+    """
+    Bulk-insert catalog foods, FOOD_IMPORT_BATCH rows per statement.
+    Foods whose (name, brand, unit) is already in the catalog are skipped.
+    """
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(Food).on_conflict_do_nothing(
+        index_elements=[Food.name, Food.brand, Food.unit]
+    )
+    batch: List[Dict[str, Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == FOOD_IMPORT_BATCH:
+            db.execute(statement, batch)
+            batch = []
+    if batch:
+        db.execute(statement, batch)
+    invalidate_food_index()
@@ -0,0 +1,288 @@
+"""
+Server-side "repeat a day" and meal/routine templates.
+
+Each operation is a few INSERT ... SELECT statements in the caller's
+transaction. The database copies the source rows (a day's logs or a
+template's items) without loading them into Python. Copying a day
+therefore costs a handful of statements however many nutrition entries
+and exercises it holds, and the route commits once. Dates are shifted in SQL. The target
+day's rollups, personal records and change feed entries are refreshed
+before that commit, as on every other write path.
+
+Copied workouts keep their exercises. The database does not promise
+that INSERT ... SELECT hands out ids in SELECT order, so each workout is
+copied by its own INSERT ... SELECT ... RETURNING, which pairs the copy
+with its source. A day holds a few workouts at most. The exercises then
+follow in one statement that re-parents them with a CASE expression.
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+from sqlalchemy import DateTime, case, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from .aggregation import day_bounds
+from .changes import record_changes
+from .foods import fill_from_food, load_foods
+from .models import (
+    BodyStat, Exercise, MealTemplate, MealTemplateItem, NutritionLog,
+    RoutineTemplate, RoutineTemplateExercise, Workout,
+)
+from .records import refresh_personal_records
+from .rollups import refresh_daily_rollups
+from .schemas import MealTemplateCreate, RoutineTemplateCreate
+
+# Table name in requests and the change feed -> model
+COPY_TABLES = {"workouts": Workout, "nutrition": NutritionLog, "body_stats": BodyStat}
+
+# Columns never copied: copies get their own identity and timestamps, and
+# no client has a local id for them yet
+SKIPPED_COLUMNS = {"id", "client_uuid", "created_at", "updated_at"}
+
+# Columns exercises share with routine template exercises
+EXERCISE_COLUMNS = ("name", "sets", "reps", "weight", "duration_seconds", "distance", "notes", "order")
+
+# Columns nutrition entries share with meal template items
+MEAL_ITEM_COLUMNS = (
+    "food_id", "food_name", "quantity", "unit",
+    "calories", "protein", "carbs", "fat", "fiber", "sugar", "sodium", "notes",
+)
+
+
+def _shifted(db: Session, column, days: int):
+    """The datetime column moved by whole days, computed by the database"""
+    if db.get_bind().dialect.name == "postgresql":
+        return column + timedelta(days=days)
+    # SQLite stores "YYYY-MM-DD HH:MM:SS.ffffff": shift the first 19
+    # characters and keep the fraction so copies sort and compare like
+    # every other row
+    return func.strftime("%Y-%m-%d %H:%M:%S", column, f"{days:+d} days").op("||")(func.substr(column, 20))
+
+
+def _copy_columns(model) -> List[str]:
+    return [column.name for column in model.__table__.columns if column.name not in SKIPPED_COLUMNS]
+
+
+def _insert_select(db: Session, model, columns: Sequence[str], statement) -> List[int]:
+    """Run INSERT ... SELECT and return the new ids, ascending"""
+    result = db.execute(insert(model).from_select(list(columns), statement).returning(model.id))
+    return sorted(result.scalars().all())
+
+
+def _finish(db: Session, user_id: int, ids: Dict[str, List[int]], days: Iterable[Union[date, datetime]]):
+    """Change feed, rollups and records for the rows a copy created"""
+    for table_name, new_ids in ids.items():
+        record_changes(db, user_id, table_name, [(new_id, None) for new_id in new_ids])
+    days = list(days)
+    if any(ids.values()):
+        refresh_daily_rollups(db, user_id, days)
+    if ids.get("workouts"):
+        refresh_personal_records(db, user_id, days)
+
+
+def _copy_exercises(db: Session, user_id: int, workout_ids: Dict[int, int]):
+    """Copy the exercises of the source workouts onto their copies"""
+    db.execute(insert(Exercise).from_select(
+        ["workout_id", "user_id", *EXERCISE_COLUMNS],
+        select(
+            case(workout_ids, value=Exercise.workout_id),
+            literal(user_id),
+            *[getattr(Exercise, column) for column in EXERCISE_COLUMNS]
+        ).where(
+            Exercise.workout_id.in_(list(workout_ids))
+        ).order_by(Exercise.workout_id, Exercise.order, Exercise.id)
+    ))
+
+
+def copy_day(
+    db: Session,
+    user_id: int,
+    source_day: date,
+    target_day: date,
+    tables: Iterable[str] = ("workouts", "nutrition"),
+    meal_types: Optional[Iterable[str]] = None
+) -> Dict[str, List[int]]:
+    """
+    Copy the user's rows of source_day to target_day, keeping their times
+    of day. Returns the new ids per table; the caller commits.
+    """
+    tables = list(dict.fromkeys(tables))
+    unknown = [table_name for table_name in tables if table_name not in COPY_TABLES]
+    if unknown:
+        raise ValueError(f"Unknown table(s): {', '.join(unknown)}. Use any of: {', '.join(COPY_TABLES)}")
+
+    days = (target_day - source_day).days
+    start, end = day_bounds(source_day, source_day)
+    ids: Dict[str, List[int]] = {}
+    for table_name in tables:
+        model = COPY_TABLES[table_name]
+        conditions = [model.user_id == user_id, model.date >= start, model.date < end]
+        if model is NutritionLog and meal_types:
+            conditions.append(NutritionLog.meal_type.in_(list(meal_types)))
+
+        columns = _copy_columns(model)
+        values = [
+            _shifted(db, model.date, days) if column == "date" else model.__table__.c[column]
+            for column in columns
+        ]
+
+        if model is Workout:
+            source_ids = db.scalars(select(Workout.id).where(*conditions).order_by(Workout.id)).all()
+            copies = {
+                source_id: db.execute(insert(Workout).from_select(
+                    columns, select(*values).where(Workout.id == source_id)
+                ).returning(Workout.id)).scalar_one()
+                for source_id in source_ids
+            }
+            new_ids = list(copies.values())
+            if copies:
+                _copy_exercises(db, user_id, copies)
+        else:
+            new_ids = _insert_select(
+                db, model, columns,
+                select(*values).where(*conditions).order_by(model.date, model.id)
+            )
+        ids[table_name] = new_ids
+
+    _finish(db, user_id, ids, [target_day])
+    return ids
+
+
+def create_meal_template(db: Session, user_id: int, data: MealTemplateCreate) -> MealTemplate:
+    """
+    Save a meal template from the given items, or from the source day's
+    entries of its meal type. Raises ValueError when it would be empty or
+    an item is incomplete.
+    """
+    template = MealTemplate(user_id=user_id, name=data.name, meal_type=data.meal_type)
+    db.add(template)
+
+    if data.source_date is not None:
+        db.flush()
+        start, end = day_bounds(data.source_date, data.source_date)
+        result = db.execute(insert(MealTemplateItem).from_select(
+            ["template_id", "position", *MEAL_ITEM_COLUMNS],
+            select(
+                literal(template.id),
+                func.row_number().over(order_by=(NutritionLog.date, NutritionLog.id)),
+                *[getattr(NutritionLog, column) for column in MEAL_ITEM_COLUMNS]
+            ).where(
+                NutritionLog.user_id == user_id,
+                NutritionLog.meal_type == data.meal_type,
+                NutritionLog.date >= start,
+                NutritionLog.date < end
+            )
+        ))
+        if not result.rowcount:
+            raise ValueError(f"No {data.meal_type} entries on {data.source_date}")
+        return template
+
+    if not data.items:
+        raise ValueError("A meal template needs items or a source_date")
+    foods = load_foods(db, [item.food_id for item in data.items if item.food_id is not None])
+    for position, item in enumerate(data.items):
+        if item.food_id is not None and item.food_id not in foods:
+            raise ValueError(f"Unknown food_id: {item.food_id}")
+        values = fill_from_food(item.dict(), item.model_fields_set, foods.get(item.food_id))
+        template.items.append(MealTemplateItem(position=position, **values))
+    db.flush()
+    return template
+
+
+def apply_meal_template(
+    db: Session,
+    user_id: int,
+    template: MealTemplate,
+    when: datetime,
+    meal_type: Optional[str] = None
+) -> Dict[str, List[int]]:
+    """Log every item of the template at `when`; the caller commits"""
+    quantity = MealTemplateItem.quantity
+    new_ids = _insert_select(
+        db, NutritionLog,
+        ["user_id", "date", "meal_type", *MEAL_ITEM_COLUMNS,
+         "total_calories", "total_protein", "total_carbs", "total_fat"],
+        select(
+            literal(user_id),
+            literal(when, DateTime),
+            literal(meal_type or template.meal_type),
+            *[getattr(MealTemplateItem, column) for column in MEAL_ITEM_COLUMNS],
+            MealTemplateItem.calories * quantity,
+            MealTemplateItem.protein * quantity,
+            MealTemplateItem.carbs * quantity,
+            MealTemplateItem.fat * quantity
+        ).where(
+            MealTemplateItem.template_id == template.id
+        ).order_by(MealTemplateItem.position, MealTemplateItem.id)
+    )
+    ids = {"nutrition": new_ids}
+    _finish(db, user_id, ids, [when])
+    return ids
+
+
+def create_routine_template(db: Session, user_id: int, data: RoutineTemplateCreate) -> RoutineTemplate:
+    """
+    Save a routine template from the given exercises, or from one of the
+    user's workouts. Raises LookupError for another user's or a missing
+    workout and ValueError when the template would be empty.
+    """
+    template = RoutineTemplate(
+        user_id=user_id, name=data.name, duration_minutes=data.duration_minutes, notes=data.notes
+    )
+
+    if data.source_workout_id is not None:
+        workout = db.query(Workout).filter(
+            Workout.id == data.source_workout_id,
+            Workout.user_id == user_id
+        ).first()
+        if not workout:
+            raise LookupError("Workout not found")
+        if template.duration_minutes is None:
+            template.duration_minutes = workout.duration_minutes
+        db.add(template)
+        db.flush()
+        db.execute(insert(RoutineTemplateExercise).from_select(
+            ["template_id", *EXERCISE_COLUMNS],
+            select(
+                literal(template.id),
+                *[getattr(Exercise, column) for column in EXERCISE_COLUMNS]
+            ).where(Exercise.workout_id == workout.id).order_by(Exercise.order, Exercise.id)
+        ))
+        return template
+
+    if not data.exercises:
+        raise ValueError("A routine template needs exercises or a source_workout_id")
+    template.exercises = [RoutineTemplateExercise(**exercise.dict()) for exercise in data.exercises]
+    db.add(template)
+    db.flush()
+    return template
+
+
+def apply_routine_template(
+    db: Session,
+    user_id: int,
+    template: RoutineTemplate,
+    when: datetime
+) -> Dict[str, List[int]]:
+    """Log the routine as one workout at `when`; the caller commits"""
+    workout_id = db.execute(insert(Workout).values(
+        user_id=user_id,
+        date=when,
+        name=template.name,
+        duration_minutes=template.duration_minutes,
+        notes=template.notes
+    ).returning(Workout.id)).scalar_one()
+
+    db.execute(insert(Exercise).from_select(
+        ["workout_id", "user_id", *EXERCISE_COLUMNS],
+        select(
+            literal(workout_id),
+            literal(user_id),
+            *[getattr(RoutineTemplateExercise, column) for column in EXERCISE_COLUMNS]
+        ).where(
+            RoutineTemplateExercise.template_id == template.id
+        ).order_by(RoutineTemplateExercise.order, RoutineTemplateExercise.id)
+    ))
+    ids = {"workouts": [workout_id]}
+    _finish(db, user_id, ids, [when])
+    return ids
@@ -0,0 +1,228 @@
+"""
+Request and SQL instrumentation exposed in the Prometheus text format.
+
+MetricsMiddleware times every HTTP request and labels it with the route
+template (e.g. /api/fitness/{fitness_id}), so path parameters do not blow up
+the series count. SQLAlchemy cursor hooks on every engine time each
+statement and add it to the current request's RequestStats through a
+context variable; SQLAlchemy's async layer runs the sync events in a
+greenlet that shares the request task's context. Statements slower than
+LIFELOG_SLOW_QUERY_MS are logged with their parameterized SQL.
+
+With LIFELOG_SERVER_TIMING on, responses carry a Server-Timing header with
+the request's query count and database time, so an N+1 regression shows
+up in the browser's network panel.
+"""
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+SLOW_QUERY_MS = float(os.getenv("LIFELOG_SLOW_QUERY_MS", "100"))
+SERVER_TIMING = os.getenv("LIFELOG_SERVER_TIMING", "false").lower() in ("1", "true", "yes")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+logger = logging.getLogger("lifelog.sql")
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _format_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class Histogram:
+    """Cumulative histogram per label set"""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        # labels -> [count per bucket..., count above the last bucket], sum
+        self._series: Dict[Labels, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labels, list(counts), total[0]) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in sorted(snapshot):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(labels, (('le', _format_value(bound)),))} {cumulative}")
+            cumulative += counts[-1]
+            lines.append(f"{self.name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+class Counter:
+    """Monotonic counter per label set"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        lines.extend(f"{self.name}{_format_labels(labels)} {_format_value(value)}" for labels, value in snapshot)
+        return lines
+
+REQUEST_DURATION = Histogram(
+    "lifelog_http_request_duration_seconds", "HTTP request latency by route", LATENCY_BUCKETS
+)
+REQUEST_QUERIES = Histogram(
+    "lifelog_http_request_queries", "SQL statements issued per HTTP request", QUERY_COUNT_BUCKETS
+)
+REQUEST_QUERY_DURATION = Histogram(
+    "lifelog_http_request_query_duration_seconds", "Time spent in SQL per HTTP request", LATENCY_BUCKETS
+)
+QUERY_DURATION = Histogram(
+    "lifelog_db_query_duration_seconds", "SQL statement latency by operation", QUERY_LATENCY_BUCKETS
+)
+SLOW_QUERIES = Counter("lifelog_db_slow_queries_total", "SQL statements slower than LIFELOG_SLOW_QUERY_MS")
+
+@dataclass
+class RequestStats:
+    query_count: int = 0
+    query_seconds: float = 0.0
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("lifelog_request_stats", default=None)
+
+# Connection.info key holding the start times of the statements in flight
+_QUERY_STARTS = "metrics_query_starts"
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Query count and time of the request being handled, None outside one"""
+    return _request_stats.get()
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_QUERY_STARTS, []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info[_QUERY_STARTS].pop()
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    QUERY_DURATION.observe(elapsed, operation=operation)
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.query_count += 1
+        stats.query_seconds += elapsed
+
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        SLOW_QUERIES.inc(operation=operation)
+        logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, " ".join(statement.split())[:1000])
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    starts = context.connection.info.get(_QUERY_STARTS) if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+def _route_template(scope) -> str:
+    """The matched route's path template; unmatched paths share one label"""
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is None or app is None:
+        return "unmatched"
+    templates = getattr(app.state, "metrics_route_templates", None)
+    if templates is None:
+        templates = app.state.metrics_route_templates = {
+            route.endpoint: route.path for route in app.routes if hasattr(route, "endpoint")
+        }
+    return templates.get(endpoint, "unmatched")
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and SQL usage per route"""
+
+    def __init__(self, app, server_timing: bool = SERVER_TIMING):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_metrics(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    total_ms = (time.perf_counter() - start) * 1000
+                    MutableHeaders(scope=message).append(
+                        "Server-Timing",
+                        f'db;dur={stats.query_seconds * 1000:.1f};desc="{stats.query_count} queries", '
+                        f"app;dur={total_ms:.1f}"
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = _route_template(scope)
+            method = scope["method"]
+            REQUEST_DURATION.observe(elapsed, method=method, route=route, status=str(status_code))
+            REQUEST_QUERIES.observe(stats.query_count, method=method, route=route)
+            REQUEST_QUERY_DURATION.observe(stats.query_seconds, method=method, route=route)
+            _request_stats.reset(token)
+
+def render_metrics(gauges: Dict[str, Tuple[str, float]] = None) -> str:
+    """
+    All metrics in the Prometheus text exposition format.
+
+    gauges maps extra gauge names to (help text, current value).
+    """
+    lines: List[str] = []
+    for metric in (REQUEST_DURATION, REQUEST_QUERIES, REQUEST_QUERY_DURATION, QUERY_DURATION, SLOW_QUERIES):
+        lines.extend(metric.render())
+    for name, (help_text, value) in (gauges or {}).items():
+        lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {_format_value(value)}"])
+    return "\n".join(lines) + "\n"
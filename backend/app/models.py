@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Text, ForeignKey, Boolean, UniqueConstraint, Index, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db import Base
@@ -22,30 +22,46 @@ class User(Base):
     target_calories = Column(Integer)
     
     # Relationships
-    workouts = relationship("Workout", back_populates="user")
-    nutrition_logs = relationship("NutritionLog", back_populates="user")
-    body_stats = relationship("BodyStat", back_populates="user")
+    workouts = relationship("Workout", back_populates="user", cascade="all, delete-orphan")
+    nutrition_logs = relationship("NutritionLog", back_populates="user", cascade="all, delete-orphan")
+    body_stats = relationship("BodyStat", back_populates="user", cascade="all, delete-orphan")
+    daily_rollups = relationship("DailyRollup", back_populates="user", cascade="all, delete-orphan")
+    streak = relationship("UserStreak", back_populates="user", uselist=False, cascade="all, delete-orphan")
+    personal_records = relationship("PersonalRecord", back_populates="user", cascade="all, delete-orphan")
+    meal_templates = relationship("MealTemplate", back_populates="user", cascade="all, delete-orphan")
+    routine_templates = relationship("RoutineTemplate", back_populates="user", cascade="all, delete-orphan")
+    sync_changes = relationship("SyncChange", back_populates="user", cascade="all, delete-orphan")
 
 class Workout(Base):
     __tablename__ = "workouts"
+    __table_args__ = (
+        Index("ix_workouts_user_id_date", "user_id", "date"),
+        Index("ux_workouts_user_id_client_uuid", "user_id", "client_uuid", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    client_uuid = Column(String)  # client-generated id used to make sync idempotent
     date = Column(DateTime, nullable=False)
     name = Column(String, nullable=False)  # e.g., "Push Day", "Cardio"
     duration_minutes = Column(Integer)
     notes = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationships
     user = relationship("User", back_populates="workouts")
-    exercises = relationship("Exercise", back_populates="workout")
+    exercises = relationship("Exercise", back_populates="workout", cascade="all, delete-orphan")
 
 class Exercise(Base):
     __tablename__ = "exercises"
+    __table_args__ = (
+        Index("ix_exercises_user_id_name", "user_id", "name"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    workout_id = Column(Integer, ForeignKey("workouts.id"), nullable=False)
+    workout_id = Column(Integer, ForeignKey("workouts.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))  # copied from the workout for per-user lookups
     name = Column(String, nullable=False)  # e.g., "Bench Press", "Squats"
     sets = Column(Integer, nullable=False)
     reps = Column(Integer)
@@ -58,11 +74,55 @@ class Exercise(Base):
     # Relationships
     workout = relationship("Workout", back_populates="exercises")
 
+class ExerciseCatalog(Base):
+    __tablename__ = "exercise_catalog"
+    
+    id = Column(Integer, primary_key=True)
+    slug = Column(String, unique=True, nullable=False)  # stable id shared with clients, e.g. "push-ups"
+    name = Column(String, nullable=False)
+    category = Column(String, nullable=False)  # strength, cardio, flexibility, sports, other
+    equipment = Column(String)  # bodyweight, dumbbells, barbell, machine, cardio, other
+    difficulty = Column(String)  # beginner, intermediate, advanced
+    muscle_groups = Column(JSON, default=list)
+    description = Column(Text)
+    instructions = Column(JSON, default=list)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class Food(Base):
+    __tablename__ = "foods"
+    __table_args__ = (
+        # Lets the catalog loader skip foods it has already imported
+        Index("ux_foods_name_brand_unit", "name", "brand", "unit", unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    brand = Column(String, nullable=False, default="")
+    category = Column(String)
+    unit = Column(String, nullable=False)  # serving the values below refer to
+    
+    # Nutritional values per unit
+    calories = Column(Float, nullable=False)
+    protein = Column(Float, default=0)
+    carbs = Column(Float, default=0)
+    fat = Column(Float, default=0)
+    fiber = Column(Float, default=0)
+    sugar = Column(Float, default=0)
+    sodium = Column(Float, default=0)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class NutritionLog(Base):
     __tablename__ = "nutrition_logs"
+    __table_args__ = (
+        Index("ix_nutrition_logs_user_id_date", "user_id", "date"),
+        Index("ux_nutrition_logs_user_id_client_uuid", "user_id", "client_uuid", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    client_uuid = Column(String)  # client-generated id used to make sync idempotent
+    food_id = Column(Integer, ForeignKey("foods.id"))  # catalog entry the values were copied from
     date = Column(DateTime, nullable=False)
     meal_type = Column(String, nullable=False)  # breakfast, lunch, dinner, snack
     food_name = Column(String, nullable=False)
@@ -86,15 +146,21 @@ class NutritionLog(Base):
     
     notes = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationships
     user = relationship("User", back_populates="nutrition_logs")
 
 class BodyStat(Base):
     __tablename__ = "body_stats"
+    __table_args__ = (
+        Index("ix_body_stats_user_id_date", "user_id", "date"),
+        Index("ux_body_stats_user_id_client_uuid", "user_id", "client_uuid", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    client_uuid = Column(String)  # client-generated id used to make sync idempotent
     date = Column(DateTime, nullable=False)
     
     # Weight and body composition
@@ -124,6 +190,175 @@ class BodyStat(Base):
     
     notes = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationships
     user = relationship("User", back_populates="body_stats")
+
+class DailyRollup(Base):
+    __tablename__ = "daily_rollups"
+    __table_args__ = (
+        UniqueConstraint("user_id", "day", name="uq_daily_rollups_user_day"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    day = Column(Date, nullable=False)
+    
+    # Nutrition totals for the day
+    total_calories = Column(Float, default=0)
+    total_protein = Column(Float, default=0)
+    total_carbs = Column(Float, default=0)
+    total_fat = Column(Float, default=0)
+    
+    # Workout totals for the day
+    workout_count = Column(Integer, default=0)
+    total_workout_duration = Column(Integer, default=0)  # minutes
+    
+    # Last weight logged on the day (not carried forward)
+    weight = Column(Float)
+    
+    has_activity = Column(Boolean, default=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    user = relationship("User", back_populates="daily_rollups")
+
+class UserStreak(Base):
+    __tablename__ = "user_streaks"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    current_streak = Column(Integer, default=0)  # run ending on last_active_day
+    longest_streak = Column(Integer, default=0)
+    last_active_day = Column(Date)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    user = relationship("User", back_populates="streak")
+
+class PersonalRecord(Base):
+    __tablename__ = "personal_records"
+    __table_args__ = (
+        Index("ux_personal_records_user_id_exercise_name", "user_id", "exercise_name", unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    exercise_name = Column(String, nullable=False)
+    
+    # Best single entry for each measure and the day it was logged
+    best_weight = Column(Float)
+    best_weight_date = Column(Date)
+    best_one_rep_max = Column(Float)  # Epley estimate from weight and reps
+    best_one_rep_max_date = Column(Date)
+    best_volume = Column(Float)  # sets x reps x weight
+    best_volume_date = Column(Date)
+    best_distance = Column(Float)
+    best_distance_date = Column(Date)
+    
+    session_count = Column(Integer, default=0)
+    first_performed = Column(Date)
+    last_performed = Column(Date)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    user = relationship("User", back_populates="personal_records")
+
+class MealTemplate(Base):
+    __tablename__ = "meal_templates"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    name = Column(String, nullable=False)
+    meal_type = Column(String, nullable=False)  # breakfast, lunch, dinner, snack
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    user = relationship("User", back_populates="meal_templates")
+    items = relationship(
+        "MealTemplateItem", back_populates="template", cascade="all, delete-orphan",
+        order_by="MealTemplateItem.position"
+    )
+
+class MealTemplateItem(Base):
+    __tablename__ = "meal_template_items"
+    
+    id = Column(Integer, primary_key=True)
+    template_id = Column(Integer, ForeignKey("meal_templates.id"), nullable=False, index=True)
+    position = Column(Integer, default=0)
+    food_id = Column(Integer, ForeignKey("foods.id"))
+    food_name = Column(String, nullable=False)
+    quantity = Column(Float, nullable=False)
+    unit = Column(String, nullable=False)
+    
+    # Nutritional values per unit, copied into each entry the template logs
+    calories = Column(Float, nullable=False)
+    protein = Column(Float, default=0)
+    carbs = Column(Float, default=0)
+    fat = Column(Float, default=0)
+    fiber = Column(Float, default=0)
+    sugar = Column(Float, default=0)
+    sodium = Column(Float, default=0)
+    notes = Column(Text)
+    
+    # Relationships
+    template = relationship("MealTemplate", back_populates="items")
+
+class RoutineTemplate(Base):
+    __tablename__ = "routine_templates"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    name = Column(String, nullable=False)  # becomes the workout name
+    duration_minutes = Column(Integer)
+    notes = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    user = relationship("User", back_populates="routine_templates")
+    exercises = relationship(
+        "RoutineTemplateExercise", back_populates="template", cascade="all, delete-orphan",
+        order_by="RoutineTemplateExercise.order"
+    )
+
+class RoutineTemplateExercise(Base):
+    __tablename__ = "routine_template_exercises"
+    
+    id = Column(Integer, primary_key=True)
+    template_id = Column(Integer, ForeignKey("routine_templates.id"), nullable=False, index=True)
+    name = Column(String, nullable=False)
+    sets = Column(Integer, nullable=False)
+    reps = Column(Integer)
+    weight = Column(Float)
+    duration_seconds = Column(Integer)
+    distance = Column(Float)
+    notes = Column(Text)
+    order = Column(Integer, default=0)
+    
+    # Relationships
+    template = relationship("RoutineTemplate", back_populates="exercises")
+
+class SyncChange(Base):
+    __tablename__ = "sync_changes"
+    __table_args__ = (
+        Index("ix_sync_changes_user_id_id", "user_id", "id"),
+        Index("ix_sync_changes_user_id_record", "user_id", "table_name", "record_id"),
+        # Never reuse ids, even after compaction deletes the newest row
+        {"sqlite_autoincrement": True},
+    )
+    
+    # The autoincrementing id doubles as the monotonic change cursor. That
+    # relies on ids being assigned in commit order, which holds for SQLite's
+    # single writer but not for concurrent PostgreSQL transactions (see
+    # app/changes.py)
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    table_name = Column(String, nullable=False)  # workouts, nutrition, body_stats
+    record_id = Column(Integer, nullable=False)
+    client_uuid = Column(String)
+    operation = Column(String, nullable=False)  # UPSERT or DELETE (tombstone)
+    changed_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    user = relationship("User", back_populates="sync_changes")
@@ -0,0 +1,68 @@
+"""
+Keyset pagination for the per-user log listings.
+
+Listings are ordered newest first on (date, id). A cursor encodes the
+(date, id) of the last row served, and the next page starts strictly after
+it, so every page is one range seek on the (user_id, date) index instead of
+walking and discarding `skip` rows.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Response header carrying the cursor of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(record_date: datetime, record_id: int) -> str:
+    """Opaque cursor for the position just after (record_date, record_id)"""
+    payload = json.dumps([record_date.isoformat(), record_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        record_date, record_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(record_date), int(record_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+async def paginate(
+    db: AsyncSession,
+    statement: Select,
+    model,
+    limit: int,
+    skip: int = 0,
+    cursor: Optional[str] = None
+) -> Tuple[List, Optional[str]]:
+    """
+    Return one page of statement, newest first, and the cursor of the next page.
+
+    With a cursor the page starts after it and skip is ignored; without one
+    the legacy offset is applied so existing clients keep working. The next
+    cursor is None on the last page.
+    """
+    statement = statement.order_by(model.date.desc(), model.id.desc())
+
+    if cursor:
+        cursor_date, cursor_id = decode_cursor(cursor)
+        statement = statement.filter(or_(
+            model.date < cursor_date,
+            and_(model.date == cursor_date, model.id < cursor_id)
+        ))
+    elif skip:
+        statement = statement.offset(skip)
+
+    rows = (await db.execute(statement.limit(limit + 1))).scalars().all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].date, rows[-1].id)
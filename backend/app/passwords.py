@@ -0,0 +1,82 @@
+"""
+Password hashing on a bounded worker process pool.
+
+bcrypt spends 100-300 ms of CPU per call and holds the GIL, so running it in
+the event loop or the default threadpool slows every other request during a
+login storm. Hashes and verifications are sent to a small process pool
+instead. Callers wait on a semaphore once every worker is busy, and requests
+are rejected with 503 when too many are already queued.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+# bcrypt cost factor (log2 rounds). Existing hashes keep the cost they were
+# created with, so changing this only affects new passwords
+BCRYPT_ROUNDS = int(os.getenv("LIFELOG_BCRYPT_ROUNDS", "12"))
+
+# Worker processes, and how many calls may wait for one before new ones are rejected
+HASH_WORKERS = int(os.getenv("LIFELOG_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_LIMIT = int(os.getenv("LIFELOG_HASH_QUEUE_LIMIT", "256"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+_executor = None
+_slots = None
+_queue_depth = 0
+
+def verify_password(plain_password, hashed_password):
+    return pwd_context.verify(plain_password, hashed_password)
+
+def get_password_hash(password):
+    return pwd_context.hash(password)
+
+def _get_executor():
+    global _executor, _slots
+    if _executor is None:
+        # spawn: the server process runs driver threads, which fork would copy half-initialised
+        _executor = ProcessPoolExecutor(
+            max_workers=HASH_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+        _slots = asyncio.Semaphore(HASH_WORKERS)
+    return _executor
+
+async def _run_in_pool(func, *args):
+    global _queue_depth
+    if _queue_depth >= HASH_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many concurrent logins, please retry",
+            headers={"Retry-After": "1"}
+        )
+
+    executor = _get_executor()
+    _queue_depth += 1
+    try:
+        async with _slots:
+            return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+    finally:
+        _queue_depth -= 1
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password on the hashing pool"""
+    return await _run_in_pool(get_password_hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Check a password against its hash on the hashing pool"""
+    return await _run_in_pool(verify_password, plain_password, hashed_password)
+
+def hashing_queue_depth() -> int:
+    """Hash/verify calls currently running or waiting for a worker"""
+    return _queue_depth
+
+def shutdown_hashing_pool():
+    global _executor, _slots
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+        _slots = None
@@ -0,0 +1,167 @@
+"""
+Maintenance of the materialized personal_records table.
+
+Workout write paths call refresh_personal_records() with the days they
+touched before committing. The exercises that were, or could have been, on
+those days are recomputed from the user's history through the
+(user_id, name) index on exercises. Each refresh rescans the full history
+of the touched exercises, so a write costs a few indexed queries plus one
+pass over those exercises' past entries; entries of other exercises are
+never read. rebuild_personal_records() backfills the table for existing
+databases.
+"""
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from .aggregation import day_bounds
+from .models import Exercise, PersonalRecord, Workout
+from .rollups import to_day
+
+
+def estimated_one_rep_max(weight: Optional[float], reps: Optional[int]) -> Optional[float]:
+    """Epley estimate of the one-rep max; the weight itself for a single rep"""
+    if not weight or not reps:
+        return None
+    return weight if reps == 1 else weight * (1 + reps / 30)
+
+
+def entry_volume(sets: Optional[int], reps: Optional[int], weight: Optional[float]) -> Optional[float]:
+    """Load moved in one exercise entry (sets x reps x weight)"""
+    if not sets or not reps or not weight:
+        return None
+    return sets * reps * weight
+
+
+def _history_query(db: Session, user_id: int, names: Iterable[str]):
+    return db.query(
+        Exercise.name,
+        Exercise.sets,
+        Exercise.reps,
+        Exercise.weight,
+        Exercise.distance,
+        Workout.date
+    ).join(Workout, Workout.id == Exercise.workout_id).filter(
+        Exercise.user_id == user_id,
+        Exercise.name.in_(list(names))
+    )
+
+
+def _summarize(rows) -> Dict[str, Dict]:
+    """Fold exercise history rows into PersonalRecord column values per name"""
+    records: Dict[str, Dict] = {}
+    for row in rows:
+        day = to_day(row.date)
+        record = records.setdefault(row.name, {"session_days": set()})
+        record["session_days"].add(day)
+
+        measures = {
+            "best_weight": row.weight,
+            "best_one_rep_max": estimated_one_rep_max(row.weight, row.reps),
+            "best_volume": entry_volume(row.sets, row.reps, row.weight),
+            "best_distance": row.distance,
+        }
+        for column, value in measures.items():
+            # Ties keep the earliest day the value was reached
+            best = record.get(column)
+            if value and (best is None or value > best or (value == best and day < record[f"{column}_date"])):
+                record[column] = float(value)
+                record[f"{column}_date"] = day
+
+    for record in records.values():
+        days = record.pop("session_days")
+        record["session_count"] = len(days)
+        record["first_performed"] = min(days)
+        record["last_performed"] = max(days)
+    return records
+
+
+def _write_records(db: Session, user_id: int, names: List[str], records: Dict[str, Dict]) -> None:
+    existing = {
+        record.exercise_name: record for record in db.query(PersonalRecord).filter(
+            PersonalRecord.user_id == user_id,
+            PersonalRecord.exercise_name.in_(names)
+        ).all()
+    }
+    for name in names:
+        values = records.get(name)
+        record = existing.get(name)
+        if values is None:
+            # No history left for this exercise
+            if record is not None:
+                db.delete(record)
+            continue
+        if record is None:
+            record = PersonalRecord(user_id=user_id, exercise_name=name)
+            db.add(record)
+        for column in (
+            "best_weight", "best_one_rep_max", "best_volume", "best_distance"
+        ):
+            setattr(record, column, values.get(column))
+            setattr(record, f"{column}_date", values.get(f"{column}_date"))
+        record.session_count = values["session_count"]
+        record.first_performed = values["first_performed"]
+        record.last_performed = values["last_performed"]
+
+
+def refresh_personal_records(db: Session, user_id: int, days: Iterable) -> None:
+    """
+    Recompute the records of every exercise that may have been logged on the days.
+
+    That is the exercises now on workouts of those days plus the stored
+    records whose history spans them, which covers deleted entries. Each of
+    those exercises is refolded from its full history. Pending changes are
+    flushed first. The caller remains responsible for committing.
+    """
+    days = sorted({to_day(value) for value in days if value is not None})
+    if not days:
+        return
+
+    db.flush()
+    range_start, range_end = day_bounds(days[0], days[-1])
+
+    names = {
+        row.name for row in db.query(Exercise.name).join(Workout, Workout.id == Exercise.workout_id).filter(
+            Workout.user_id == user_id,
+            Workout.date >= range_start,
+            Workout.date < range_end
+        ).distinct()
+    }
+    names.update(
+        row.exercise_name for row in db.query(PersonalRecord.exercise_name).filter(
+            PersonalRecord.user_id == user_id,
+            PersonalRecord.first_performed <= days[-1],
+            PersonalRecord.last_performed >= days[0]
+        )
+    )
+    if not names:
+        return
+
+    names = sorted(names)
+    _write_records(db, user_id, names, _summarize(_history_query(db, user_id, names)))
+    db.flush()
+
+
+def rebuild_personal_records(db: Session, user_id: Optional[int] = None) -> int:
+    """
+    Rebuild the personal_records table from the exercise history.
+
+    Returns the number of record rows written. The caller commits.
+    """
+    user_ids = [user_id] if user_id is not None else [
+        row.user_id for row in db.query(Exercise.user_id).filter(Exercise.user_id.isnot(None)).distinct()
+    ]
+
+    delete_query = db.query(PersonalRecord)
+    if user_id is not None:
+        delete_query = delete_query.filter(PersonalRecord.user_id == user_id)
+    delete_query.delete(synchronize_session=False)
+
+    row_count = 0
+    for owner_id in user_ids:
+        names = [row.name for row in db.query(Exercise.name).filter(Exercise.user_id == owner_id).distinct()]
+        records = _summarize(_history_query(db, owner_id, names))
+        _write_records(db, owner_id, sorted(records), records)
+        row_count += len(records)
+    db.flush()
+    return row_count
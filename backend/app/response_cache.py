@@ -0,0 +1,252 @@
+"""
+Response cache for the dashboard read endpoints.
+
+Analytics and summary responses only change when the user logs something,
+so their rendered JSON is cached per (user, path, query) together with the
+span of days it was computed from. Each entry carries an ETag; a request
+whose If-None-Match matches gets a 304 without the body being rendered.
+
+Write paths call refresh_daily_rollups() with the days they touched, which
+records them on the session via mark_days_changed(). Once that session
+commits, only the user's entries that could include those days are
+dropped. Because the weight is carried forward, that means every entry
+ending on or after the earliest touched day.
+
+A read that began before a commit can finish after the commit's
+invalidation ran. cached_response() notes the user's write sequence number
+when the request starts, and cache_response() does not store the result
+when a commit has bumped it since.
+
+Entries are filled from the read session, which may be a replica that has
+not yet replayed a write the primary just committed. For
+RESPONSE_CACHE_WRITE_GRACE_SECONDS after a user's commit their responses are
+therefore served but not stored, so a lagging read cannot be pinned for the
+whole TTL. Routes whose response depends on the current day put it in the
+key (cache_key's as_of), so nothing cached yesterday is served as today.
+
+Storage is pluggable through CacheBackend. The in-process LRU is the
+default; with several workers, an external store keeps invalidation shared.
+"""
+import hashlib
+import itertools
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .db import SQLALCHEMY_REPLICA_URL
+
+RESPONSE_CACHE_SIZE = int(os.getenv("LIFELOG_RESPONSE_CACHE_SIZE", "4096"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("LIFELOG_RESPONSE_CACHE_TTL_SECONDS", "300"))
+# Longer than the replica's usual lag; without a replica reads see every commit
+RESPONSE_CACHE_WRITE_GRACE_SECONDS = float(os.getenv(
+    "LIFELOG_RESPONSE_CACHE_WRITE_GRACE_SECONDS", "5" if SQLALCHEMY_REPLICA_URL else "0"
+))
+
+# Session.info key holding {user_id: {day, ...}} written in the current transaction
+_CHANGED_DAYS = "response_cache_changed_days"
+
+# request.state attribute holding the user's write sequence number seen by cached_response()
+_WRITE_SEQ_STATE = "response_cache_write_seq"
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+
+class CacheBackend:
+    """
+    Storage interface for the response cache.
+
+    Keys are strings starting with "<user_id>|" so a backend can list one
+    user's entries by prefix (e.g. SCAN MATCH on Redis). Calls are made from
+    request handlers and commit hooks, so they should be quick.
+    """
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: CachedResponse, ttl: float) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def keys(self, prefix: str) -> Iterable[str]:
+        raise NotImplementedError
+
+class InMemoryBackend(CacheBackend):
+    """Per-process LRU with a TTL per entry"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: CachedResponse, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def keys(self, prefix: str) -> List[str]:
+        return [key for key in self._entries if key.startswith(prefix)]
+
+    def clear(self):
+        self._entries.clear()
+
+_backend: CacheBackend = InMemoryBackend(RESPONSE_CACHE_SIZE)
+
+# user_id -> time.monotonic() of the user's last commit in this process
+_last_write: Dict[int, float] = {}
+
+# user_id -> sequence number of the user's last commit in this process.
+# Users missing from the map read as _write_seq_floor, which moves past every
+# number handed out whenever the map is cleared.
+_write_counter = itertools.count(1)
+_write_seq: Dict[int, int] = {}
+_write_seq_floor = 0
+
+def set_cache_backend(backend: CacheBackend):
+    """Swap the storage, e.g. for an external store shared by all workers"""
+    global _backend
+    _backend = backend
+
+def get_cache_backend() -> CacheBackend:
+    return _backend
+
+def cache_key(
+    request: Request,
+    user_id: int,
+    start: Optional[date],
+    end: Optional[date],
+    as_of: Optional[date] = None
+) -> str:
+    """
+    Key a response by user, the day span it covers and the request path and query.
+
+    A span with no end depends on every day and is dropped on any write.
+    Pass as_of (the resolved "today") when the response depends on it but
+    the query does not say so.
+    """
+    params = [(name, value) for name, value in request.query_params.multi_items() if name != "user_id"]
+    if as_of is not None:
+        params.append(("@as_of", as_of.isoformat()))
+    params.sort()
+    query = "&".join(f"{name}={value}" for name, value in params)
+    return f"{user_id}|{start or ''}|{end or ''}|{request.url.path}?{query}"
+
+def _not_modified(request: Request, etag: str) -> bool:
+    candidates = request.headers.get("if-none-match", "")
+    return etag in (value.strip() for value in candidates.split(",")) or candidates.strip() == "*"
+
+def _respond(request: Request, cached: CachedResponse) -> Response:
+    headers = {"ETag": cached.etag, "Cache-Control": "private, no-cache"}
+    if _not_modified(request, cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+def _key_user(key: str) -> int:
+    return int(key.split("|", 1)[0])
+
+def cached_response(request: Request, key: str) -> Optional[Response]:
+    """
+    The cached response (or a 304) for key, None on a miss.
+
+    On a miss the user's write sequence number is noted on the request, so
+    cache_response() can tell whether a commit landed while it was computed.
+    """
+    cached = _backend.get(key)
+    if cached is not None:
+        return _respond(request, cached)
+    setattr(request.state, _WRITE_SEQ_STATE, _current_write_seq(_key_user(key)))
+    return None
+
+def cache_response(request: Request, key: str, payload, encode: bool = True) -> Response:
+    """
+    Render payload as the route would, store it under key and respond.
+
+    Pass encode=False for payloads already made of plain JSON types (large
+    series) to skip the jsonable_encoder walk. Nothing is stored unless
+    cached_response() saw the same write sequence number for the user.
+    """
+    body = JSONResponse(content=jsonable_encoder(payload) if encode else payload).body
+    cached = CachedResponse(body=body, etag=f'"{hashlib.sha1(body).hexdigest()}"')
+    user_id = _key_user(key)
+    seen = getattr(request.state, _WRITE_SEQ_STATE, None)
+    if seen == _current_write_seq(user_id) and not _recently_written(user_id):
+        _backend.set(key, cached, RESPONSE_CACHE_TTL_SECONDS)
+    return _respond(request, cached)
+
+def _current_write_seq(user_id: int) -> int:
+    return _write_seq.get(user_id, _write_seq_floor)
+
+def _recently_written(user_id: int) -> bool:
+    written_at = _last_write.get(user_id)
+    return written_at is not None and time.monotonic() - written_at < RESPONSE_CACHE_WRITE_GRACE_SECONDS
+
+def _note_write(user_id: int):
+    global _write_seq_floor
+    if len(_write_seq) >= RESPONSE_CACHE_SIZE:
+        _write_seq.clear()
+        _write_seq_floor = next(_write_counter)
+    _write_seq[user_id] = next(_write_counter)
+
+    if not RESPONSE_CACHE_WRITE_GRACE_SECONDS:
+        return
+    now = time.monotonic()
+    if len(_last_write) >= RESPONSE_CACHE_SIZE:
+        for stale in [uid for uid, written_at in _last_write.items() if now - written_at >= RESPONSE_CACHE_WRITE_GRACE_SECONDS]:
+            del _last_write[stale]
+    _last_write[user_id] = now
+
+def invalidate_user_days(user_id: int, days: Iterable[date]):
+    """Drop the user's entries that cover, or carry weight forward from, any of the days"""
+    days = list(days)
+    if not days:
+        return
+    earliest = min(days).isoformat()
+    for key in list(_backend.keys(f"{user_id}|")):
+        end = key.split("|", 3)[2]
+        # ISO dates compare correctly as strings
+        if not end or end >= earliest:
+            _backend.delete(key)
+
+def invalidate_user(user_id: int):
+    """Drop every entry for the user"""
+    _note_write(user_id)
+    invalidate_user_days(user_id, [date.min])
+
+def mark_days_changed(db: Session, user_id: int, days: Iterable):
+    """Record days written in db's transaction; their entries are dropped on commit"""
+    changed: Dict[int, Set[date]] = db.info.setdefault(_CHANGED_DAYS, {})
+    changed.setdefault(user_id, set()).update(
+        day.date() if isinstance(day, datetime) else day for day in days
+    )
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(db: Session):
+    for user_id, days in db.info.pop(_CHANGED_DAYS, {}).items():
+        _note_write(user_id)
+        invalidate_user_days(user_id, days)
@@ -0,0 +1,227 @@
+"""
+Maintenance of the materialized daily_rollups table.
+
+Write handlers call refresh_daily_rollups() with the days they touched before
+committing; it also keeps the persisted user_streaks row in step and marks
+the days for response cache invalidation on commit.
+rebuild_daily_rollups() backfills both tables from the raw log tables for
+existing databases.
+"""
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .models import Workout, NutritionLog, BodyStat, DailyRollup, UserStreak
+from .aggregation import calendar_day, day_bounds
+from .streaks import compute_streaks, update_user_streak
+from .response_cache import mark_days_changed
+from .utils import parse_date_from_string
+
+
+def to_day(value) -> date:
+    """Normalise a datetime, date or ISO string to a calendar day"""
+    if isinstance(value, str):
+        value = parse_date_from_string(value)
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def refresh_daily_rollups(db: Session, user_id: int, days: Iterable) -> None:
+    """
+    Recompute the rollup rows for the given days from the raw log tables.
+
+    All days are aggregated together with GROUP BY over their span, so a sync
+    batch touching many days costs the same handful of queries as a single
+    write. Pending changes are flushed first so the recomputation sees them.
+    The caller remains responsible for committing.
+    """
+    days = sorted({to_day(value) for value in days if value is not None})
+    if not days:
+        return
+
+    mark_days_changed(db, user_id, days)
+    db.flush()
+    range_start, range_end = day_bounds(days[0], days[-1])
+
+    nutrition_day = calendar_day(NutritionLog.date).label("day")
+    nutrition_by_day = {
+        to_day(row.day): row for row in db.query(
+            nutrition_day,
+            func.sum(NutritionLog.total_calories).label("total_calories"),
+            func.sum(NutritionLog.total_protein).label("total_protein"),
+            func.sum(NutritionLog.total_carbs).label("total_carbs"),
+            func.sum(NutritionLog.total_fat).label("total_fat")
+        ).filter(
+            NutritionLog.user_id == user_id,
+            NutritionLog.date >= range_start,
+            NutritionLog.date < range_end
+        ).group_by(nutrition_day).all()
+    }
+
+    workout_day = calendar_day(Workout.date).label("day")
+    workouts_by_day = {
+        to_day(row.day): row for row in db.query(
+            workout_day,
+            func.count(Workout.id).label("workout_count"),
+            func.sum(Workout.duration_minutes).label("total_duration")
+        ).filter(
+            Workout.user_id == user_id,
+            Workout.date >= range_start,
+            Workout.date < range_end
+        ).group_by(workout_day).all()
+    }
+
+    # Ordered ascending so the last weigh-in of each day wins
+    body_stat_days = set()
+    weight_by_day: Dict[date, float] = {}
+    for row in db.query(BodyStat.date, BodyStat.weight).filter(
+        BodyStat.user_id == user_id,
+        BodyStat.date >= range_start,
+        BodyStat.date < range_end
+    ).order_by(BodyStat.date.asc(), BodyStat.created_at.asc()).all():
+        body_stat_days.add(row.date.date())
+        if row.weight is not None:
+            weight_by_day[row.date.date()] = float(row.weight)
+
+    rollups_by_day = {
+        rollup.day: rollup for rollup in db.query(DailyRollup).filter(
+            DailyRollup.user_id == user_id,
+            DailyRollup.day.in_(days)
+        ).all()
+    }
+
+    activated = []
+    deactivated = []
+    for day in days:
+        nutrition = nutrition_by_day.get(day)
+        workouts = workouts_by_day.get(day)
+        rollup = rollups_by_day.get(day)
+
+        if not (nutrition or workouts or day in body_stat_days):
+            if rollup:
+                db.delete(rollup)
+                deactivated.append(day)
+            continue
+
+        if not rollup:
+            rollup = DailyRollup(user_id=user_id, day=day)
+            db.add(rollup)
+            activated.append(day)
+
+        rollup.total_calories = float(nutrition.total_calories or 0) if nutrition else 0.0
+        rollup.total_protein = float(nutrition.total_protein or 0) if nutrition else 0.0
+        rollup.total_carbs = float(nutrition.total_carbs or 0) if nutrition else 0.0
+        rollup.total_fat = float(nutrition.total_fat or 0) if nutrition else 0.0
+        rollup.workout_count = int(workouts.workout_count or 0) if workouts else 0
+        rollup.total_workout_duration = int(workouts.total_duration or 0) if workouts else 0
+        rollup.weight = weight_by_day.get(day)
+        rollup.has_activity = True
+
+    db.flush()
+    update_user_streak(db, user_id, activated, deactivated)
+
+
+def rebuild_daily_rollups(db: Session, user_id: Optional[int] = None) -> int:
+    """
+    Rebuild the rollup table from scratch for one user or for everyone.
+
+    Returns the number of rollup rows written. The caller commits.
+    """
+    def scoped(query, model):
+        if user_id is not None:
+            query = query.filter(model.user_id == user_id)
+        return query
+
+    delete_query = db.query(DailyRollup)
+    if user_id is not None:
+        delete_query = delete_query.filter(DailyRollup.user_id == user_id)
+    delete_query.delete(synchronize_session=False)
+
+    rollups: Dict[Tuple[int, date], Dict] = {}
+
+    def row_for(owner_id, day) -> Dict:
+        key = (owner_id, to_day(day))
+        if key not in rollups:
+            rollups[key] = {
+                "user_id": key[0],
+                "day": key[1],
+                "total_calories": 0.0,
+                "total_protein": 0.0,
+                "total_carbs": 0.0,
+                "total_fat": 0.0,
+                "workout_count": 0,
+                "total_workout_duration": 0,
+                "weight": None,
+                "has_activity": True,
+            }
+        return rollups[key]
+
+    nutrition_day = calendar_day(NutritionLog.date).label("day")
+    nutrition_rows = scoped(db.query(
+        NutritionLog.user_id,
+        nutrition_day,
+        func.sum(NutritionLog.total_calories).label("total_calories"),
+        func.sum(NutritionLog.total_protein).label("total_protein"),
+        func.sum(NutritionLog.total_carbs).label("total_carbs"),
+        func.sum(NutritionLog.total_fat).label("total_fat")
+    ), NutritionLog).group_by(NutritionLog.user_id, nutrition_day).all()
+    for row in nutrition_rows:
+        rollup = row_for(row.user_id, row.day)
+        rollup["total_calories"] = float(row.total_calories or 0)
+        rollup["total_protein"] = float(row.total_protein or 0)
+        rollup["total_carbs"] = float(row.total_carbs or 0)
+        rollup["total_fat"] = float(row.total_fat or 0)
+
+    workout_day = calendar_day(Workout.date).label("day")
+    workout_rows = scoped(db.query(
+        Workout.user_id,
+        workout_day,
+        func.count(Workout.id).label("workout_count"),
+        func.sum(Workout.duration_minutes).label("total_duration")
+    ), Workout).group_by(Workout.user_id, workout_day).all()
+    for row in workout_rows:
+        rollup = row_for(row.user_id, row.day)
+        rollup["workout_count"] = int(row.workout_count or 0)
+        rollup["total_workout_duration"] = int(row.total_duration or 0)
+
+    # Ordered ascending so the last weigh-in of each day wins
+    body_rows = scoped(db.query(
+        BodyStat.user_id,
+        BodyStat.date,
+        BodyStat.weight
+    ), BodyStat).order_by(BodyStat.date.asc(), BodyStat.created_at.asc()).yield_per(1000)
+    for row in body_rows:
+        rollup = row_for(row.user_id, row.date)
+        if row.weight is not None:
+            rollup["weight"] = float(row.weight)
+
+    if rollups:
+        db.bulk_insert_mappings(DailyRollup, list(rollups.values()))
+
+    # Rebuild the persisted streaks from the same in-memory rollups
+    streak_query = db.query(UserStreak)
+    if user_id is not None:
+        streak_query = streak_query.filter(UserStreak.user_id == user_id)
+    streak_query.delete(synchronize_session=False)
+
+    days_by_user: Dict[int, List[date]] = {}
+    for owner_id, day in rollups:
+        days_by_user.setdefault(owner_id, []).append(day)
+
+    streak_rows = []
+    for owner_id, active_days in days_by_user.items():
+        current, longest, last_day = compute_streaks(sorted(active_days))
+        streak_rows.append({
+            "user_id": owner_id,
+            "current_streak": current,
+            "longest_streak": longest,
+            "last_active_day": last_day,
+        })
+    if streak_rows:
+        db.bulk_insert_mappings(UserStreak, streak_rows)
+    db.flush()
+
+    return len(rollups)
@@ -1,251 +1,220 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import Optional
 from datetime import datetime, timedelta
 
-from ..db import get_db
-from ..models import User, Workout, Exercise, NutritionLog, BodyStat
+from ..auth import get_current_user_id
+from ..db import get_read_db
+from ..response_cache import cache_key, cached_response, cache_response
+from ..models import DailyRollup
 from ..schemas import DailySummary, WeeklySummary
+from ..aggregation import get_daily_range, get_week_summary, rollup_to_summary, summarize_progress, get_dashboard
+from ..streaks import get_streak_status
+from ..trends import WEIGHT_TREND_ALPHA, get_trends
 
 router = APIRouter()
 
 @router.get("/daily", response_model=DailySummary)
 async def get_daily_analytics(
-    user_id: int,
+    request: Request,
     date: str,
-    db: Session = Depends(get_db)
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get daily analytics for a specific user and date
     """
     try:
-        # Verify user exists
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-
         # Parse date
         try:
             target_date = datetime.strptime(date, "%Y-%m-%d").date()
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
 
-        # Get nutrition totals for the day
-        nutrition_totals = db.query(
-            func.sum(NutritionLog.calories).label('total_calories'),
-            func.sum(NutritionLog.total_protein).label('total_protein'),
-            func.sum(NutritionLog.total_carbs).label('total_carbs'),
-            func.sum(NutritionLog.total_fat).label('total_fat')
-        ).filter(
-            NutritionLog.user_id == user_id,
-            func.date(NutritionLog.date) == target_date
-        ).first()
-
-        # Get workout count and total duration for the day
-        workout_stats = db.query(
-            func.count(Workout.id).label('workout_count'),
-            func.sum(Workout.duration_minutes).label('total_duration')
-        ).filter(
-            Workout.user_id == user_id,
-            func.date(Workout.date) == target_date
-        ).first()
-
-        # Get latest weight for the day
-        latest_weight = db.query(BodyStat.weight).filter(
-            BodyStat.user_id == user_id,
-            func.date(BodyStat.date) == target_date,
-            BodyStat.weight.isnot(None)
-        ).order_by(desc(BodyStat.created_at)).first()
-
-        return DailySummary(
-            date=date,
-            total_calories=int(nutrition_totals.total_calories or 0),
-            total_protein=float(nutrition_totals.total_protein or 0),
-            total_carbs=float(nutrition_totals.total_carbs or 0),
-            total_fat=float(nutrition_totals.total_fat or 0),
-            workout_count=int(workout_stats.workout_count or 0),
-            total_workout_duration=int(workout_stats.total_duration or 0),
-            weight=float(latest_weight.weight) if latest_weight else None
-        )
+        key = cache_key(request, user_id, target_date, target_date)
+        cached = cached_response(request, key)
+        if cached:
+            return cached
+
+        # Read the precomputed rollup for the day
+        rollup = (await db.execute(select(DailyRollup).filter(
+            DailyRollup.user_id == user_id,
+            DailyRollup.day == target_date
+        ))).scalars().first()
+
+        return cache_response(request, key, rollup_to_summary(target_date, rollup, rollup.weight if rollup else None))
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get daily analytics: {str(e)}")
 
 @router.get("/weekly", response_model=WeeklySummary)
 async def get_weekly_analytics(
-    user_id: int,
+    request: Request,
     start_date: str,
-    db: Session = Depends(get_db)
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get weekly analytics for a specific user and week
     """
     try:
-        # Verify user exists
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-
         # Parse start date
         try:
             week_start = datetime.strptime(start_date, "%Y-%m-%d").date()
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
 
-        week_end = week_start + timedelta(days=6)
-
-        # Get nutrition averages for the week
-        nutrition_avg = db.query(
-            func.avg(NutritionLog.calories).label('avg_calories'),
-            func.avg(NutritionLog.total_protein).label('avg_protein')
-        ).filter(
-            NutritionLog.user_id == user_id,
-            func.date(NutritionLog.date) >= week_start,
-            func.date(NutritionLog.date) <= week_end
-        ).first()
-
-        # Get workout stats for the week
-        workout_stats = db.query(
-            func.count(Workout.id).label('total_workouts'),
-            func.sum(Workout.duration_minutes).label('total_duration')
-        ).filter(
-            Workout.user_id == user_id,
-            func.date(Workout.date) >= week_start,
-            func.date(Workout.date) <= week_end
-        ).first()
-
-        # Get weight change for the week
-        start_weight = db.query(BodyStat.weight).filter(
-            BodyStat.user_id == user_id,
-            func.date(BodyStat.date) == week_start,
-            BodyStat.weight.isnot(None)
-        ).order_by(desc(BodyStat.created_at)).first()
-
-        end_weight = db.query(BodyStat.weight).filter(
-            BodyStat.user_id == user_id,
-            func.date(BodyStat.date) == week_end,
-            BodyStat.weight.isnot(None)
-        ).order_by(desc(BodyStat.created_at)).first()
-
-        weight_change = None
-        if start_weight and end_weight:
-            weight_change = float(end_weight.weight) - float(start_weight.weight)
-
-        return WeeklySummary(
-            week_start=week_start.isoformat(),
-            week_end=week_end.isoformat(),
-            avg_daily_calories=float(nutrition_avg.avg_calories or 0),
-            avg_daily_protein=float(nutrition_avg.avg_protein or 0),
-            total_workouts=int(workout_stats.total_workouts or 0),
-            total_workout_duration=int(workout_stats.total_duration or 0),
-            weight_change=weight_change
-        )
+        key = cache_key(request, user_id, week_start, week_start + timedelta(days=6))
+        cached = cached_response(request, key)
+        if cached:
+            return cached
+
+        return cache_response(request, key, await db.run_sync(get_week_summary, user_id, week_start))
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get weekly analytics: {str(e)}")
 
 @router.get("/streak")
 async def get_consistency_streak(
-    user_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
-    Get user's current consistency streak
+    Get user's current and longest consistency streaks
     """
     try:
-        # Verify user exists
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        # Calculate streak by checking consecutive days with any logged data
+        # Streaks depend on every active day, so any write drops this entry,
+        # and on today, which a new day must not be served from the cache
         today = datetime.now().date()
-        streak = 0
-        
-        for i in range(30):  # Check last 30 days
-            check_date = today - timedelta(days=i)
-            date_str = check_date.isoformat()
-            
-            # Check if user has any data for this date
-            has_nutrition = db.query(NutritionLog).filter(
-                NutritionLog.user_id == user_id,
-                func.date(NutritionLog.date) == check_date
-            ).first()
-            
-            has_workout = db.query(Workout).filter(
-                Workout.user_id == user_id,
-                func.date(Workout.date) == check_date
-            ).first()
-            
-            has_body_stat = db.query(BodyStat).filter(
-                BodyStat.user_id == user_id,
-                func.date(BodyStat.date) == check_date
-            ).first()
-            
-            if has_nutrition or has_workout or has_body_stat:
-                streak += 1
-            else:
-                break
-
-        return {
+        key = cache_key(request, user_id, None, None, as_of=today)
+        cached = cached_response(request, key)
+        if cached:
+            return cached
+
+        current_streak, longest_streak, last_active_day = await db.run_sync(get_streak_status, user_id, today)
+
+        return cache_response(request, key, {
             "user_id": user_id,
-            "current_streak": streak,
+            "current_streak": current_streak,
+            "longest_streak": longest_streak,
+            "last_active_date": last_active_day.isoformat() if last_active_day else None,
             "last_updated": today.isoformat()
-        }
+        })
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get streak: {str(e)}")
 
 @router.get("/progress")
 async def get_progress_metrics(
-    user_id: int,
+    request: Request,
+    user_id: int = Depends(get_current_user_id),
     days: int = 30,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get progress metrics for the last N days
     """
     try:
-        # Verify user exists
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=days-1)
 
-        # Get daily summaries for the period
-        daily_summaries = []
-        for i in range(days):
-            current_date = start_date + timedelta(days=i)
-            date_str = current_date.isoformat()
-            
-            # Get daily data
-            daily_data = await get_daily_analytics(user_id, date_str, db)
-            daily_summaries.append(daily_data)
-
-        # Calculate trends
-        calories_trend = []
-        weight_trend = []
-        
-        for summary in daily_summaries:
-            calories_trend.append(summary.total_calories)
-            if summary.weight:
-                weight_trend.append(summary.weight)
-
-        return {
-            "user_id": user_id,
-            "period_days": days,
-            "start_date": start_date.isoformat(),
-            "end_date": end_date.isoformat(),
-            "daily_summaries": daily_summaries,
-            "calories_trend": calories_trend,
-            "weight_trend": weight_trend,
-            "avg_daily_calories": sum(calories_trend) / len(calories_trend) if calories_trend else 0,
-            "weight_change": weight_trend[-1] - weight_trend[0] if len(weight_trend) > 1 else 0
-        }
+        key = cache_key(request, user_id, start_date, end_date)
+        cached = cached_response(request, key)
+        if cached:
+            return cached
+
+        # Get daily summaries for the period in a fixed number of queries
+        daily_summaries = await db.run_sync(get_daily_range, user_id, start_date, end_date)
+
+        return cache_response(request, key, summarize_progress(user_id, start_date, end_date, daily_summaries))
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get progress metrics: {str(e)}")
 
+
+@router.get("/trends")
+async def get_trend_analytics(
+    request: Request,
+    user_id: int = Depends(get_current_user_id),
+    days: int = 90,
+    date: Optional[str] = None,
+    alpha: float = WEIGHT_TREND_ALPHA,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get rolling calorie and weight averages, the smoothed weight trend, its
+    slope and an adaptive TDEE estimate for the `days` days ending on `date`
+
+    `alpha` is the smoothing factor of the weight trend (0 < alpha <= 1).
+    """
+    try:
+        if days < 1:
+            raise HTTPException(status_code=400, detail="days must be at least 1")
+        if not 0 < alpha <= 1:
+            raise HTTPException(status_code=400, detail="alpha must be in (0, 1]")
+        try:
+            end_date = datetime.strptime(date, "%Y-%m-%d").date() if date else datetime.now().date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+        start_date = end_date - timedelta(days=days-1)
+
+        key = cache_key(request, user_id, start_date, end_date)
+        cached = cached_response(request, key)
+        if cached:
+            return cached
+
+        # The payload is plain JSON types already
+        trends = await db.run_sync(get_trends, user_id, start_date, end_date, alpha)
+        return cache_response(request, key, trends, encode=False)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get trends: {str(e)}")
+
+
+@router.get("/dashboard")
+async def get_dashboard_analytics(
+    request: Request,
+    user_id: int = Depends(get_current_user_id),
+    date: Optional[str] = None,
+    start_date: Optional[str] = None,
+    days: int = 30,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get daily, weekly, streak and progress analytics in one request
+
+    `date` defaults to today and `start_date` (the week) to the Monday of
+    that date's week; progress covers the `days` days ending on `date`.
+    """
+    try:
+        # Parse dates
+        try:
+            target_date = datetime.strptime(date, "%Y-%m-%d").date() if date else datetime.now().date()
+            week_start = (
+                datetime.strptime(start_date, "%Y-%m-%d").date() if start_date
+                else target_date - timedelta(days=target_date.weekday())
+            )
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+
+        # The streak depends on every active day, so any write drops this
+        # entry; target_date keys it by day when `date` is omitted
+        key = cache_key(request, user_id, None, None, as_of=target_date)
+        cached = cached_response(request, key)
+        if cached:
+            return cached
+
+        return cache_response(request, key, await db.run_sync(get_dashboard, user_id, target_date, week_start, days))
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get dashboard: {str(e)}")
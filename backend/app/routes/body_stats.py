@@ -1,20 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db import get_db
-from app.models import BodyStat as BodyStatModel, User as UserModel
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.auth import get_current_user_id
+from app.db import get_db, get_read_db
+from app.models import BodyStat as BodyStatModel
 from app.schemas import BodyStatCreate, BodyStat as BodyStatSchema, BodyStatUpdate
+from app.rollups import refresh_daily_rollups
+from app.changes import record_changes
+from app.aggregation import day_bounds, day_start
+from app.pagination import paginate, NEXT_CURSOR_HEADER
 from typing import List
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 
 router = APIRouter()
 
 @router.post("/", response_model=BodyStatSchema)
-def create_body_stat(body_stat: BodyStatCreate, user_id: int, db: Session = Depends(get_db)):
-    # Verify user exists
-    user = db.query(UserModel).filter(UserModel.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
+async def create_body_stat(body_stat: BodyStatCreate, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
     # Create body stat entry
     db_body_stat = BodyStatModel(
         user_id=user_id,
@@ -40,35 +41,47 @@ def create_body_stat(body_stat: BodyStatCreate, user_id: int, db: Session = Depe
     )
     
     db.add(db_body_stat)
-    db.commit()
-    db.refresh(db_body_stat)
+    await db.run_sync(refresh_daily_rollups, user_id, [db_body_stat.date])
+    await db.run_sync(lambda session: record_changes(
+        session, user_id, "body_stats", [(db_body_stat.id, db_body_stat.client_uuid)]
+    ))
+    await db.commit()
+    await db.refresh(db_body_stat)
     
     return db_body_stat
 
 @router.get("/", response_model=List[BodyStatSchema])
-def get_body_stats(
-    user_id: int,
+async def get_body_stats(
+    user_id: int = Depends(get_current_user_id),
     skip: int = 0,
     limit: int = 100,
     start_date: date = None,
     end_date: date = None,
-    db: Session = Depends(get_db)
+    cursor: str = None,
+    response: Response = None,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    query = db.query(BodyStatModel).filter(BodyStatModel.user_id == user_id)
+    statement = select(BodyStatModel).filter(BodyStatModel.user_id == user_id)
     
     if start_date:
-        query = query.filter(BodyStatModel.date >= start_date)
+        statement = statement.filter(BodyStatModel.date >= day_start(start_date))
     if end_date:
-        query = query.filter(BodyStatModel.date <= end_date)
-    
-    stats = query.order_by(BodyStatModel.date.desc()).offset(skip).limit(limit).all()
+        statement = statement.filter(BodyStatModel.date < day_start(end_date + timedelta(days=1)))
+    
+    # Keyset pagination on (date, id); skip still works for older clients
+    try:
+        stats, next_cursor = await paginate(db, statement, BodyStatModel, limit, skip=skip, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor and response is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return stats
 
 @router.get("/latest", response_model=BodyStatSchema)
-def get_latest_body_stat(user_id: int, db: Session = Depends(get_db)):
-    stat = db.query(BodyStatModel).filter(
+async def get_latest_body_stat(user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_read_db)):
+    stat = (await db.execute(select(BodyStatModel).filter(
         BodyStatModel.user_id == user_id
-    ).order_by(BodyStatModel.date.desc()).first()
+    ).order_by(BodyStatModel.date.desc()))).scalars().first()
     
     if not stat:
         raise HTTPException(status_code=404, detail="No body stats found")
@@ -76,11 +89,11 @@ def get_latest_body_stat(user_id: int, db: Session = Depends(get_db)):
     return stat
 
 @router.get("/{stat_id}", response_model=BodyStatSchema)
-def get_body_stat(stat_id: int, user_id: int, db: Session = Depends(get_db)):
-    stat = db.query(BodyStatModel).filter(
+async def get_body_stat(stat_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+    stat = (await db.execute(select(BodyStatModel).filter(
         BodyStatModel.id == stat_id,
         BodyStatModel.user_id == user_id
-    ).first()
+    ))).scalars().first()
     
     if not stat:
         raise HTTPException(status_code=404, detail="Body stat not found")
@@ -88,62 +101,71 @@ def get_body_stat(stat_id: int, user_id: int, db: Session = Depends(get_db)):
     return stat
 
 @router.put("/{stat_id}", response_model=BodyStatSchema)
-def update_body_stat(
+async def update_body_stat(
     stat_id: int,
     stat_update: BodyStatUpdate,
-    user_id: int,
-    db: Session = Depends(get_db)
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db)
 ):
-    stat = db.query(BodyStatModel).filter(
+    stat = (await db.execute(select(BodyStatModel).filter(
         BodyStatModel.id == stat_id,
         BodyStatModel.user_id == user_id
-    ).first()
+    ))).scalars().first()
     
     if not stat:
         raise HTTPException(status_code=404, detail="Body stat not found")
     
+    previous_date = stat.date
+    
     # Update only provided fields
     update_data = stat_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(stat, field, value)
     
-    db.commit()
-    db.refresh(stat)
+    await db.run_sync(refresh_daily_rollups, user_id, [previous_date, stat.date])
+    await db.run_sync(lambda session: record_changes(
+        session, user_id, "body_stats", [(stat.id, stat.client_uuid)]
+    ))
+    await db.commit()
+    await db.refresh(stat)
     
     return stat
 
 @router.delete("/{stat_id}")
-def delete_body_stat(stat_id: int, user_id: int, db: Session = Depends(get_db)):
-    stat = db.query(BodyStatModel).filter(
+async def delete_body_stat(stat_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+    stat = (await db.execute(select(BodyStatModel).filter(
         BodyStatModel.id == stat_id,
         BodyStatModel.user_id == user_id
-    ).first()
+    ))).scalars().first()
     
     if not stat:
         raise HTTPException(status_code=404, detail="Body stat not found")
     
-    db.delete(stat)
-    db.commit()
+    await db.delete(stat)
+    await db.run_sync(refresh_daily_rollups, user_id, [stat.date])
+    await db.run_sync(lambda session: record_changes(
+        session, user_id, "body_stats", [(stat.id, stat.client_uuid)], "DELETE"
+    ))
+    await db.commit()
     
     return {"message": "Body stat deleted successfully"}
 
 @router.get("/weight/history")
-def get_weight_history(
-    user_id: int,
+async def get_weight_history(
+    user_id: int = Depends(get_current_user_id),
     days: int = 30,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    from datetime import timedelta
-    
     end_date = datetime.now().date()
     start_date = end_date - timedelta(days=days)
-    
-    stats = db.query(BodyStat).filter(
-        BodyStat.user_id == user_id,
-        BodyStat.date >= start_date,
-        BodyStat.date <= end_date,
-        BodyStat.weight.isnot(None)
-    ).order_by(BodyStat.date.asc()).all()
+    range_start, range_end = day_bounds(start_date, end_date)
+    
+    stats = (await db.execute(select(BodyStatModel).filter(
+        BodyStatModel.user_id == user_id,
+        BodyStatModel.date >= range_start,
+        BodyStatModel.date < range_end,
+        BodyStatModel.weight.isnot(None)
+    ).order_by(BodyStatModel.date.asc()))).scalars().all()
     
     weight_data = [
         {
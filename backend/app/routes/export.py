@@ -0,0 +1,60 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..auth import get_current_user_id
+from ..db import get_db, AsyncReadSessionLocal
+from ..export import DATASETS, FORMATS, stream_arrow, stream_csv
+
+router = APIRouter()
+
+@router.get("/{dataset}")
+async def export_dataset(
+    dataset: str,
+    format: str = "csv",
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Stream a user's full history of one dataset (workouts, exercises,
+    nutrition or body_stats) as CSV, Parquet or an Arrow IPC stream
+
+    Rows are ordered by date. Exercises carry their workout's date.
+    """
+    if dataset not in DATASETS:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown dataset. Use one of: {', '.join(DATASETS)}"
+        )
+    if format not in FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported format. Use one of: {', '.join(FORMATS)}"
+        )
+    if format != "csv":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail=f"{format} export requires pyarrow")
+
+    # The export reads on its own session for as long as the response
+    # streams; release the one used to authenticate
+    await db.close()
+
+    statement = DATASETS[dataset](user_id)
+    media_type, extension = FORMATS[format]
+
+    async def body():
+        async with AsyncReadSessionLocal() as export_db:
+            if format == "csv":
+                chunks = stream_csv(export_db, statement)
+            else:
+                chunks = stream_arrow(export_db, statement, format)
+            async for chunk in chunks:
+                yield chunk
+
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{extension}"'}
+    )
@@ -1,20 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db import get_db
-from app.models import Workout as WorkoutModel, Exercise as ExerciseModel, User as UserModel
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, noload
+from app.auth import get_current_user_id
+from app.db import get_db, get_read_db
+from app.models import Workout as WorkoutModel, Exercise as ExerciseModel, PersonalRecord as PersonalRecordModel
 from app.schemas import WorkoutCreate, Workout as WorkoutSchema, WorkoutUpdate, ExerciseCreate, Exercise as ExerciseSchema
+from app.schemas import PersonalRecord as PersonalRecordSchema, ExerciseProgress, ExerciseProgressEntry
+from app.schemas import ExerciseCatalogEntry, ExerciseSearchResult
+from app.rollups import refresh_daily_rollups
+from app.records import refresh_personal_records, estimated_one_rep_max, entry_volume
+from app.changes import record_changes
+from app.exercise_catalog import get_exercise_catalog, search_exercises
+from app.aggregation import day_start
+from app.pagination import paginate, NEXT_CURSOR_HEADER
 from typing import List
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 
 router = APIRouter()
 
+MAX_EXERCISE_RESULTS = 100
+
+def _exercise_loading(include: str):
+    """
+    Loader option for Workout.exercises on list endpoints.
+
+    Exercises are fetched for the whole page with one SELECT ... IN query
+    instead of one lazy load per workout. Passing an include list without
+    "exercises" (e.g. include=) skips them and returns an empty list.
+    """
+    includes = {part.strip() for part in (include or "").split(",")}
+    if "exercises" in includes:
+        return selectinload(WorkoutModel.exercises)
+    return noload(WorkoutModel.exercises)
+
+async def _load_workout(db: AsyncSession, fitness_id: int, user_id: int):
+    """
+    Fetch one workout with its exercises eagerly loaded.
+
+    Responses are serialized after the handler returns, where a lazy load
+    can no longer be awaited, so exercises are always loaded up front.
+    """
+    return (await db.execute(
+        select(WorkoutModel).options(selectinload(WorkoutModel.exercises)).filter(
+            WorkoutModel.id == fitness_id,
+            WorkoutModel.user_id == user_id
+        ).execution_options(populate_existing=True)
+    )).scalars().first()
+
 @router.post("/", response_model=WorkoutSchema)
-def create_fitness_session(workout: WorkoutCreate, user_id: int, db: Session = Depends(get_db)):
-    # Verify user exists
-    user = db.query(UserModel).filter(UserModel.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
+async def create_fitness_session(workout: WorkoutCreate, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
     # Create fitness session
     db_workout = WorkoutModel(
         user_id=user_id,
@@ -25,13 +60,13 @@ def create_fitness_session(workout: WorkoutCreate, user_id: int, db: Session = D
     )
     
     db.add(db_workout)
-    db.commit()
-    db.refresh(db_workout)
+    await db.flush()
     
     # Create exercises
     for exercise_data in workout.exercises:
         db_exercise = ExerciseModel(
             workout_id=db_workout.id,
+            user_id=user_id,
             name=exercise_data.name,
             sets=exercise_data.sets,
             reps=exercise_data.reps,
@@ -43,36 +78,131 @@ def create_fitness_session(workout: WorkoutCreate, user_id: int, db: Session = D
         )
         db.add(db_exercise)
     
-    db.commit()
-    db.refresh(db_workout)
+    # One commit, so the change feed never exposes the workout without its exercises
+    await db.run_sync(refresh_daily_rollups, user_id, [db_workout.date])
+    await db.run_sync(refresh_personal_records, user_id, [db_workout.date])
+    await db.run_sync(lambda session: record_changes(
+        session, user_id, "workouts", [(db_workout.id, db_workout.client_uuid)]
+    ))
+    await db.commit()
     
-    return db_workout
+    return await _load_workout(db, db_workout.id, user_id)
 
 @router.get("/", response_model=List[WorkoutSchema])
-def get_fitness_sessions(
-    user_id: int,
+async def get_fitness_sessions(
+    user_id: int = Depends(get_current_user_id),
     skip: int = 0,
     limit: int = 100,
     start_date: date = None,
     end_date: date = None,
-    db: Session = Depends(get_db)
+    cursor: str = None,
+    include: str = "exercises",
+    response: Response = None,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    query = db.query(WorkoutModel).filter(WorkoutModel.user_id == user_id)
+    statement = select(WorkoutModel).options(_exercise_loading(include)).filter(WorkoutModel.user_id == user_id)
     
     if start_date:
-        query = query.filter(WorkoutModel.date >= start_date)
+        statement = statement.filter(WorkoutModel.date >= day_start(start_date))
     if end_date:
-        query = query.filter(WorkoutModel.date <= end_date)
+        statement = statement.filter(WorkoutModel.date < day_start(end_date + timedelta(days=1)))
     
-    fitness_sessions = query.offset(skip).limit(limit).all()
+    # Keyset pagination on (date, id); skip still works for older clients
+    try:
+        fitness_sessions, next_cursor = await paginate(db, statement, WorkoutModel, limit, skip=skip, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor and response is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return fitness_sessions
 
+# Declared before /{fitness_id} so "records" is not parsed as an id
+@router.get("/records", response_model=List[PersonalRecordSchema])
+async def get_personal_records(user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_read_db)):
+    return (await db.execute(select(PersonalRecordModel).filter(
+        PersonalRecordModel.user_id == user_id
+    ).order_by(PersonalRecordModel.exercise_name.asc()))).scalars().all()
+
+@router.get("/progress/{exercise_name}", response_model=ExerciseProgress)
+async def get_exercise_progress(
+    exercise_name: str,
+    user_id: int = Depends(get_current_user_id),
+    start_date: date = None,
+    end_date: date = None,
+    limit: int = 500,
+    db: AsyncSession = Depends(get_read_db)
+):
+    record = (await db.execute(select(PersonalRecordModel).filter(
+        PersonalRecordModel.user_id == user_id,
+        PersonalRecordModel.exercise_name == exercise_name
+    ))).scalars().first()
+    
+    # Latest `limit` entries via the (user_id, name) index, returned oldest first
+    statement = select(ExerciseModel, WorkoutModel.date).join(
+        WorkoutModel, WorkoutModel.id == ExerciseModel.workout_id
+    ).filter(
+        ExerciseModel.user_id == user_id,
+        ExerciseModel.name == exercise_name
+    )
+    if start_date:
+        statement = statement.filter(WorkoutModel.date >= day_start(start_date))
+    if end_date:
+        statement = statement.filter(WorkoutModel.date < day_start(end_date + timedelta(days=1)))
+    rows = (await db.execute(
+        statement.order_by(WorkoutModel.date.desc(), ExerciseModel.id.desc()).limit(limit)
+    )).all()
+    if not rows and not record:
+        raise HTTPException(status_code=404, detail="Exercise not found")
+    
+    history = [
+        ExerciseProgressEntry(
+            workout_id=exercise.workout_id,
+            date=workout_date,
+            sets=exercise.sets,
+            reps=exercise.reps,
+            weight=exercise.weight,
+            duration_seconds=exercise.duration_seconds,
+            distance=exercise.distance,
+            estimated_one_rep_max=estimated_one_rep_max(exercise.weight, exercise.reps),
+            volume=entry_volume(exercise.sets, exercise.reps, exercise.weight)
+        )
+        for exercise, workout_date in reversed(rows)
+    ]
+    return ExerciseProgress(exercise_name=exercise_name, record=record, history=history)
+
+@router.get("/exercises/search", response_model=List[ExerciseSearchResult])
+async def search_exercise_catalog(
+    q: str = "",
+    limit: int = 10,
+    category: str = None,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Typeahead over the exercise library
+    
+    Matches every word of q as a prefix of the exercise's name, category,
+    equipment or muscle groups, tolerating typos. The exercises the user
+    logs most come first; an empty q lists them before the rest.
+    """
+    if limit < 1 or limit > MAX_EXERCISE_RESULTS:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_EXERCISE_RESULTS}")
+    
+    hits = await db.run_sync(search_exercises, user_id, q, limit, category)
+    return [ExerciseSearchResult(**entry.model_dump(), times_logged=count) for entry, count in hits]
+
+@router.get("/exercises/{slug}", response_model=ExerciseCatalogEntry)
+async def get_catalog_exercise(slug: str, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_read_db)):
+    catalog = await db.run_sync(get_exercise_catalog)
+    entry = catalog.by_slug.get(slug)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Exercise not found")
+    
+    return entry
+
 @router.get("/{fitness_id}", response_model=WorkoutSchema)
-def get_fitness_session(fitness_id: int, user_id: int, db: Session = Depends(get_db)):
-    fitness_session = db.query(WorkoutModel).filter(
-        WorkoutModel.id == fitness_id,
-        WorkoutModel.user_id == user_id
-    ).first()
+async def get_fitness_session(fitness_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+    fitness_session = await _load_workout(db, fitness_id, user_id)
     
     if not fitness_session:
         raise HTTPException(status_code=404, detail="Fitness session not found")
@@ -80,49 +210,59 @@ def get_fitness_session(fitness_id: int, user_id: int, db: Session = Depends(get
     return fitness_session
 
 @router.put("/{fitness_id}", response_model=WorkoutSchema)
-def update_fitness_session(
+async def update_fitness_session(
     fitness_id: int,
     fitness_update: WorkoutUpdate,
-    user_id: int,
-    db: Session = Depends(get_db)
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db)
 ):
-    fitness_session = db.query(WorkoutModel).filter(
-        WorkoutModel.id == fitness_id,
-        WorkoutModel.user_id == user_id
-    ).first()
+    fitness_session = await _load_workout(db, fitness_id, user_id)
     
     if not fitness_session:
         raise HTTPException(status_code=404, detail="Fitness session not found")
     
+    previous_date = fitness_session.date
+    
     # Update only provided fields
     update_data = fitness_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(fitness_session, field, value)
     
-    db.commit()
-    db.refresh(fitness_session)
-    
-    return fitness_session
+    await db.run_sync(refresh_daily_rollups, user_id, [previous_date, fitness_session.date])
+    await db.run_sync(refresh_personal_records, user_id, [previous_date, fitness_session.date])
+    await db.run_sync(lambda session: record_changes(
+        session, user_id, "workouts", [(fitness_session.id, fitness_session.client_uuid)]
+    ))
+    await db.commit()
+
+    return await _load_workout(db, fitness_id, user_id)
 
 @router.delete("/{fitness_id}")
-def delete_fitness_session(fitness_id: int, user_id: int, db: Session = Depends(get_db)):
-    fitness_session = db.query(WorkoutModel).filter(
-        WorkoutModel.id == fitness_id,
-        WorkoutModel.user_id == user_id
-    ).first()
+async def delete_fitness_session(fitness_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+    fitness_session = await _load_workout(db, fitness_id, user_id)
     
     if not fitness_session:
         raise HTTPException(status_code=404, detail="Fitness session not found")
     
-    db.delete(fitness_session)
-    db.commit()
+    await db.delete(fitness_session)
+    await db.run_sync(refresh_daily_rollups, user_id, [fitness_session.date])
+    await db.run_sync(refresh_personal_records, user_id, [fitness_session.date])
+    await db.run_sync(lambda session: record_changes(
+        session, user_id, "workouts", [(fitness_session.id, fitness_session.client_uuid)], "DELETE"
+    ))
+    await db.commit()
     
     return {"message": "Fitness session deleted successfully"}
 
 @router.get("/recent/{limit}", response_model=List[WorkoutSchema])
-def get_recent_fitness_sessions(user_id: int, limit: int = 5, db: Session = Depends(get_db)):
-    fitness_sessions = db.query(WorkoutModel).filter(
+async def get_recent_fitness_sessions(
+    user_id: int = Depends(get_current_user_id),
+    limit: int = 5,
+    include: str = "exercises",
+    db: AsyncSession = Depends(get_read_db)
+):
+    fitness_sessions = (await db.execute(select(WorkoutModel).options(_exercise_loading(include)).filter(
         WorkoutModel.user_id == user_id
-    ).order_by(WorkoutModel.date.desc()).limit(limit).all()
+    ).order_by(WorkoutModel.date.desc()).limit(limit))).scalars().all()
     
     return fitness_sessions
@@ -0,0 +1,136 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.auth import get_current_user_id
+from app.db import get_db, get_read_db
+from app.models import MealTemplate as MealTemplateModel, RoutineTemplate as RoutineTemplateModel
+from app.schemas import (
+    CopyDayRequest, LogCopyResult, TemplateApply,
+    MealTemplateCreate, MealTemplate as MealTemplateSchema,
+    RoutineTemplateCreate, RoutineTemplate as RoutineTemplateSchema
+)
+from app.log_copy import (
+    copy_day, create_meal_template, apply_meal_template,
+    create_routine_template, apply_routine_template
+)
+from typing import Dict, List
+
+router = APIRouter()
+
+def _copy_result(ids: Dict[str, List[int]]) -> LogCopyResult:
+    return LogCopyResult(copied={table: len(new_ids) for table, new_ids in ids.items()}, ids=ids)
+
+async def _load_meal_template(db: AsyncSession, template_id: int, user_id: int):
+    """Fetch one meal template with its items loaded for serialization"""
+    return (await db.execute(
+        select(MealTemplateModel).options(selectinload(MealTemplateModel.items)).filter(
+            MealTemplateModel.id == template_id,
+            MealTemplateModel.user_id == user_id
+        ).execution_options(populate_existing=True)
+    )).scalars().first()
+
+async def _load_routine_template(db: AsyncSession, template_id: int, user_id: int):
+    """Fetch one routine template with its exercises loaded for serialization"""
+    return (await db.execute(
+        select(RoutineTemplateModel).options(selectinload(RoutineTemplateModel.exercises)).filter(
+            RoutineTemplateModel.id == template_id,
+            RoutineTemplateModel.user_id == user_id
+        ).execution_options(populate_existing=True)
+    )).scalars().first()
+
+@router.post("/copy-day", response_model=LogCopyResult)
+async def copy_log_day(request: CopyDayRequest, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+    # The rows are copied by INSERT ... SELECT in this one transaction,
+    # however many entries the source day holds
+    try:
+        ids = await db.run_sync(
+            copy_day, user_id, request.source_date, request.target_date, request.tables, request.meal_types
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await db.commit()
+
+    return _copy_result(ids)
+
+@router.get("/templates/meals", response_model=List[MealTemplateSchema])
+async def get_meal_templates(user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_read_db)):
+    return (await db.execute(
+        select(MealTemplateModel).options(selectinload(MealTemplateModel.items)).filter(
+            MealTemplateModel.user_id == user_id
+        ).order_by(MealTemplateModel.name)
+    )).scalars().all()
+
+@router.post("/templates/meals", response_model=MealTemplateSchema)
+async def create_meal_template_route(template: MealTemplateCreate, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+    try:
+        db_template = await db.run_sync(create_meal_template, user_id, template)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await db.commit()
+
+    return await _load_meal_template(db, db_template.id, user_id)
+
+@router.post("/templates/meals/{template_id}/apply", response_model=LogCopyResult)
+async def apply_meal_template_route(template_id: int, request: TemplateApply, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+    template = await db.get(MealTemplateModel, template_id)
+    if not template or template.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Meal template not found")
+
+    ids = await db.run_sync(apply_meal_template, user_id, template, request.date, request.meal_type)
+    await db.commit()
+
+    return _copy_result(ids)
+
+@router.delete("/templates/meals/{template_id}")
+async def delete_meal_template(template_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+    template = await _load_meal_template(db, template_id, user_id)
+    if not template:
+        raise HTTPException(status_code=404, detail="Meal template not found")
+
+    await db.delete(template)
+    await db.commit()
+
+    return {"message": "Meal template deleted successfully"}
+
+@router.get("/templates/routines", response_model=List[RoutineTemplateSchema])
+async def get_routine_templates(user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_read_db)):
+    return (await db.execute(
+        select(RoutineTemplateModel).options(selectinload(RoutineTemplateModel.exercises)).filter(
+            RoutineTemplateModel.user_id == user_id
+        ).order_by(RoutineTemplateModel.name)
+    )).scalars().all()
+
+@router.post("/templates/routines", response_model=RoutineTemplateSchema)
+async def create_routine_template_route(template: RoutineTemplateCreate, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+    try:
+        db_template = await db.run_sync(create_routine_template, user_id, template)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await db.commit()
+
+    return await _load_routine_template(db, db_template.id, user_id)
+
+@router.post("/templates/routines/{template_id}/apply", response_model=LogCopyResult)
+async def apply_routine_template_route(template_id: int, request: TemplateApply, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+    template = await db.get(RoutineTemplateModel, template_id)
+    if not template or template.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Routine template not found")
+
+    ids = await db.run_sync(apply_routine_template, user_id, template, request.date)
+    await db.commit()
+
+    return _copy_result(ids)
+
+@router.delete("/templates/routines/{template_id}")
+async def delete_routine_template(template_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+    template = await _load_routine_template(db, template_id, user_id)
+    if not template:
+        raise HTTPException(status_code=404, detail="Routine template not found")
+
+    await db.delete(template)
+    await db.commit()
+
+    return {"message": "Routine template deleted successfully"}
@@ -1,91 +1,141 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db import get_db
-from app.models import NutritionLog as NutritionLogModel, User as UserModel
-from app.schemas import NutritionLogCreate, NutritionLog as NutritionLogSchema, NutritionLogUpdate
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.auth import get_current_user_id
+from app.db import get_db, get_read_db
+from app.models import NutritionLog as NutritionLogModel, Food as FoodModel
+from app.schemas import (
+    NutritionLogCreate, NutritionLog as NutritionLogSchema, NutritionLogUpdate,
+    Food as FoodSchema, FoodSearchResult
+)
+from app.foods import fill_from_food, search_foods
+from app.rollups import refresh_daily_rollups
+from app.changes import record_changes
+from app.aggregation import day_bounds, day_start
+from app.pagination import paginate, NEXT_CURSOR_HEADER
 from typing import List
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 
 router = APIRouter()
 
+MAX_FOOD_RESULTS = 50
+
 @router.post("/", response_model=NutritionLogSchema)
-def create_nutrition_log(nutrition_log: NutritionLogCreate, user_id: int, db: Session = Depends(get_db)):
-    # Verify user exists
-    user = db.query(UserModel).filter(UserModel.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+async def create_nutrition_log(nutrition_log: NutritionLogCreate, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+    # Take the name, unit and nutrients the client left out from the catalog
+    food = None
+    if nutrition_log.food_id is not None:
+        food = await db.get(FoodModel, nutrition_log.food_id)
+        if not food:
+            raise HTTPException(status_code=404, detail="Food not found")
+    try:
+        values = fill_from_food(nutrition_log.dict(), nutrition_log.model_fields_set, food)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     # Calculate totals
-    total_calories = nutrition_log.calories * nutrition_log.quantity
-    total_protein = nutrition_log.protein * nutrition_log.quantity
-    total_carbs = nutrition_log.carbs * nutrition_log.quantity
-    total_fat = nutrition_log.fat * nutrition_log.quantity
+    total_calories = values["calories"] * values["quantity"]
+    total_protein = values["protein"] * values["quantity"]
+    total_carbs = values["carbs"] * values["quantity"]
+    total_fat = values["fat"] * values["quantity"]
     
     # Create nutrition log
     db_nutrition_log = NutritionLogModel(
         user_id=user_id,
-        date=nutrition_log.date,
-        meal_type=nutrition_log.meal_type,
-        food_name=nutrition_log.food_name,
-        quantity=nutrition_log.quantity,
-        unit=nutrition_log.unit,
-        calories=nutrition_log.calories,
-        protein=nutrition_log.protein,
-        carbs=nutrition_log.carbs,
-        fat=nutrition_log.fat,
-        fiber=nutrition_log.fiber,
-        sugar=nutrition_log.sugar,
-        sodium=nutrition_log.sodium,
+        **values,
         total_calories=total_calories,
         total_protein=total_protein,
         total_carbs=total_carbs,
-        total_fat=total_fat,
-        notes=nutrition_log.notes
+        total_fat=total_fat
     )
     
     db.add(db_nutrition_log)
-    db.commit()
-    db.refresh(db_nutrition_log)
+    await db.run_sync(refresh_daily_rollups, user_id, [db_nutrition_log.date])
+    await db.run_sync(lambda session: record_changes(
+        session, user_id, "nutrition", [(db_nutrition_log.id, db_nutrition_log.client_uuid)]
+    ))
+    await db.commit()
+    await db.refresh(db_nutrition_log)
     
     return db_nutrition_log
 
 @router.get("/", response_model=List[NutritionLogSchema])
-def get_nutrition_logs(
-    user_id: int,
+async def get_nutrition_logs(
+    user_id: int = Depends(get_current_user_id),
     skip: int = 0,
     limit: int = 100,
     start_date: date = None,
     end_date: date = None,
     meal_type: str = None,
-    db: Session = Depends(get_db)
+    cursor: str = None,
+    response: Response = None,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    query = db.query(NutritionLogModel).filter(NutritionLogModel.user_id == user_id)
+    statement = select(NutritionLogModel).filter(NutritionLogModel.user_id == user_id)
     
     if start_date:
-        query = query.filter(NutritionLogModel.date >= start_date)
+        statement = statement.filter(NutritionLogModel.date >= day_start(start_date))
     if end_date:
-        query = query.filter(NutritionLogModel.date <= end_date)
+        statement = statement.filter(NutritionLogModel.date < day_start(end_date + timedelta(days=1)))
     if meal_type:
-        query = query.filter(NutritionLogModel.meal_type == meal_type)
-    
-    logs = query.offset(skip).limit(limit).all()
+        statement = statement.filter(NutritionLogModel.meal_type == meal_type)
+    
+    # Keyset pagination on (date, id); skip still works for older clients
+    try:
+        logs, next_cursor = await paginate(db, statement, NutritionLogModel, limit, skip=skip, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor and response is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return logs
 
 @router.get("/daily/{target_date}", response_model=List[NutritionLogSchema])
-def get_daily_nutrition(target_date: date, user_id: int, db: Session = Depends(get_db)):
-    logs = db.query(NutritionLogModel).filter(
+async def get_daily_nutrition(target_date: date, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_read_db)):
+    range_start, range_end = day_bounds(target_date, target_date)
+    logs = (await db.execute(select(NutritionLogModel).filter(
         NutritionLogModel.user_id == user_id,
-        NutritionLogModel.date == target_date
-    ).all()
+        NutritionLogModel.date >= range_start,
+        NutritionLogModel.date < range_end
+    ))).scalars().all()
     
     return logs
 
+@router.get("/foods/search", response_model=List[FoodSearchResult])
+async def search_food_catalog(
+    q: str,
+    limit: int = 10,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Typeahead over the food catalog
+    
+    Matches every word of q as a prefix of the food's name or brand words,
+    tolerating typos, with the foods the user logs most often ranked first.
+    """
+    if limit < 1 or limit > MAX_FOOD_RESULTS:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_FOOD_RESULTS}")
+    
+    hits = await db.run_sync(search_foods, user_id, q, limit)
+    return [
+        FoodSearchResult.model_validate(food).model_copy(update={"recent": recent})
+        for food, recent in hits
+    ]
+
+@router.get("/foods/{food_id}", response_model=FoodSchema)
+async def get_food(food_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_read_db)):
+    food = await db.get(FoodModel, food_id)
+    if not food:
+        raise HTTPException(status_code=404, detail="Food not found")
+    
+    return food
+
 @router.get("/{log_id}", response_model=NutritionLogSchema)
-def get_nutrition_log(log_id: int, user_id: int, db: Session = Depends(get_db)):
-    log = db.query(NutritionLogModel).filter(
+async def get_nutrition_log(log_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+    log = (await db.execute(select(NutritionLogModel).filter(
         NutritionLogModel.id == log_id,
         NutritionLogModel.user_id == user_id
-    ).first()
+    ))).scalars().first()
     
     if not log:
         raise HTTPException(status_code=404, detail="Nutrition log not found")
@@ -93,20 +143,22 @@ def get_nutrition_log(log_id: int, user_id: int, db: Session = Depends(get_db)):
     return log
 
 @router.put("/{log_id}", response_model=NutritionLogSchema)
-def update_nutrition_log(
+async def update_nutrition_log(
     log_id: int,
     log_update: NutritionLogUpdate,
-    user_id: int,
-    db: Session = Depends(get_db)
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db)
 ):
-    log = db.query(NutritionLogModel).filter(
+    log = (await db.execute(select(NutritionLogModel).filter(
         NutritionLogModel.id == log_id,
         NutritionLogModel.user_id == user_id
-    ).first()
+    ))).scalars().first()
     
     if not log:
         raise HTTPException(status_code=404, detail="Nutrition log not found")
     
+    previous_date = log.date
+    
     # Update only provided fields
     update_data = log_update.dict(exclude_unset=True)
     for field, value in update_data.items():
@@ -119,32 +171,42 @@ def update_nutrition_log(
         log.total_carbs = log.carbs * log.quantity
         log.total_fat = log.fat * log.quantity
     
-    db.commit()
-    db.refresh(log)
+    await db.run_sync(refresh_daily_rollups, user_id, [previous_date, log.date])
+    await db.run_sync(lambda session: record_changes(
+        session, user_id, "nutrition", [(log.id, log.client_uuid)]
+    ))
+    await db.commit()
+    await db.refresh(log)
     
     return log
 
 @router.delete("/{log_id}")
-def delete_nutrition_log(log_id: int, user_id: int, db: Session = Depends(get_db)):
-    log = db.query(NutritionLogModel).filter(
+async def delete_nutrition_log(log_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+    log = (await db.execute(select(NutritionLogModel).filter(
         NutritionLogModel.id == log_id,
         NutritionLogModel.user_id == user_id
-    ).first()
+    ))).scalars().first()
     
     if not log:
         raise HTTPException(status_code=404, detail="Nutrition log not found")
     
-    db.delete(log)
-    db.commit()
+    await db.delete(log)
+    await db.run_sync(refresh_daily_rollups, user_id, [log.date])
+    await db.run_sync(lambda session: record_changes(
+        session, user_id, "nutrition", [(log.id, log.client_uuid)], "DELETE"
+    ))
+    await db.commit()
     
     return {"message": "Nutrition log deleted successfully"}
 
 @router.get("/summary/daily/{target_date}")
-def get_daily_nutrition_summary(target_date: date, user_id: int, db: Session = Depends(get_db)):
-    logs = db.query(NutritionLogModel).filter(
+async def get_daily_nutrition_summary(target_date: date, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_read_db)):
+    range_start, range_end = day_bounds(target_date, target_date)
+    logs = (await db.execute(select(NutritionLogModel).filter(
         NutritionLogModel.user_id == user_id,
-        NutritionLogModel.date == target_date
-    ).all()
+        NutritionLogModel.date >= range_start,
+        NutritionLogModel.date < range_end
+    ))).scalars().all()
     
     total_calories = sum(log.total_calories for log in logs)
     total_protein = sum(log.total_protein for log in logs)
@@ -1,47 +1,46 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.auth import ActiveUser, create_access_token, get_current_user_id, user_cache
 from app.db import get_db
+from app.response_cache import invalidate_user
 from app.models import User as UserModel
+from app.passwords import hash_password_async, verify_password_async
 from app.schemas import UserCreate, User as UserSchema, UserUpdate, UserLogin
-from passlib.context import CryptContext
 from typing import List
+import logging
 
-router = APIRouter()
-
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
+router = APIRouter()
 
 @router.post("/register", response_model=UserSchema)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    print(f"Registration attempt for email: {user.email}, username: {user.username}")
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    logger.info("Registration attempt for email: %s, username: %s", user.email, user.username)
     
     # Check if user already exists
-    db_user = db.query(UserModel).filter(UserModel.email == user.email).first()
+    db_user = (await db.execute(select(UserModel).filter(UserModel.email == user.email))).scalars().first()
     if db_user:
-        print(f"Registration failed: Email {user.email} already exists")
+        logger.info("Registration failed: Email %s already exists", user.email)
         raise HTTPException(
             status_code=400,
             detail="Email already registered"
         )
     
     # Check if username already exists
-    db_user = db.query(UserModel).filter(UserModel.username == user.username).first()
+    db_user = (await db.execute(select(UserModel).filter(UserModel.username == user.username))).scalars().first()
     if db_user:
-        print(f"Registration failed: Username {user.username} already taken")
+        logger.info("Registration failed: Username %s already taken", user.username)
         raise HTTPException(
             status_code=400,
             detail="Username already taken"
         )
     
     # Create new user
-    print(f"Creating new user: {user.email}")
-    hashed_password = get_password_hash(user.password)
+    logger.info("Creating new user: %s", user.email)
+    # Return the pooled connection while waiting on the hashing pool
+    await db.close()
+    hashed_password = await hash_password_async(user.password)
     db_user = UserModel(
         email=user.email,
         username=user.username,
@@ -54,43 +53,45 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
-    print(f"User created successfully with ID: {db_user.id}")
+    logger.info("User created successfully with ID: %s", db_user.id)
     return db_user
 
 @router.post("/login")
-def login_user(login_data: UserLogin, db: Session = Depends(get_db)):
-    print(f"Login attempt for email: {login_data.email}")
+async def login_user(login_data: UserLogin, db: AsyncSession = Depends(get_db)):
+    logger.info("Login attempt for email: %s", login_data.email)
     
     # Find user by email
-    user = db.query(UserModel).filter(UserModel.email == login_data.email).first()
+    user = (await db.execute(select(UserModel).filter(UserModel.email == login_data.email))).scalars().first()
     if not user:
-        print(f"Login failed: User not found for email {login_data.email}")
+        logger.info("Login failed: User not found for email %s", login_data.email)
         raise HTTPException(
             status_code=401,
             detail="Invalid email or password"
         )
     
-    # Verify password
-    if not verify_password(login_data.password, user.hashed_password):
-        print(f"Login failed: Invalid password for email {login_data.email}")
+    # Verify password; the loaded user stays usable after the session is closed
+    await db.close()
+    if not await verify_password_async(login_data.password, user.hashed_password):
+        logger.info("Login failed: Invalid password for email %s", login_data.email)
         raise HTTPException(
             status_code=401,
             detail="Invalid email or password"
         )
     
-    print(f"Login successful for user: {user.email}")
-    # Return user data and a simple token (in production, use JWT)
+    logger.info("Login successful for user: %s", user.email)
+    user_cache.put(ActiveUser.from_model(user))
     return {
         "user": user,
-        "token": f"token_{user.id}_{user.email}"  # Simple token for now
+        "token": create_access_token(user.id),
+        "token_type": "bearer"
     }
 
 @router.get("/me", response_model=UserSchema)
-def get_current_user(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(UserModel).filter(UserModel.id == user_id).first()
+async def get_current_user(user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+    user = await db.get(UserModel, user_id)
     if not user:
         raise HTTPException(
             status_code=404,
@@ -99,8 +100,8 @@ def get_current_user(user_id: int, db: Session = Depends(get_db)):
     return user
 
 @router.put("/me", response_model=UserSchema)
-def update_user(user_id: int, user_update: UserUpdate, db: Session = Depends(get_db)):
-    user = db.query(UserModel).filter(UserModel.id == user_id).first()
+async def update_user(user_update: UserUpdate, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+    user = await db.get(UserModel, user_id)
     if not user:
         raise HTTPException(
             status_code=404,
@@ -112,21 +113,24 @@ def update_user(user_id: int, user_update: UserUpdate, db: Session = Depends(get
     for field, value in update_data.items():
         setattr(user, field, value)
     
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    user_cache.invalidate(user_id)
     
     return user
 
 @router.delete("/me")
-def delete_user(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(UserModel).filter(UserModel.id == user_id).first()
+async def delete_user(user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+    user = await db.get(UserModel, user_id)
     if not user:
         raise HTTPException(
             status_code=404,
             detail="User not found"
         )
     
-    db.delete(user)
-    db.commit()
+    await db.delete(user)
+    await db.commit()
+    user_cache.invalidate(user_id)
+    invalidate_user(user_id)
     
     return {"message": "User deleted successfully"}
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List, Dict, Any
-from datetime import datetime
+from datetime import datetime, date
 
 # User schemas
 class UserBase(BaseModel):
@@ -74,11 +74,65 @@ class Workout(WorkoutBase):
     id: int
     user_id: int
     created_at: datetime
+    updated_at: Optional[datetime] = None
+    client_uuid: Optional[str] = None
     exercises: List[Exercise] = []
     
     class Config:
         from_attributes = True
 
+# Exercise progress schemas
+class PersonalRecord(BaseModel):
+    exercise_name: str
+    best_weight: Optional[float] = None
+    best_weight_date: Optional[date] = None
+    best_one_rep_max: Optional[float] = None
+    best_one_rep_max_date: Optional[date] = None
+    best_volume: Optional[float] = None
+    best_volume_date: Optional[date] = None
+    best_distance: Optional[float] = None
+    best_distance_date: Optional[date] = None
+    session_count: int = 0
+    first_performed: Optional[date] = None
+    last_performed: Optional[date] = None
+    
+    class Config:
+        from_attributes = True
+
+class ExerciseProgressEntry(BaseModel):
+    workout_id: int
+    date: datetime
+    sets: int
+    reps: Optional[int] = None
+    weight: Optional[float] = None
+    duration_seconds: Optional[int] = None
+    distance: Optional[float] = None
+    estimated_one_rep_max: Optional[float] = None
+    volume: Optional[float] = None
+
+class ExerciseProgress(BaseModel):
+    exercise_name: str
+    record: Optional[PersonalRecord] = None
+    history: List[ExerciseProgressEntry] = []
+
+# Exercise catalog schemas
+class ExerciseCatalogEntry(BaseModel):
+    id: int
+    slug: str
+    name: str
+    category: str
+    equipment: Optional[str] = None
+    difficulty: Optional[str] = None
+    muscle_groups: List[str] = []
+    description: Optional[str] = None
+    instructions: List[str] = []
+    
+    class Config:
+        from_attributes = True
+
+class ExerciseSearchResult(ExerciseCatalogEntry):
+    times_logged: int = 0  # days the user has logged this exercise
+
 # Nutrition schemas
 class NutritionLogBase(BaseModel):
     date: datetime
@@ -96,7 +150,11 @@ class NutritionLogBase(BaseModel):
     notes: Optional[str] = None
 
 class NutritionLogCreate(NutritionLogBase):
-    pass
+    # With a food_id, omitted name, unit and nutrient values come from the catalog
+    food_id: Optional[int] = None
+    food_name: Optional[str] = None
+    unit: Optional[str] = None
+    calories: Optional[float] = None
 
 class NutritionLogUpdate(BaseModel):
     quantity: Optional[float] = None
@@ -110,10 +168,33 @@ class NutritionLog(NutritionLogBase):
     total_carbs: float
     total_fat: float
     created_at: datetime
+    updated_at: Optional[datetime] = None
+    client_uuid: Optional[str] = None
+    food_id: Optional[int] = None
     
     class Config:
         from_attributes = True
 
+class Food(BaseModel):
+    id: int
+    name: str
+    brand: str = ""
+    category: Optional[str] = None
+    unit: str
+    calories: float
+    protein: float = 0
+    carbs: float = 0
+    fat: float = 0
+    fiber: float = 0
+    sugar: float = 0
+    sodium: float = 0
+    
+    class Config:
+        from_attributes = True
+
+class FoodSearchResult(Food):
+    recent: bool = False  # among the user's recently logged foods
+
 # Body stats schemas
 class BodyStatBase(BaseModel):
     date: datetime
@@ -151,6 +232,8 @@ class BodyStat(BodyStatBase):
     id: int
     user_id: int
     created_at: datetime
+    updated_at: Optional[datetime] = None
+    client_uuid: Optional[str] = None
     
     class Config:
         from_attributes = True
@@ -184,6 +267,7 @@ class SyncItem(BaseModel):
     table: str
     record_id: str
     operation: str
+    server_id: Optional[int] = None
 
 class FailedItem(BaseModel):
     table: str
@@ -196,8 +280,37 @@ class SyncResponse(BaseModel):
     failed_count: int
     synced_items: List[SyncItem]
     failed_items: List[FailedItem]
+    id_map: Dict[str, Dict[str, int]] = {}  # table -> local_id -> server id
     sync_timestamp: str
 
+class SyncChunkResult(BaseModel):
+    chunk: int
+    synced_count: int
+    failed_count: int
+    synced_items: List[SyncItem]
+    failed_items: List[FailedItem]
+    id_map: Dict[str, Dict[str, int]] = {}
+
+class SyncStreamSummary(BaseModel):
+    done: bool = True
+    chunks: int
+    synced_count: int
+    failed_count: int
+    sync_timestamp: str
+
+class ChangeItem(BaseModel):
+    cursor: int
+    table: str
+    operation: str  # UPSERT or DELETE
+    record_id: int
+    client_uuid: Optional[str] = None
+    data: Optional[Dict[str, Any]] = None
+
+class ChangesResponse(BaseModel):
+    changes: List[ChangeItem]
+    next_cursor: int
+    has_more: bool
+
 class SyncStatusResponse(BaseModel):
     user_id: int
     total_records: int
@@ -206,3 +319,91 @@ class SyncStatusResponse(BaseModel):
     body_stat_count: int
     last_sync_time: Optional[str] = None
     sync_healthy: bool
+
+# Copy-day and template schemas
+class CopyDayRequest(BaseModel):
+    source_date: date
+    target_date: date
+    tables: List[str] = ["workouts", "nutrition"]  # any of workouts, nutrition, body_stats
+    meal_types: Optional[List[str]] = None  # copy only these meals
+
+class LogCopyResult(BaseModel):
+    copied: Dict[str, int] = {}  # table -> rows created
+    ids: Dict[str, List[int]] = {}  # table -> server ids of the new rows
+
+class MealTemplateItemCreate(BaseModel):
+    # With a food_id, omitted name, unit and nutrient values come from the catalog
+    food_id: Optional[int] = None
+    food_name: Optional[str] = None
+    quantity: float = 1
+    unit: Optional[str] = None
+    calories: Optional[float] = None
+    protein: float = 0
+    carbs: float = 0
+    fat: float = 0
+    fiber: float = 0
+    sugar: float = 0
+    sodium: float = 0
+    notes: Optional[str] = None
+
+class MealTemplateItem(BaseModel):
+    id: int
+    food_id: Optional[int] = None
+    food_name: str
+    quantity: float
+    unit: str
+    calories: float
+    protein: float = 0
+    carbs: float = 0
+    fat: float = 0
+    fiber: float = 0
+    sugar: float = 0
+    sodium: float = 0
+    notes: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+class MealTemplateCreate(BaseModel):
+    name: str
+    meal_type: str
+    items: List[MealTemplateItemCreate] = []
+    source_date: Optional[date] = None  # save that day's meal_type entries instead of items
+
+class MealTemplate(BaseModel):
+    id: int
+    name: str
+    meal_type: str
+    created_at: datetime
+    items: List[MealTemplateItem] = []
+    
+    class Config:
+        from_attributes = True
+
+class RoutineTemplateExercise(ExerciseBase):
+    id: int
+    
+    class Config:
+        from_attributes = True
+
+class RoutineTemplateCreate(BaseModel):
+    name: str
+    duration_minutes: Optional[int] = None
+    notes: Optional[str] = None
+    exercises: List[ExerciseCreate] = []
+    source_workout_id: Optional[int] = None  # save that workout's exercises instead
+
+class RoutineTemplate(BaseModel):
+    id: int
+    name: str
+    duration_minutes: Optional[int] = None
+    notes: Optional[str] = None
+    created_at: datetime
+    exercises: List[RoutineTemplateExercise] = []
+    
+    class Config:
+        from_attributes = True
+
+class TemplateApply(BaseModel):
+    date: datetime
+    meal_type: Optional[str] = None  # meal templates: log under another meal
@@ -0,0 +1,257 @@
+"""
+In-memory typeahead index shared by the food and exercise catalogs.
+
+TokenIndex keeps the normalized words of every row's name and extra text
+(brand, muscle groups, ...) in memory. A query is split into the same
+words and each one is matched as a prefix of the sorted vocabulary with
+two bisects. A word with no prefix match falls back to the vocabulary
+words sharing most of its trigrams, which absorbs typos. Posting lists
+hold rows by static rank (shortest name first), so candidates come out
+best-first and a search stops after a few times `limit` of them instead of
+scoring every row under a one-letter prefix.
+
+CatalogCache holds an index (or anything else derived from a catalog
+table) per process and rebuilds it when the table's version changes,
+checked at most once per TTL.
+"""
+import heapq
+import re
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+from typing import Any, Callable, Dict, Generic, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, TypeVar
+
+from sqlalchemy.orm import Session
+
+# Candidates collected per requested result before the final ordering
+CANDIDATES_PER_RESULT = 4
+
+# Prefixes this short match large parts of the vocabulary; their merged
+# posting lists are kept once computed
+SHORT_PREFIX_LENGTH = 2
+
+# Prefixes expanding to at most this many vocabulary words are matched
+# against a row's words with a set lookup instead of startswith
+PREFIX_WORD_SET_SIZE = 256
+
+# Dice similarity over trigrams for a vocabulary word to count as a typo match
+FUZZY_MIN_SIMILARITY = 0.5
+FUZZY_MAX_WORDS = 20
+
+T = TypeVar("T")
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize_words(text: Optional[str]) -> List[str]:
+    """Lowercase alphanumeric words of the text with accents stripped"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _WORD.findall(stripped.lower())
+
+
+def _trigrams(word: str) -> Set[str]:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _unique(ranks: Iterable[int]) -> Iterator[int]:
+    previous = None
+    for rank in ranks:
+        if rank != previous:
+            yield rank
+            previous = rank
+
+
+class _Term:
+    """One query word resolved against the vocabulary"""
+
+    def __init__(self, size: int, ranks: Callable[[], Iterator[int]], matches: Callable[[Sequence[str]], bool],
+                 word: str, fuzzy: bool):
+        self.size = size  # upper bound on the rows it matches
+        self.ranks = ranks  # matching row ranks, ascending
+        self.matches = matches  # whether a row's words satisfy it
+        self.word = word
+        self.fuzzy = fuzzy
+
+
+class TokenIndex:
+    """In-memory prefix and typo-tolerant search over (id, name, extra text) rows"""
+
+    def __init__(self, rows: Iterable[Tuple[int, str, Optional[str]]]):
+        ordered = sorted(rows, key=lambda row: (len(row[1]), row[1].lower(), row[0]))
+        self.ids = [row_id for row_id, _, _ in ordered]
+        self._ranks = {row_id: rank for rank, row_id in enumerate(self.ids)}
+        self._names: List[str] = []
+        self._words: List[Tuple[str, ...]] = []
+
+        postings: Dict[str, List[int]] = {}
+        for rank, (_, name, extra) in enumerate(ordered):
+            name_words = normalize_words(name)
+            words = tuple(dict.fromkeys(name_words + normalize_words(extra)))
+            self._names.append(" ".join(name_words))
+            self._words.append(words)
+            for word in words:
+                postings.setdefault(word, []).append(rank)
+
+        self._vocabulary = sorted(postings)
+        self._postings = [postings[word] for word in self._vocabulary]
+        self._trigram_words: Dict[str, List[int]] = {}
+        for position, word in enumerate(self._vocabulary):
+            for trigram in _trigrams(word):
+                self._trigram_words.setdefault(trigram, []).append(position)
+        self._prefix_ranks: Dict[str, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _prefix_term(self, prefix: str) -> Optional[_Term]:
+        lo = bisect_left(self._vocabulary, prefix)
+        hi = bisect_left(self._vocabulary, prefix + "\uffff", lo)
+        if lo == hi:
+            return None
+
+        if hi - lo <= PREFIX_WORD_SET_SIZE:
+            expansions = frozenset(self._vocabulary[lo:hi])
+
+            def matches(words: Sequence[str]) -> bool:
+                return not expansions.isdisjoint(words)
+        else:
+            def matches(words: Sequence[str]) -> bool:
+                return any(word.startswith(prefix) for word in words)
+
+        if hi - lo == 1:
+            ranks = self._postings[lo]
+            return _Term(len(ranks), lambda: iter(ranks), matches, prefix, False)
+        if len(prefix) <= SHORT_PREFIX_LENGTH:
+            ranks = self._prefix_ranks.get(prefix)
+            if ranks is None:
+                ranks = self._prefix_ranks[prefix] = sorted(set().union(*self._postings[lo:hi]))
+            return _Term(len(ranks), lambda: iter(ranks), matches, prefix, False)
+
+        lists = self._postings[lo:hi]
+        return _Term(sum(map(len, lists)), lambda: _unique(heapq.merge(*lists)), matches, prefix, False)
+
+    def _fuzzy_term(self, word: str) -> Optional[_Term]:
+        if len(word) < 3:
+            return None
+        trigrams = _trigrams(word)
+        shared = Counter()
+        for trigram in trigrams:
+            shared.update(self._trigram_words.get(trigram, ()))
+
+        # A padded word of n characters has n + 1 trigrams
+        scored = []
+        for position, count in shared.items():
+            similarity = 2 * count / (len(trigrams) + len(self._vocabulary[position]) + 1)
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                scored.append((similarity, position))
+        if not scored:
+            return None
+
+        positions = [position for _, position in heapq.nlargest(FUZZY_MAX_WORDS, scored)]
+        similar = {self._vocabulary[position] for position in positions}
+        lists = [self._postings[position] for position in positions]
+
+        def matches(words: Sequence[str]) -> bool:
+            return not similar.isdisjoint(words)
+
+        return _Term(sum(map(len, lists)), lambda: _unique(heapq.merge(*lists)), matches, word, True)
+
+    def search(self, query: str, limit: int = 10, preferred: Sequence[int] = ()) -> List[Tuple[int, bool]]:
+        """
+        Ids of the best matches for the query as (id, preferred).
+
+        Every query word has to match a word of the row's name or extra
+        text. Matching rows from preferred come first, in the given order; the
+        rest rank whole-name prefix matches, then exact word matches, then
+        shorter names first, with typo matches after prefix matches.
+        """
+        words = normalize_words(query)
+        if not words or limit <= 0:
+            return []
+
+        terms = []
+        for word in dict.fromkeys(words):
+            term = self._prefix_term(word) or self._fuzzy_term(word)
+            if term is None:
+                return []
+            terms.append(term)
+
+        def matches_all(rank: int) -> bool:
+            row_words = self._words[rank]
+            return all(term.matches(row_words) for term in terms)
+
+        results: List[Tuple[int, bool]] = []
+        preferred_ranks = set()
+        for row_id in preferred:
+            rank = self._ranks.get(row_id)
+            if rank is not None and rank not in preferred_ranks and matches_all(rank):
+                results.append((row_id, True))
+                preferred_ranks.add(rank)
+                if len(results) == limit:
+                    return results
+
+        # Walk the rarest term's rows in rank order, checking the others
+        terms.sort(key=lambda term: term.size)
+        others = terms[1:]
+        wanted = (limit - len(results)) * CANDIDATES_PER_RESULT
+        candidates = []
+        for rank in terms[0].ranks():
+            if rank in preferred_ranks:
+                continue
+            row_words = self._words[rank]
+            if all(term.matches(row_words) for term in others):
+                candidates.append(rank)
+                if len(candidates) == wanted:
+                    break
+
+        phrase = " ".join(words)
+
+        def ordering(rank: int):
+            row_words = self._words[rank]
+            exact = sum(1 for term in terms if not term.fuzzy and term.word in row_words)
+            fuzzy = sum(1 for term in terms if term.fuzzy)
+            return (not self._names[rank].startswith(phrase), fuzzy, -exact, rank)
+
+        candidates.sort(key=ordering)
+        results.extend((self.ids[rank], False) for rank in candidates[:limit - len(results)])
+        return results
+
+
+class CatalogCache(Generic[T]):
+    """
+    A value built from a catalog table, shared by the whole process.
+
+    build(db) produces the value and version(db) a cheap fingerprint of the
+    table. The fingerprint is compared at most every ttl_seconds and the
+    value rebuilt when it differs; invalidate() forces a rebuild after an
+    in-process write.
+    """
+
+    def __init__(self, build: Callable[[Session], T], version: Callable[[Session], Any], ttl_seconds: float):
+        self._build = build
+        self._version = version
+        self.ttl_seconds = ttl_seconds
+        self._value: Optional[T] = None
+        self._built_version: Any = None
+        self._checked_at = 0.0
+
+    def get(self, db: Session) -> T:
+        # No lock: under run_sync, waiting on one would block the event loop,
+        # and two concurrent rebuilds produce the same value
+        now = time.monotonic()
+        if self._value is not None and now - self._checked_at < self.ttl_seconds:
+            return self._value
+
+        version = self._version(db)
+        if self._value is None or version != self._built_version:
+            self._value = self._build(db)
+            self._built_version = version
+        self._checked_at = now
+        return self._value
+
+    def invalidate(self):
+        self._value = None
+        self._built_version = None
@@ -0,0 +1,118 @@
+"""
+Consistency streak tracking.
+
+daily_rollups already materializes the union of days with nutrition, workout
+or body stat entries, so a user's full list of active days is one indexed
+query. The user_streaks row caches the result and is advanced incrementally
+as new days become active.
+"""
+from datetime import date, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .models import DailyRollup, UserStreak
+
+
+def get_active_days(db: Session, user_id: int) -> List[date]:
+    """Return every day with logged activity for the user, oldest first"""
+    rows = db.query(DailyRollup.day).filter(
+        DailyRollup.user_id == user_id,
+        DailyRollup.has_activity.is_(True)
+    ).order_by(DailyRollup.day.asc()).all()
+    return [row.day for row in rows]
+
+
+def compute_streaks(active_days: Iterable[date]) -> Tuple[int, int, Optional[date]]:
+    """
+    Walk sorted active days once.
+
+    Returns (length of the run ending on the last active day, longest run,
+    last active day).
+    """
+    current = 0
+    longest = 0
+    previous = None
+    for day in active_days:
+        if previous is not None and day == previous + timedelta(days=1):
+            current += 1
+        elif day != previous:
+            current = 1
+        longest = max(longest, current)
+        previous = day
+    return current, longest, previous
+
+
+def streak_as_of(active_days: Iterable[date], today: date) -> int:
+    """Length of the run of active days ending on today (0 if today is inactive)"""
+    run_length, _, last_day = compute_streaks(day for day in active_days if day <= today)
+    return run_length if last_day == today else 0
+
+
+def get_streak_status(db: Session, user_id: int, today: date) -> Tuple[int, int, Optional[date]]:
+    """
+    Return (current streak as of today, longest streak, last active day).
+
+    Reads the persisted streak row, falling back to one query over the active
+    days when it is missing or ahead of today.
+    """
+    streak = db.get(UserStreak, user_id)
+    if streak is None or (streak.last_active_day and streak.last_active_day > today):
+        active_days = get_active_days(db, user_id)
+        _, longest_streak, last_active_day = compute_streaks(active_days)
+        return streak_as_of(active_days, today), longest_streak, last_active_day
+
+    last_active_day = streak.last_active_day
+    current_streak = streak.current_streak if last_active_day == today else 0
+    return current_streak, streak.longest_streak or 0, last_active_day
+
+
+def recompute_user_streak(db: Session, user_id: int) -> UserStreak:
+    """Rebuild the persisted streak row from the user's active days"""
+    current, longest, last_day = compute_streaks(get_active_days(db, user_id))
+
+    streak = db.get(UserStreak, user_id)
+    if not streak:
+        streak = UserStreak(user_id=user_id)
+        db.add(streak)
+
+    streak.current_streak = current
+    streak.longest_streak = longest
+    streak.last_active_day = last_day
+    return streak
+
+
+def update_user_streak(
+    db: Session,
+    user_id: int,
+    activated: Iterable[date],
+    deactivated: Iterable[date]
+) -> None:
+    """
+    Apply day-level activity changes to the persisted streak.
+
+    New days at the end of the history extend or restart the current run
+    without touching the rollup table. Removed or back-dated days can merge
+    or split runs, so those fall back to a full recompute.
+    """
+    activated = sorted(set(activated))
+    deactivated = set(deactivated)
+    if not activated and not deactivated:
+        return
+
+    streak = db.get(UserStreak, user_id)
+    if (
+        streak is None
+        or deactivated
+        or (streak.last_active_day is not None and activated[0] <= streak.last_active_day)
+    ):
+        recompute_user_streak(db, user_id)
+        return
+
+    for day in activated:
+        if streak.last_active_day is not None and day == streak.last_active_day + timedelta(days=1):
+            streak.current_streak = (streak.current_streak or 0) + 1
+        else:
+            streak.current_streak = 1
+        streak.longest_streak = max(streak.longest_streak or 0, streak.current_streak)
+        streak.last_active_day = day
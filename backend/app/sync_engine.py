@@ -0,0 +1,563 @@
+"""
+Batch sync pipeline used by the /sync routes.
+
+apply_sync_batch() groups the items of a sync request by table and
+operation. INSERTs go out as one multi-row statement per table, UPDATE and
+DELETE targets are resolved with one IN lookup per table, and the affected
+rollup days and personal records are refreshed once at the end.
+
+Items carrying a client_uuid are idempotent. INSERTs whose client_uuid is
+already stored for the user are no-ops, new ones are written with
+INSERT ... ON CONFLICT DO NOTHING (a row a concurrent sync stored first is
+mapped to, never duplicated), and UPDATE/DELETE address records by client_uuid
+instead of by server primary key. Every applied item reports the server id
+it maps to.
+
+Nutrition INSERTs may carry a food_id instead of their own name, unit and
+nutrient values; the referenced catalog foods are loaded with one query
+per batch and fill in whatever the item leaves out.
+
+Every group runs inside a SAVEPOINT. If a group fails, its items are
+replayed one SAVEPOINT at a time so that only the offending items end up in
+failed_items. The caller commits the whole batch once.
+
+stream_sync_chunks() feeds the same pipeline from a newline-delimited JSON
+body, committing every SYNC_CHUNK_SIZE rows, so memory stays bounded by the
+chunk size rather than by the size of the backlog.
+"""
+import json
+from datetime import date
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .models import Workout, Exercise, NutritionLog, BodyStat
+from .schemas import (
+    WorkoutBase, WorkoutCreate,
+    NutritionLogBase, NutritionLogCreate,
+    BodyStatBase, BodyStatCreate,
+)
+from .rollups import refresh_daily_rollups
+from .records import refresh_personal_records
+from .changes import record_changes
+from .foods import fill_from_food, load_foods
+
+# table name in the sync payload -> (model, insert schema, update schema)
+SYNC_TABLES = {
+    "workouts": (Workout, WorkoutCreate, WorkoutBase),
+    "nutrition": (NutritionLog, NutritionLogCreate, NutritionLogBase),
+    "body_stats": (BodyStat, BodyStatCreate, BodyStatBase),
+}
+
+SYNC_OPERATIONS = ("INSERT", "UPDATE", "DELETE")
+
+# rows applied and committed per transaction by the streaming endpoint
+SYNC_CHUNK_SIZE = 1000
+
+SyncItemData = Dict[str, Any]
+
+# id(item) -> server primary key, filled in as items are applied
+ServerIds = Dict[int, int]
+
+
+def _record_id(item: SyncItemData) -> str:
+    local_id = item.get("local_id")
+    return str(local_id) if local_id is not None else ""
+
+
+def _synced(table_name: str, item: SyncItemData, server_id: Optional[int]) -> Dict[str, Any]:
+    return {
+        "table": table_name,
+        "record_id": _record_id(item),
+        "operation": item.get("operation", "INSERT"),
+        "server_id": server_id
+    }
+
+
+def _failed(table_name: str, item: SyncItemData, error: str) -> Dict[str, str]:
+    return {
+        "table": table_name,
+        "record_id": _record_id(item),
+        "error": error
+    }
+
+
+def _client_uuid(item: SyncItemData) -> Optional[str]:
+    client_uuid = item.get("client_uuid")
+    return str(client_uuid) if client_uuid else None
+
+
+def _target_key(item: SyncItemData) -> Tuple[str, Any]:
+    """
+    Key of the record addressed by an UPDATE or DELETE item.
+
+    Prefers the client_uuid, then an explicit server_id. Payloads without
+    either fall back to treating local_id as the server primary key.
+    """
+    client_uuid = _client_uuid(item)
+    if client_uuid:
+        return "client_uuid", client_uuid
+
+    server_id = item.get("server_id", item.get("local_id"))
+    try:
+        return "id", int(server_id)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid record id: {server_id!r}")
+
+
+def _load_targets(db: Session, user_id: int, model, keys: List[Tuple[str, Any]], columns=None) -> Dict:
+    """Fetch the addressed records with at most one IN lookup per key kind"""
+    entities = columns or [model]
+    found = {}
+    for kind, column in (("id", model.id), ("client_uuid", model.client_uuid)):
+        values = {value for key_kind, value in keys if key_kind == kind}
+        if not values:
+            continue
+        for record in db.query(*entities).filter(model.user_id == user_id, column.in_(values)).all():
+            found[(kind, getattr(record, kind))] = record
+    return found
+
+
+def _insert_new(db: Session, model):
+    """INSERT ... ON CONFLICT (user_id, client_uuid) DO NOTHING for the bound dialect"""
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(model).on_conflict_do_nothing(
+        index_elements=[model.user_id, model.client_uuid]
+    )
+
+
+def _apply_nutrition_totals(values: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill in the per-entry totals the same way the nutrition route does"""
+    values["total_calories"] = values["calories"] * values["quantity"]
+    values["total_protein"] = values["protein"] * values["quantity"]
+    values["total_carbs"] = values["carbs"] * values["quantity"]
+    values["total_fat"] = values["fat"] * values["quantity"]
+    return values
+
+
+def _run_in_savepoints(
+    db: Session,
+    items: List[SyncItemData],
+    apply: Callable[[List[SyncItemData]], List[date]],
+    publish: Callable[[List[SyncItemData]], None]
+) -> Tuple[List[SyncItemData], List[Tuple[SyncItemData, str]], List[date]]:
+    """
+    Apply a group of items in one SAVEPOINT, replaying them one by one on failure.
+
+    apply() only stages the server ids it produces; publish() is called with
+    the items whose SAVEPOINT was released, so ids from a rolled-back group
+    never reach the id maps.
+
+    Returns the items that were applied, (item, error) pairs for the ones that
+    were rolled back, and the days touched by the applied items.
+    """
+    try:
+        with db.begin_nested():
+            days = apply(items)
+    except Exception:
+        pass
+    else:
+        publish(items)
+        return items, [], days
+
+    applied, errors, days = [], [], []
+    for item in items:
+        try:
+            with db.begin_nested():
+                item_days = apply([item])
+        except Exception as e:
+            errors.append((item, str(e)))
+            continue
+        publish([item])
+        days.extend(item_days)
+        applied.append(item)
+    return applied, errors, days
+
+
+def _insert_items(db: Session, user_id: int, table_name: str, items: List[SyncItemData], server_ids: ServerIds):
+    model, create_schema, _ = SYNC_TABLES[table_name]
+
+    # Validate up front so bad payloads never reach the database
+    parsed_items, errors = [], []
+    for item in items:
+        try:
+            parsed_items.append((item, create_schema(**item)))
+        except Exception as e:
+            errors.append((item, str(e)))
+
+    # Catalog foods referenced by nutrition entries, in one query
+    foods = load_foods(db, [
+        parsed.food_id for _, parsed in parsed_items if getattr(parsed, "food_id", None) is not None
+    ]) if model is NutritionLog else {}
+
+    prepared = []
+    for item, parsed in parsed_items:
+        values = parsed.dict(exclude={"exercises"})
+        values["user_id"] = user_id
+        values["client_uuid"] = _client_uuid(item)
+        if model is NutritionLog:
+            try:
+                if parsed.food_id is not None and parsed.food_id not in foods:
+                    raise ValueError(f"Unknown food_id: {parsed.food_id}")
+                fill_from_food(values, parsed.model_fields_set, foods.get(parsed.food_id))
+            except ValueError as e:
+                errors.append((item, str(e)))
+                continue
+            _apply_nutrition_totals(values)
+        exercises = [exercise.dict() for exercise in getattr(parsed, "exercises", [])]
+        prepared.append((item, values, exercises))
+
+    # Replays: client_uuids already stored (or repeated in this batch) are no-ops
+    client_uuids = {values["client_uuid"] for _, values, _ in prepared if values["client_uuid"]}
+    existing = {
+        row.client_uuid: row.id for row in db.query(model.client_uuid, model.id).filter(
+            model.user_id == user_id,
+            model.client_uuid.in_(client_uuids)
+        ).all()
+    } if client_uuids else {}
+
+    replays, pending, seen = [], [], set()
+    for item, values, exercises in prepared:
+        client_uuid = values["client_uuid"]
+        if client_uuid and (client_uuid in existing or client_uuid in seen):
+            replays.append(item)
+        else:
+            pending.append((item, values, exercises))
+        if client_uuid:
+            seen.add(client_uuid)
+
+    rows_by_item = {id(item): (values, exercises) for item, values, exercises in pending}
+    staged: ServerIds = {}
+
+    def apply(group: List[SyncItemData]) -> List[date]:
+        keyed = [item for item in group if rows_by_item[id(item)][0]["client_uuid"]]
+        unkeyed = [item for item in group if not rows_by_item[id(item)][0]["client_uuid"]]
+        inserted = []  # (item, new id) for the rows this call created
+
+        if unkeyed:
+            new_ids = db.execute(
+                insert(model).returning(model.id, sort_by_parameter_order=True),
+                [rows_by_item[id(item)][0] for item in unkeyed]
+            ).scalars().all()
+            inserted.extend(zip(unkeyed, new_ids))
+
+        if keyed:
+            # Rows skipped by ON CONFLICT were stored by a concurrent sync
+            # of the same items: map them to that row and leave it (and its
+            # exercises) alone
+            created = dict(db.execute(
+                _insert_new(db, model).returning(model.client_uuid, model.id),
+                [rows_by_item[id(item)][0] for item in keyed]
+            ).all())
+            raced = {
+                rows_by_item[id(item)][0]["client_uuid"] for item in keyed
+            } - set(created)
+            stored = dict(db.query(model.client_uuid, model.id).filter(
+                model.user_id == user_id,
+                model.client_uuid.in_(raced)
+            ).all()) if raced else {}
+            for item in keyed:
+                client_uuid = rows_by_item[id(item)][0]["client_uuid"]
+                if client_uuid in created:
+                    inserted.append((item, created[client_uuid]))
+                else:
+                    staged[id(item)] = stored[client_uuid]
+
+        exercise_rows = [
+            dict(exercise, workout_id=new_id, user_id=user_id)
+            for item, new_id in inserted
+            for exercise in rows_by_item[id(item)][1]
+        ]
+        if exercise_rows:
+            db.execute(insert(Exercise), exercise_rows)
+
+        for item, new_id in inserted:
+            staged[id(item)] = new_id
+        record_changes(db, user_id, table_name, [
+            (new_id, rows_by_item[id(item)][0]["client_uuid"]) for item, new_id in inserted
+        ])
+        return [rows_by_item[id(item)][0]["date"] for item, _ in inserted]
+
+    def publish(group: List[SyncItemData]):
+        for item in group:
+            server_ids[id(item)] = staged[id(item)]
+            client_uuid = rows_by_item[id(item)][0]["client_uuid"]
+            if client_uuid:
+                existing[client_uuid] = staged[id(item)]
+
+    applied, failures, days = _run_in_savepoints(db, [item for item, _, _ in pending], apply, publish)
+
+    # Resolve replays last so duplicates within the batch see the new ids
+    for item in replays:
+        client_uuid = _client_uuid(item)
+        if client_uuid in existing:
+            server_ids[id(item)] = existing[client_uuid]
+            applied.append(item)
+        else:
+            failures.append((item, "Duplicate of a failed item"))
+
+    return applied, errors + failures, days
+
+
+def _update_items(db: Session, user_id: int, table_name: str, items: List[SyncItemData], server_ids: ServerIds):
+    model, _, update_schema = SYNC_TABLES[table_name]
+    fields = list(update_schema.model_fields)
+
+    errors = []
+    targets_by_item = {}
+    for item in items:
+        try:
+            targets_by_item[id(item)] = _target_key(item)
+        except ValueError as e:
+            errors.append((item, str(e)))
+
+    records = _load_targets(db, user_id, model, list(targets_by_item.values()))
+    staged: ServerIds = {}
+
+    def apply(group: List[SyncItemData]) -> List[date]:
+        days = []
+        for item in group:
+            record = records.get(targets_by_item[id(item)])
+            if record is None:
+                raise ValueError("Record not found")
+
+            changes = {field: item[field] for field in fields if field in item}
+            current = {field: getattr(record, field) for field in fields}
+            validated = update_schema(**{**current, **changes})
+
+            days.append(record.date)
+            for field in changes:
+                setattr(record, field, getattr(validated, field))
+            if model is NutritionLog:
+                totals = _apply_nutrition_totals({
+                    column: getattr(record, column)
+                    for column in ("calories", "protein", "carbs", "fat", "quantity")
+                })
+                for column in ("total_calories", "total_protein", "total_carbs", "total_fat"):
+                    setattr(record, column, totals[column])
+            days.append(record.date)
+            staged[id(item)] = record.id
+        db.flush()
+        record_changes(db, user_id, table_name, [
+            (record.id, record.client_uuid) for record in (records[targets_by_item[id(item)]] for item in group)
+        ])
+        return days
+
+    def publish(group: List[SyncItemData]):
+        for item in group:
+            server_ids[id(item)] = staged[id(item)]
+
+    valid_items = [item for item in items if id(item) in targets_by_item]
+    applied, failures, days = _run_in_savepoints(db, valid_items, apply, publish)
+    return applied, errors + failures, days
+
+
+def _delete_items(db: Session, user_id: int, table_name: str, items: List[SyncItemData], server_ids: ServerIds):
+    model, _, _ = SYNC_TABLES[table_name]
+
+    errors = []
+    targets_by_item = {}
+    for item in items:
+        try:
+            targets_by_item[id(item)] = _target_key(item)
+        except ValueError as e:
+            errors.append((item, str(e)))
+
+    records = _load_targets(
+        db, user_id, model, list(targets_by_item.values()),
+        columns=[model.id, model.client_uuid, model.date]
+    )
+    staged: ServerIds = {}
+
+    def apply(group: List[SyncItemData]) -> List[date]:
+        # Records that are already gone count as deleted
+        targets = [records[targets_by_item[id(item)]] for item in group if targets_by_item[id(item)] in records]
+        for item in group:
+            record = records.get(targets_by_item[id(item)])
+            staged[id(item)] = record.id if record else None
+        if not targets:
+            return []
+
+        ids = [record.id for record in targets]
+        if model is Workout:
+            db.query(Exercise).filter(Exercise.workout_id.in_(ids)).delete(synchronize_session=False)
+        db.query(model).filter(model.user_id == user_id, model.id.in_(ids)).delete(synchronize_session=False)
+        record_changes(db, user_id, table_name, [(record.id, record.client_uuid) for record in targets], "DELETE")
+        return [record.date for record in targets]
+
+    def publish(group: List[SyncItemData]):
+        for item in group:
+            server_ids[id(item)] = staged[id(item)]
+
+    valid_items = [item for item in items if id(item) in targets_by_item]
+    applied, failures, days = _run_in_savepoints(db, valid_items, apply, publish)
+    return applied, errors + failures, days
+
+
+def apply_sync_batch(
+    db: Session,
+    user_id: int,
+    data: Dict[str, List[SyncItemData]]
+) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+    """
+    Apply a whole sync payload for one user without committing.
+
+    Returns (synced_items, failed_items) in the SyncResponse format; each
+    synced item carries the server_id it now maps to.
+    """
+    synced_items, failed_items = [], []
+    touched_days: List[date] = []
+    workout_days: List[date] = []
+    server_ids: ServerIds = {}
+
+    handlers = {
+        "INSERT": _insert_items,
+        "UPDATE": _update_items,
+        "DELETE": _delete_items,
+    }
+
+    for table_name, items in data.items():
+        if table_name not in SYNC_TABLES:
+            failed_items.extend(_failed(table_name, item, f"Unknown table: {table_name}") for item in items)
+            continue
+
+        grouped: Dict[str, List[SyncItemData]] = {operation: [] for operation in SYNC_OPERATIONS}
+        for item in items:
+            operation = item.get("operation", "INSERT")
+            if operation not in grouped:
+                failed_items.append(_failed(table_name, item, f"Unknown operation: {operation}"))
+                continue
+            grouped[operation].append(item)
+
+        for operation in SYNC_OPERATIONS:
+            if not grouped[operation]:
+                continue
+            applied, errors, days = handlers[operation](db, user_id, table_name, grouped[operation], server_ids)
+            synced_items.extend(_synced(table_name, item, server_ids.get(id(item))) for item in applied)
+            failed_items.extend(_failed(table_name, item, error) for item, error in errors)
+            touched_days.extend(days)
+            if table_name == "workouts":
+                workout_days.extend(days)
+
+    if touched_days:
+        refresh_daily_rollups(db, user_id, touched_days)
+    if workout_days:
+        refresh_personal_records(db, user_id, workout_days)
+
+    return synced_items, failed_items
+
+
+def build_id_map(synced_items: List[Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
+    """Map client-local ids to server ids so the client can reconcile"""
+    id_map: Dict[str, Dict[str, int]] = {}
+    for item in synced_items:
+        if item["record_id"] and item["server_id"] is not None:
+            id_map.setdefault(item["table"], {})[item["record_id"]] = item["server_id"]
+    return id_map
+
+
+def _parse_ndjson_line(line_no: int, line: bytes) -> Tuple[Optional[SyncItemData], Optional[Dict[str, str]]]:
+    """Decode one NDJSON line into a sync item, or a failed item if it is malformed"""
+    try:
+        item = json.loads(line)
+    except ValueError as e:
+        return None, {"table": "", "record_id": f"line {line_no}", "error": f"Invalid JSON: {e}"}
+
+    if not isinstance(item, dict) or not isinstance(item.get("table"), str):
+        return None, {"table": "", "record_id": f"line {line_no}", "error": "Each line must be an object with a table"}
+    return item, None
+
+
+async def read_ndjson_chunks(
+    stream: AsyncIterator[bytes],
+    chunk_size: int = SYNC_CHUNK_SIZE
+) -> AsyncIterator[Tuple[List[SyncItemData], List[Dict[str, str]]]]:
+    """
+    Group an NDJSON byte stream into chunks of at most chunk_size lines.
+
+    Yields (items, parse_errors) per chunk; blank lines are skipped. Only the
+    current chunk and one partial line are held in memory.
+    """
+    buffer = b""
+    line_no = 0
+    items: List[SyncItemData] = []
+    errors: List[Dict[str, str]] = []
+
+    async def lines():
+        nonlocal buffer
+        async for block in stream:
+            buffer += block
+            *complete, buffer = buffer.split(b"\n")
+            for line in complete:
+                yield line
+        if buffer:
+            yield buffer
+
+    async for line in lines():
+        line_no += 1
+        if not line.strip():
+            continue
+        item, error = _parse_ndjson_line(line_no, line)
+        if error:
+            errors.append(error)
+        else:
+            items.append(item)
+        if len(items) + len(errors) >= chunk_size:
+            yield items, errors
+            items, errors = [], []
+
+    if items or errors:
+        yield items, errors
+
+
+async def _apply_chunk(session_factory, user_id: int, items: List[SyncItemData]):
+    """Apply and commit one chunk in its own async session and transaction"""
+    data: Dict[str, List[SyncItemData]] = {}
+    for item in items:
+        data.setdefault(item.pop("table"), []).append(item)
+
+    async with session_factory() as db:
+        try:
+            synced_items, failed_items = await db.run_sync(apply_sync_batch, user_id, data)
+            await db.commit()
+            return synced_items, failed_items
+        except Exception as e:
+            await db.rollback()
+            return [], [
+                _failed(table_name, item, f"Chunk failed: {str(e)}")
+                for table_name, table_items in data.items()
+                for item in table_items
+            ]
+
+
+async def stream_sync_chunks(
+    session_factory,
+    user_id: int,
+    stream: AsyncIterator[bytes],
+    chunk_size: int = SYNC_CHUNK_SIZE
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Apply an NDJSON sync body chunk by chunk, yielding each chunk's result.
+
+    Every chunk is committed before the next one is read, so a dropped
+    connection keeps the chunks already reported. session_factory must
+    produce AsyncSessions.
+    """
+    chunk_no = 0
+    async for items, parse_errors in read_ndjson_chunks(stream, chunk_size):
+        chunk_no += 1
+        synced_items, failed_items = [], []
+        if items:
+            synced_items, failed_items = await _apply_chunk(session_factory, user_id, items)
+
+        yield {
+            "chunk": chunk_no,
+            "synced_count": len(synced_items),
+            "failed_count": len(failed_items) + len(parse_errors),
+            "synced_items": synced_items,
+            "failed_items": parse_errors + failed_items,
+            "id_map": build_id_map(synced_items),
+        }
@@ -0,0 +1,218 @@
+"""
+Vectorized time-series analytics over the daily rollups.
+
+get_trends() loads a user's calories and weigh-ins for the window (plus a
+warm-up period so the rolling windows and the smoothed weight are settled
+on the first day) in one query against daily_rollups, lays them out as
+NumPy arrays indexed by calendar day and hands them to compute_trends().
+
+Days without a nutrition log or a weigh-in are NaN rather than zero, so the
+rolling means average only the days that were logged, and the weight trend
+carries the last weigh-in forward.
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from .models import DailyRollup
+
+ROLLING_WINDOWS = (7, 30)
+
+# Smoothing factor of the exponentially weighted weight trend (0 < alpha <= 1)
+WEIGHT_TREND_ALPHA = 0.1
+
+# Energy stored in one kilogram of body mass, and the window the adaptive
+# TDEE balances intake against the weight trend over
+KCAL_PER_KG = 7700
+TDEE_WINDOW_DAYS = 28
+
+# Share of the TDEE window that needs a nutrition log for an estimate
+TDEE_MIN_LOGGED_FRACTION = 0.5
+
+WARMUP_DAYS = max(ROLLING_WINDOWS + (TDEE_WINDOW_DAYS,))
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over the last window days, skipping NaNs; NaN if none were logged"""
+    valid = ~np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(valid)))
+    ends = np.arange(1, len(values) + 1)
+    starts = np.maximum(ends - window, 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (sums[ends] - sums[starts]) / (counts[ends] - counts[starts])
+
+
+def forward_fill(values: np.ndarray) -> np.ndarray:
+    """Carry the last non-NaN value forward; leading NaNs stay NaN"""
+    indices = np.where(~np.isnan(values), np.arange(len(values)), 0)
+    np.maximum.accumulate(indices, out=indices)
+    return values[indices]
+
+
+def ewma(values: np.ndarray, alpha: float = WEIGHT_TREND_ALPHA) -> np.ndarray:
+    """
+    Exponentially weighted moving average of the forward-filled values.
+
+    Uses the closed form y[k] = d^(k+1) y[-1] + alpha d^k cumsum(x[j] d^-j)
+    with d = 1 - alpha, evaluated in blocks short enough that d^-j stays
+    well inside float range. The average starts at the first value.
+    """
+    out = np.full(len(values), np.nan)
+    filled = forward_fill(values)
+    observed = np.flatnonzero(~np.isnan(filled))
+    if not len(observed):
+        return out
+
+    first = observed[0]
+    series = filled[first:]
+    decay = 1.0 - alpha
+    if decay <= 0:
+        out[first:] = series
+        return out
+
+    block = max(1, int(100 / -np.log10(decay)))
+    previous = series[0]
+    for start in range(0, len(series), block):
+        chunk = series[start:start + block]
+        powers = decay ** np.arange(len(chunk))
+        smoothed = decay * powers * previous + alpha * powers * np.cumsum(chunk / powers)
+        out[first + start:first + start + len(chunk)] = smoothed
+        previous = smoothed[-1]
+    return out
+
+
+def linear_slope(values: np.ndarray) -> Optional[float]:
+    """Least-squares slope of the non-NaN values against their day index, per day"""
+    days = np.flatnonzero(~np.isnan(values))
+    if len(days) < 2:
+        return None
+    x = days - days.mean()
+    denominator = np.dot(x, x)
+    if denominator == 0:
+        return None
+    return float(np.dot(x, values[days]) / denominator)
+
+
+def adaptive_tdee(
+    calories: np.ndarray,
+    weight_trend: np.ndarray,
+    window: int = TDEE_WINDOW_DAYS
+) -> np.ndarray:
+    """
+    Energy expenditure implied by intake and the weight trend, per day.
+
+    Over the trailing window, expenditure = mean logged intake - the energy
+    of the trend's change spread over the window. NaN where the window is
+    not fully inside the series or too few of its days were logged.
+    """
+    tdee = np.full(len(calories), np.nan)
+    if len(calories) <= window:
+        return tdee
+
+    intake = rolling_mean(calories, window)
+    logged = np.convolve(~np.isnan(calories), np.ones(window, dtype=int))[:len(calories)]
+    change = weight_trend[window:] - weight_trend[:-window]
+    tdee[window:] = intake[window:] - KCAL_PER_KG * change / window
+    tdee[logged < window * TDEE_MIN_LOGGED_FRACTION] = np.nan
+    return tdee
+
+
+def compute_trends(
+    calories: np.ndarray,
+    weights: np.ndarray,
+    alpha: float = WEIGHT_TREND_ALPHA
+) -> Dict[str, np.ndarray]:
+    """All trend series for daily calories and weigh-ins (NaN where not logged)"""
+    weight_trend = ewma(weights, alpha)
+    series = {"calories": calories, "weight": weights, "weight_trend": weight_trend}
+    for window in ROLLING_WINDOWS:
+        series[f"calories_avg_{window}"] = rolling_mean(calories, window)
+        series[f"weight_avg_{window}"] = rolling_mean(weights, window)
+    series["tdee"] = adaptive_tdee(calories, weight_trend)
+    return series
+
+
+def load_daily_series(db: Session, user_id: int, start_date: date, end_date: date):
+    """
+    Calories and weigh-ins between the dates as day-indexed arrays.
+
+    Unlogged days are NaN; a day with zero calories counts as unlogged. The
+    last weigh-in before start_date, if any, seeds the first day's weight.
+    """
+    length = (end_date - start_date).days + 1
+    calories = np.full(length, np.nan)
+    weights = np.full(length, np.nan)
+
+    rows = db.query(DailyRollup.day, DailyRollup.total_calories, DailyRollup.weight).filter(
+        DailyRollup.user_id == user_id,
+        DailyRollup.day >= start_date,
+        DailyRollup.day <= end_date
+    ).all()
+    if rows:
+        days, day_calories, day_weights = zip(*rows)
+        offsets = np.fromiter((day.toordinal() for day in days), dtype=np.int64, count=len(days)) - start_date.toordinal()
+        day_calories = np.array(day_calories, dtype=float)
+        calories[offsets] = np.where(day_calories > 0, day_calories, np.nan)
+        weights[offsets] = np.array(day_weights, dtype=float)
+
+    if np.isnan(weights[0]):
+        previous_weight = db.query(DailyRollup.weight).filter(
+            DailyRollup.user_id == user_id,
+            DailyRollup.day < start_date,
+            DailyRollup.weight.isnot(None)
+        ).order_by(DailyRollup.day.desc()).first()
+        if previous_weight:
+            weights[0] = previous_weight.weight
+
+    return calories, weights
+
+
+def _to_json(values: np.ndarray, decimals: int = 2) -> list:
+    rounded = np.round(values, decimals).astype(object)
+    rounded[np.isnan(values)] = None
+    return rounded.tolist()
+
+
+def _optional(value) -> Optional[float]:
+    return None if value is None or np.isnan(value) else round(float(value), 2)
+
+
+def get_trends(
+    db: Session,
+    user_id: int,
+    start_date: date,
+    end_date: date,
+    alpha: float = WEIGHT_TREND_ALPHA
+) -> Dict[str, Any]:
+    """Rolling means, weight trend, weight slope and adaptive TDEE for the window"""
+    load_start = start_date - timedelta(days=WARMUP_DAYS)
+    calories, weights = load_daily_series(db, user_id, load_start, end_date)
+    series = compute_trends(calories, weights, alpha)
+
+    # Drop the warm-up days; the seed weigh-in is not reported as logged
+    series = {name: values[WARMUP_DAYS:] for name, values in series.items()}
+    period_days = len(series["calories"])
+
+    weight_slope = linear_slope(series["weight"])
+    weight_trend = series["weight_trend"]
+    observed_trend = weight_trend[~np.isnan(weight_trend)]
+    logged_tdee = series["tdee"][~np.isnan(series["tdee"])]
+
+    return {
+        "user_id": user_id,
+        "period_days": period_days,
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "dates": [(start_date + timedelta(days=offset)).isoformat() for offset in range(period_days)],
+        "series": {name: _to_json(values) for name, values in series.items()},
+        "weight_slope_kg_per_week": round(weight_slope * 7, 3) if weight_slope is not None else None,
+        "weight_trend_change": (
+            round(float(observed_trend[-1] - observed_trend[0]), 2) if len(observed_trend) > 1 else 0
+        ),
+        "avg_daily_calories": _optional(np.nanmean(series["calories"])) if np.any(~np.isnan(series["calories"])) else None,
+        "tdee_estimate": _optional(logged_tdee[-1]) if len(logged_tdee) else None,
+        "tdee_window_days": TDEE_WINDOW_DAYS
+    }
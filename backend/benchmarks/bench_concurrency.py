@@ -0,0 +1,173 @@
+"""
+Benchmark request latency under concurrent load against a live server.
+
+Starts uvicorn on a temporary database, seeds a year of history through the
+sync endpoint and then runs many concurrent clients against a mix of slow
+range reads (analytics/progress, summary/recent) and cheap listings.
+Reports throughput and p50/p95/p99 latency. Pass --baseline REF to run the
+same load against another git revision (checked out with `git worktree`)
+and compare, e.g. the commit before the async database layer.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_concurrency [--clients 200] [--requests 10] [--baseline REF]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def server(app_dir):
+    """Run uvicorn for app_dir on a fresh database in a temporary directory"""
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        env = dict(os.environ, LIFELOG_DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", app_dir,
+             "--port", str(port), "--log-level", "warning"],
+            cwd=tmp, env=env, stdout=subprocess.DEVNULL
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            for _ in range(100):
+                try:
+                    if httpx.get(f"{base_url}/health").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            yield base_url
+        finally:
+            process.terminate()
+            process.wait()
+
+
+@contextmanager
+def worktree(ref):
+    """Check out ref into a temporary git worktree and yield its backend dir"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tree")
+        subprocess.run(["git", "worktree", "add", "--detach", path, ref], cwd=BACKEND_DIR, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            yield os.path.join(path, os.path.relpath(BACKEND_DIR, subprocess.check_output(
+                ["git", "rev-parse", "--show-toplevel"], cwd=BACKEND_DIR, text=True
+            ).strip()))
+        finally:
+            subprocess.run(["git", "worktree", "remove", "--force", path], cwd=BACKEND_DIR, check=True)
+
+
+def seed(http, days=365):
+    """Register a user and sync `days` days of history through an httpx client"""
+    user = http.post("/api/users/register", json={
+        "email": "load@example.com", "username": "load", "password": "secret123"
+    }, timeout=30).json()
+    user_id = user["id"]
+
+    start = datetime.now() - timedelta(days=days - 1)
+    data = {"nutrition": [], "workouts": [], "body_stats": []}
+    for i in range(days):
+        day = (start + timedelta(days=i)).replace(hour=12).isoformat()
+        for meal in ("breakfast", "lunch", "dinner"):
+            data["nutrition"].append({
+                "local_id": f"n{i}{meal}", "date": day, "meal_type": meal, "food_name": "Food",
+                "quantity": 1, "unit": "serving", "calories": 600, "protein": 30, "carbs": 60, "fat": 20
+            })
+        data["workouts"].append({"local_id": f"w{i}", "date": day, "name": "Workout", "duration_minutes": 45})
+        data["body_stats"].append({"local_id": f"b{i}", "date": day, "weight": 80 - i * 0.01})
+    http.post("/api/sync/sync", json={"user_id": user_id, "data": data}, timeout=300)
+    return user_id
+
+
+def endpoints(user_id):
+    today = datetime.now().date().isoformat()
+    return [
+        f"/api/analytics/progress?user_id={user_id}&days=365",
+        f"/api/summary/recent/90?user_id={user_id}",
+        f"/api/fitness/?user_id={user_id}&limit=20",
+        f"/api/nutrition/daily/{today}?user_id={user_id}",
+        f"/api/analytics/streak?user_id={user_id}",
+    ]
+
+
+async def load(base_url, user_id, clients, requests_per_client):
+    paths = endpoints(user_id)
+    latencies = []
+    errors = 0
+
+    async def client(index, http):
+        nonlocal errors
+        for i in range(requests_per_client):
+            path = paths[(index + i) % len(paths)]
+            start = time.perf_counter()
+            try:
+                response = await http.get(path)
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(index, http) for index in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    return sorted(latencies), errors, elapsed
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(label, app_dir, clients, requests_per_client):
+    with server(app_dir) as base_url:
+        with httpx.Client(base_url=base_url) as http:
+            user_id = seed(http)
+        latencies, errors, elapsed = asyncio.run(load(base_url, user_id, clients, requests_per_client))
+
+    p99 = percentile(latencies, 0.99)
+    print(
+        f"{label:<10} {len(latencies) / elapsed:8.0f} req/s"
+        f"  p50 {percentile(latencies, 0.50) * 1000:8.1f} ms"
+        f"  p95 {percentile(latencies, 0.95) * 1000:8.1f} ms"
+        f"  p99 {p99 * 1000:8.1f} ms  {errors} errors"
+    )
+    return p99
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=10, help="requests per client")
+    parser.add_argument("--baseline", help="git revision to compare against")
+    args = parser.parse_args()
+
+    print(f"{args.clients} concurrent clients x {args.requests} requests")
+    if args.baseline:
+        with worktree(args.baseline) as baseline_dir:
+            before = run(args.baseline[:10], baseline_dir, args.clients, args.requests)
+    after = run("current", BACKEND_DIR, args.clients, args.requests)
+    if args.baseline:
+        print(f"p99 improvement: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark the streaming export against loading the history through the ORM.
+
+Bulk-inserts a multi-year power user on a temporary database, then exports
+each dataset in every format through app.export and reports rows per
+second and the peak Python allocation (tracemalloc) while streaming. The
+"orm" row loads the same rows as ORM objects in one go and writes them as
+CSV, which is what paging the listing endpoints amounts to.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_export [--nutrition 300000]
+"""
+import argparse
+import asyncio
+import csv
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+os.environ.setdefault("LIFELOG_DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from app.db import AsyncReadSessionLocal, Base, SessionLocal, async_replica_engine, engine  # noqa: E402
+from app.export import DATASETS, FORMATS, stream_arrow, stream_csv  # noqa: E402
+from app.models import BodyStat, Exercise, NutritionLog, User, Workout  # noqa: E402
+
+MODELS = {"workouts": Workout, "exercises": Exercise, "nutrition": NutritionLog, "body_stats": BodyStat}
+
+
+def seed(nutrition_rows):
+    """One user with nutrition_rows food entries, a workout a day with five exercises and daily weigh-ins"""
+    Base.metadata.create_all(bind=engine)
+    days = nutrition_rows // 8
+    first = datetime.now() - timedelta(days=days)
+    with SessionLocal() as db:
+        user = User(email="export@example.com", username="export", hashed_password="x")
+        db.add(user)
+        db.flush()
+        user_id = user.id
+
+        db.execute(insert(NutritionLog), [
+            {
+                "user_id": user_id, "date": first + timedelta(days=row // 8, hours=row % 8 + 8),
+                "meal_type": "snack", "food_name": f"food {row % 500}", "quantity": 1.5, "unit": "serving",
+                "calories": 250.0, "protein": 12.0, "carbs": 30.0, "fat": 8.0,
+                "total_calories": 375.0, "total_protein": 18.0, "total_carbs": 45.0, "total_fat": 12.0
+            }
+            for row in range(nutrition_rows)
+        ])
+        db.execute(insert(BodyStat), [
+            {"user_id": user_id, "date": first + timedelta(days=day), "weight": 80 + day % 7 / 10, "sleep_hours": 7.5}
+            for day in range(days)
+        ])
+        db.execute(insert(Workout), [
+            {"user_id": user_id, "date": first + timedelta(days=day, hours=18), "name": "Session", "duration_minutes": 60}
+            for day in range(days)
+        ])
+        workout_ids = db.scalars(select(Workout.id).where(Workout.user_id == user_id)).all()
+        db.execute(insert(Exercise), [
+            {"workout_id": workout_id, "user_id": user_id, "name": f"Lift {slot}", "sets": 3, "reps": 8,
+             "weight": 60.0 + slot, "order": slot}
+            for workout_id in workout_ids for slot in range(5)
+        ])
+        db.commit()
+    return user_id
+
+
+async def export(dataset, file_format, user_id):
+    statement = DATASETS[dataset](user_id)
+    size = 0
+    async with AsyncReadSessionLocal() as db:
+        chunks = stream_csv(db, statement) if file_format == "csv" else stream_arrow(db, statement, file_format)
+        async for chunk in chunks:
+            size += len(chunk)
+    return size
+
+
+async def export_orm(dataset, user_id):
+    model = MODELS[dataset]
+    async with AsyncReadSessionLocal() as db:
+        objects = (await db.scalars(select(model).where(model.user_id == user_id))).all()
+        columns = [column.name for column in model.__table__.columns]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        writer.writerows([getattr(obj, column) for column in columns] for obj in objects)
+        return len(buffer.getvalue().encode())
+
+
+async def measure(run):
+    # Time without tracemalloc, which slows allocation-heavy code down
+    start = time.perf_counter()
+    await run()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    size = await run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, size
+
+
+async def report(user_id, counts):
+    print(f"{'dataset':<11} {'format':<8} {'rows':>8} {'rows/s':>10} {'peak MB':>8} {'size MB':>8}")
+    for dataset, rows in counts.items():
+        runs = [(file_format, lambda f=file_format: export(dataset, f, user_id)) for file_format in FORMATS]
+        runs.append(("orm", lambda: export_orm(dataset, user_id)))
+        for label, run in runs:
+            elapsed, peak, size = await measure(run)
+            print(f"{dataset:<11} {label:<8} {rows:>8} {rows / elapsed:>10.0f} {peak / 2**20:>8.1f} {size / 2**20:>8.1f}")
+
+    # aiosqlite keeps a thread per pooled connection
+    await async_replica_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nutrition", type=int, default=300000)
+    args = parser.parse_args()
+
+    user_id = seed(args.nutrition)
+    with SessionLocal() as db:
+        counts = {
+            dataset: db.scalar(select(func.count()).select_from(model).where(model.user_id == user_id))
+            for dataset, model in MODELS.items()
+        }
+    asyncio.run(report(user_id, counts))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Benchmark the food typeahead index against a linear scan of the catalog.
+
+Generates a synthetic catalog (common food words plus made-up product
+line and brand names, so the vocabulary is realistically large), builds
+the app.search_index.TokenIndex the food search uses over it and times
+typeahead queries of every shape: one-letter prefixes, whole words,
+multi-word and misspelled. Each query is
+also answered by scanning every food, which is what a LIKE '%q%' query
+amounts to, and the index's results are checked to be a subset of the
+scan's. Then the catalog is loaded into a temporary database and the
+/api/nutrition/foods/search endpoint is timed for a user with recent foods.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_food_search [--foods 100000] [--rounds 200]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("LIFELOG_DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+os.environ.setdefault("LIFELOG_LOG_LEVEL", "WARNING")
+
+from app.search_index import TokenIndex, normalize_words  # noqa: E402
+
+PREPARATIONS = [
+    "grilled", "baked", "fried", "roasted", "steamed", "raw", "smoked", "boiled", "organic", "low fat",
+    "whole", "sliced", "frozen", "canned", "fresh", "dried", "crispy", "spicy", "sweet", "light",
+]
+BASES = [
+    "chicken breast", "chicken thigh", "beef", "pork chop", "salmon", "tuna", "shrimp", "egg", "tofu",
+    "greek yogurt", "milk", "cheddar cheese", "mozzarella", "butter", "rice", "brown rice", "pasta",
+    "bread", "bagel", "oatmeal", "granola", "banana", "apple", "orange", "strawberries", "blueberries",
+    "avocado", "broccoli", "spinach", "carrots", "potato", "sweet potato", "almonds", "peanut butter",
+    "hummus", "lentils", "black beans", "quinoa", "protein bar", "protein shake", "pizza", "burrito",
+    "sandwich", "salad", "soup", "crackers", "chips", "cookie", "ice cream", "dark chocolate",
+]
+VARIANTS = [
+    "", "", "", "vanilla", "chocolate", "strawberry", "original", "unsweetened", "honey", "garlic",
+    "bbq", "teriyaki", "lemon", "pepper", "cinnamon", "maple", "mixed berry", "sea salt", "plain", "classic",
+]
+UNITS = ["serving", "g", "cup", "piece", "slice", "tbsp"]
+SYLLABLES = ["ka", "lo", "mi", "ra", "ve", "to", "su", "ne", "bi", "zo", "pa", "fi", "qu", "mar", "dell", "ton"]
+
+QUERIES = [
+    "c", "ch", "chi", "chic", "chicken", "chicken br", "grilled chicken breast",
+    "g", "greek yog", "greek yogurt vanilla", "pb", "peanut", "oat", "s", "salmon smoked",
+    "chiken", "yoghurt", "brocoli", "blueberies", "zz",
+]
+
+
+def pseudo_word(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def synthetic_catalog(count, seed=7):
+    """count foods with unique (name, brand, unit), as Food column values"""
+    rng = random.Random(seed)
+    lines = [pseudo_word(rng) for _ in range(5000)]
+    brands = [f"{pseudo_word(rng).title()} {rng.choice(['Farms', 'Foods', 'Co', 'Kitchen', ''])}".strip()
+              for _ in range(1500)]
+
+    seen, rows = set(), []
+    while len(rows) < count:
+        words = [rng.choice(PREPARATIONS), rng.choice(BASES), rng.choice(VARIANTS)]
+        if rng.random() < 0.5:
+            words.append(rng.choice(lines))
+        name = " ".join(word for word in words if word).capitalize()
+        brand = rng.choice(brands) if rng.random() < 0.7 else ""
+        unit = rng.choice(UNITS)
+        if (name, brand, unit) in seen:
+            continue
+        seen.add((name, brand, unit))
+        rows.append({
+            "name": name, "brand": brand, "category": None, "unit": unit,
+            "calories": round(rng.uniform(20, 600)), "protein": round(rng.uniform(0, 40), 1),
+            "carbs": round(rng.uniform(0, 80), 1), "fat": round(rng.uniform(0, 30), 1),
+            "fiber": 0.0, "sugar": 0.0, "sodium": 0.0,
+        })
+    return rows
+
+
+def scan(foods, query, limit):
+    """Reference search: test every food, order by name length"""
+    terms = normalize_words(query)
+    if not terms:
+        return []
+    hits = []
+    for food_id, name, brand in foods:
+        words = normalize_words(name) + normalize_words(brand)
+        if all(any(word.startswith(term) for word in words) for term in terms):
+            hits.append((len(name), name.lower(), food_id))
+    return [food_id for _, _, food_id in sorted(hits)[:limit]]
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    return statistics.median(ordered), ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+
+def bench_index(foods, rounds, limit):
+    start = time.perf_counter()
+    index = TokenIndex(foods)
+    build_seconds = time.perf_counter() - start
+    print(f"{len(index)} foods, index built in {build_seconds:.2f} s")
+
+    # Warm the short-prefix cache the way the first few requests would
+    for query in QUERIES:
+        index.search(query, limit)
+
+    print(f"{'query':<24} {'hits':>4} {'index p50':>10} {'index p99':>10} {'scan':>9}")
+    worst_p99 = 0.0
+    for query in QUERIES:
+        samples = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            hits = index.search(query, limit)
+            samples.append((time.perf_counter() - start) * 1000)
+        p50, p99 = percentiles(samples)
+        worst_p99 = max(worst_p99, p99)
+
+        start = time.perf_counter()
+        expected = scan(foods, query, limit)
+        scan_ms = (time.perf_counter() - start) * 1000
+
+        # Prefix queries must only return foods the scan matches too; typo
+        # queries are the ones the scan cannot answer
+        if expected:
+            matching = set(scan(foods, query, len(foods)))
+            assert all(food_id in matching for food_id, _ in hits), query
+        print(f"{query:<24} {len(hits):>4} {p50:>8.3f}ms {p99:>8.3f}ms {scan_ms:>7.0f}ms")
+    print(f"worst index p99: {worst_p99:.3f} ms")
+
+
+def bench_endpoint(rows, rounds, limit):
+    from fastapi.testclient import TestClient
+
+    import main as app_main
+    from app.db import SessionLocal
+    from app.foods import import_foods
+    from app.models import Food, NutritionLog, User
+
+    with TestClient(app_main.app) as client, SessionLocal() as db:
+        import_foods(db, rows)
+        user = User(email="foods@example.com", username="foods", hashed_password="x")
+        db.add(user)
+        db.flush()
+
+        # A few months of logs drawn from a small set of favourite foods
+        favourites = [food for food, in db.query(Food.id).filter(Food.name.like("Grilled chicken%")).limit(15)]
+        now = datetime.now()
+        db.add_all(
+            NutritionLog(
+                user_id=user.id, food_id=favourites[entry % len(favourites)], date=now - timedelta(hours=entry * 6),
+                meal_type="lunch", food_name="favourite", quantity=1, unit="serving", calories=300,
+                total_calories=300
+            )
+            for entry in range(400)
+        )
+        db.commit()
+
+        def fetch(query):
+            response = client.get("/api/nutrition/foods/search", params={"q": query, "limit": limit, "user_id": user.id})
+            assert response.status_code == 200, response.text
+            return response.json()
+
+        start = time.perf_counter()
+        fetch("chicken")
+        print(f"first request (builds the index): {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        samples = []
+        for query in QUERIES * max(1, rounds // 20):
+            start = time.perf_counter()
+            fetch(query)
+            samples.append((time.perf_counter() - start) * 1000)
+        p50, p99 = percentiles(samples)
+
+        # The same client fetching one food by id: the in-process HTTP floor
+        baseline = []
+        for _ in samples:
+            start = time.perf_counter()
+            client.get(f"/api/nutrition/foods/{favourites[0]}", params={"user_id": user.id})
+            baseline.append((time.perf_counter() - start) * 1000)
+
+        recent = sum(result["recent"] for result in fetch("grilled chicken"))
+        print(f"endpoint p50 {p50:.2f} ms, p99 {p99:.2f} ms (GET /foods/{{id}} p50 {percentiles(baseline)[0]:.2f} ms)")
+        print(f"'grilled chicken' returns {recent} recent foods first")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--foods", type=int, default=100000)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    rows = synthetic_catalog(args.foods)
+    foods = [(food_id, row["name"], row["brand"]) for food_id, row in enumerate(rows, start=1)]
+    bench_index(foods, args.rounds, args.limit)
+    bench_endpoint(rows, args.rounds, args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark API latency for unrelated endpoints during a login storm.
+
+Starts uvicorn on a temporary database and registers a user. It then fires
+concurrent logins (bcrypt verification) while a second group of clients
+polls a cheap listing, and reports the listing's p50/p99 latency with and
+without the storm. Pass --baseline REF to repeat the run against another git
+revision, e.g. the commit before the hashing pool.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_login_storm [--logins 200] [--baseline REF]
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.bench_concurrency import BACKEND_DIR, percentile, server, worktree
+
+CREDENTIALS = {"email": "storm@example.com", "password": "secret123"}
+
+
+async def poll(http, path, stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await http.get(path)
+        latencies.append(time.perf_counter() - start)
+
+
+async def measure(base_url, user_id, logins, pollers=10, idle_seconds=2.0):
+    path = f"/api/nutrition/?user_id={user_id}&limit=20"
+    limits = httpx.Limits(max_connections=logins + pollers)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=300) as http:
+        results = {}
+        for label in ("idle", "storm"):
+            latencies = []
+            stop = asyncio.Event()
+            tasks = [asyncio.create_task(poll(http, path, stop, latencies)) for _ in range(pollers)]
+            start = time.perf_counter()
+            if label == "idle":
+                await asyncio.sleep(idle_seconds)
+                statuses = []
+            else:
+                responses = await asyncio.gather(*(
+                    http.post("/api/users/login", json=CREDENTIALS) for _ in range(logins)
+                ), return_exceptions=True)
+                statuses = [getattr(response, "status_code", None) for response in responses]
+            elapsed = time.perf_counter() - start
+            stop.set()
+            await asyncio.gather(*tasks)
+            results[label] = (sorted(latencies), statuses, elapsed)
+    return results
+
+
+def run(label, app_dir, logins):
+    with server(app_dir) as base_url:
+        user = httpx.post(f"{base_url}/api/users/register", json=dict(CREDENTIALS, username="storm"), timeout=60)
+        results = asyncio.run(measure(base_url, user.json()["id"], logins))
+
+    for phase, (latencies, statuses, elapsed) in results.items():
+        summary = f"{label:<10} {phase:<6} listing p50 {percentile(latencies, 0.50) * 1000:8.1f} ms" \
+                  f"  p99 {percentile(latencies, 0.99) * 1000:8.1f} ms"
+        if statuses:
+            ok = statuses.count(200)
+            summary += f"  {ok}/{len(statuses)} logins ok in {elapsed:.1f}s"
+        print(summary)
+    return percentile(results["storm"][0], 0.99)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--baseline", help="git revision to compare against")
+    args = parser.parse_args()
+
+    print(f"{args.logins} concurrent logins")
+    if args.baseline:
+        with worktree(args.baseline) as baseline_dir:
+            before = run(args.baseline[:10], baseline_dir, args.logins)
+    after = run("current", BACKEND_DIR, args.logins)
+    if args.baseline:
+        print(f"listing p99 during storm improvement: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark the range aggregation layer against the old per-day loop.
+
+Seeds a temporary SQLite database with one user and N days of history, then
+times /analytics/progress-style work both ways and reports query counts. The
+baseline replays the original per-day queries against the raw log tables.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_range_aggregation [days]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, func, desc
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base
+from app.models import User, Workout, NutritionLog, BodyStat
+from app.aggregation import get_daily_range
+from app.rollups import rebuild_daily_rollups
+
+
+def seed(db, days):
+    user = User(email="bench@example.com", username="bench", hashed_password="x")
+    db.add(user)
+    db.flush()
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    for i in range(days):
+        day = today - timedelta(days=i)
+        for meal_hour in (8, 13, 19):
+            calories = random.uniform(300, 800)
+            db.add(NutritionLog(
+                user_id=user.id, date=day + timedelta(hours=meal_hour), meal_type="lunch",
+                food_name="Food", quantity=1, unit="serving", calories=calories,
+                total_calories=calories, total_protein=30, total_carbs=50, total_fat=15
+            ))
+        if i % 2 == 0:
+            db.add(Workout(user_id=user.id, date=day + timedelta(hours=18), name="Workout", duration_minutes=45))
+        if i % 3 == 0:
+            db.add(BodyStat(user_id=user.id, date=day + timedelta(hours=7), weight=80 - i * 0.01))
+    rebuild_daily_rollups(db, user.id)
+    db.commit()
+    return user.id
+
+
+def per_day_loop(db, user_id, start_date, days):
+    """The pre-aggregation implementation: three raw-table queries per day"""
+    results = []
+    for i in range(days):
+        target_date = start_date + timedelta(days=i)
+        nutrition = db.query(
+            func.sum(NutritionLog.total_calories),
+            func.sum(NutritionLog.total_protein),
+            func.sum(NutritionLog.total_carbs),
+            func.sum(NutritionLog.total_fat)
+        ).filter(NutritionLog.user_id == user_id, func.date(NutritionLog.date) == target_date).first()
+        workouts = db.query(
+            func.count(Workout.id),
+            func.sum(Workout.duration_minutes)
+        ).filter(Workout.user_id == user_id, func.date(Workout.date) == target_date).first()
+        weight = db.query(BodyStat.weight).filter(
+            BodyStat.user_id == user_id,
+            func.date(BodyStat.date) == target_date,
+            BodyStat.weight.isnot(None)
+        ).order_by(desc(BodyStat.created_at)).first()
+        results.append((nutrition, workouts, weight))
+    return results
+
+
+def measure(label, fn, engine, repeat=5):
+    counter = {"queries": 0}
+
+    def count(*args):
+        counter["queries"] += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        elapsed = (time.perf_counter() - start) / repeat
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    print(f"{label:<20} {elapsed * 1000:10.2f} ms/request {counter['queries'] // repeat:8d} queries/request")
+    return elapsed
+
+
+def main():
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 365
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+
+        user_id = seed(db, days)
+        end_date = datetime.now().date()
+        start_date = end_date - timedelta(days=days - 1)
+
+        print(f"Window: {days} days")
+        before = measure("per-day loop", lambda: per_day_loop(db, user_id, start_date, days), engine)
+        after = measure("range aggregation", lambda: get_daily_range(db, user_id, start_date, end_date), engine)
+        print(f"Speedup: {before / after:.1f}x")
+
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark the dashboard endpoints with a cold cache, a warm cache and ETag
+revalidation (304).
+
+Seeds a year of history through the sync endpoint on a temporary database,
+then fetches the dashboard set (analytics daily/weekly/streak/progress and
+summary recent) repeatedly in-process. The cold runs clear the cache before
+every round.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_response_cache [--rounds 50]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("LIFELOG_DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main as app_main  # noqa: E402
+from app.response_cache import get_cache_backend  # noqa: E402
+from benchmarks.bench_concurrency import seed  # noqa: E402
+
+
+def dashboard(user_id):
+    today = datetime.now().date()
+    week_start = today - timedelta(days=today.weekday())
+    return [
+        ("/api/analytics/daily", {"user_id": user_id, "date": today.isoformat()}),
+        ("/api/analytics/weekly", {"user_id": user_id, "start_date": week_start.isoformat()}),
+        ("/api/analytics/streak", {"user_id": user_id}),
+        ("/api/analytics/progress", {"user_id": user_id, "days": 90}),
+        ("/api/summary/recent/30", {"user_id": user_id}),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    with TestClient(app_main.app, base_url="http://testserver") as client:
+        user_id = seed(client)
+        requests = dashboard(user_id)
+        etags = {}
+
+        def fetch(revalidate=False):
+            for path, params in requests:
+                headers = {"If-None-Match": etags[path]} if revalidate else {}
+                response = client.get(path, params=params, headers=headers)
+                assert response.status_code == (304 if revalidate else 200), (path, response.status_code)
+                etags[path] = response.headers["etag"]
+
+        results = {}
+        for label, revalidate, clear in (("cold", False, True), ("warm", False, False), ("304", True, False)):
+            fetch()
+            start = time.perf_counter()
+            for _ in range(args.rounds):
+                if clear:
+                    get_cache_backend().clear()
+                fetch(revalidate)
+            results[label] = (time.perf_counter() - start) / args.rounds * 1000
+
+    print(f"dashboard of {len(requests)} requests, {args.rounds} rounds")
+    for label, elapsed in results.items():
+        print(f"  {label:<5} {elapsed:8.2f} ms per dashboard ({results['cold'] / elapsed:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark concurrent reads and writes under each SQLite engine profile.
+
+Writer threads log nutrition entries (insert, rollup refresh, commit) while
+reader threads load the 30-day range the dashboard uses. Under the default
+rollback journal readers wait on every write; with the production profile
+(WAL, synchronous=NORMAL, larger cache) they run alongside the writers.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_sqlite_profile [seconds] [readers] [writers]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base, SQLITE_PRAGMAS, enable_sqlite_pragmas, enable_sqlite_savepoints
+from app.models import User, NutritionLog
+from app.aggregation import get_daily_range
+from app.rollups import refresh_daily_rollups, rebuild_daily_rollups
+
+
+def seed(session_factory, days=90):
+    db = session_factory()
+    user = User(email="profile@example.com", username="profile", hashed_password="x")
+    db.add(user)
+    db.flush()
+
+    today = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+    for i in range(days):
+        for meal in ("breakfast", "lunch", "dinner"):
+            db.add(NutritionLog(
+                user_id=user.id, date=today - timedelta(days=i), meal_type=meal, food_name="Food",
+                quantity=1, unit="serving", calories=500, total_calories=500
+            ))
+    rebuild_daily_rollups(db)
+    db.commit()
+    user_id = user.id
+    db.close()
+    return user_id
+
+
+def writer(session_factory, user_id, stop, counts):
+    db = session_factory()
+    while not stop.is_set():
+        try:
+            log = NutritionLog(
+                user_id=user_id, date=datetime.now(), meal_type="snack", food_name="Apple",
+                quantity=1, unit="piece", calories=95, total_calories=95
+            )
+            db.add(log)
+            refresh_daily_rollups(db, user_id, [log.date])
+            db.commit()
+            counts["writes"] += 1
+        except Exception:
+            db.rollback()
+            counts["errors"] += 1
+    db.close()
+
+
+def reader(session_factory, user_id, stop, counts):
+    db = session_factory()
+    today = datetime.now().date()
+    while not stop.is_set():
+        try:
+            get_daily_range(db, user_id, today - timedelta(days=29), today)
+            db.commit()
+            counts["reads"] += 1
+        except Exception:
+            db.rollback()
+            counts["errors"] += 1
+    db.close()
+
+
+def run(profile, seconds, readers, writers):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            connect_args={"check_same_thread": False},
+            pool_size=readers + writers
+        )
+        enable_sqlite_pragmas(engine, SQLITE_PRAGMAS[profile])
+        enable_sqlite_savepoints(engine)
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        user_id = seed(session_factory)
+
+        stop = threading.Event()
+        counts = {"reads": 0, "writes": 0, "errors": 0}
+        threads = [threading.Thread(target=writer, args=(session_factory, user_id, stop, counts)) for _ in range(writers)]
+        threads += [threading.Thread(target=reader, args=(session_factory, user_id, stop, counts)) for _ in range(readers)]
+
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    print(
+        f"{profile:<11} {counts['reads'] / seconds:9.0f} reads/sec {counts['writes'] / seconds:9.0f} writes/sec"
+        f" {counts['errors']:6d} errors"
+    )
+    return counts
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    writers = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+
+    print(f"{readers} readers, {writers} writers, {seconds:g}s per profile")
+    before = run("default", seconds, readers, writers)
+    after = run("production", seconds, readers, writers)
+    total_before = before["reads"] + before["writes"]
+    total_after = after["reads"] + after["writes"]
+    print(f"Throughput gain: {total_after / max(total_before, 1):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
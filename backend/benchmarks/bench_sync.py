@@ -0,0 +1,107 @@
+"""
+Benchmark sync throughput: per-item commits versus the batch sync engine.
+
+The baseline mirrors the old _sync_* helpers (one ORM insert, rollup refresh
+and commit per item); the batch path is apply_sync_batch() with one commit.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_sync [items]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base, enable_sqlite_savepoints
+from app.models import User, NutritionLog
+from app.rollups import refresh_daily_rollups
+from app.sync_engine import apply_sync_batch
+
+
+def make_items(count):
+    start = datetime.now() - timedelta(days=count // 5)
+    return [
+        {
+            "local_id": f"n{i}",
+            "operation": "INSERT",
+            "date": (start + timedelta(hours=i * 5)).isoformat(),
+            "meal_type": "snack",
+            "food_name": "Apple",
+            "quantity": 1,
+            "unit": "piece",
+            "calories": 95,
+            "protein": 0.5,
+            "carbs": 25,
+            "fat": 0.3,
+        }
+        for i in range(count)
+    ]
+
+
+def per_item_commits(db, user_id, items):
+    for item in items:
+        log = NutritionLog(
+            user_id=user_id,
+            date=datetime.fromisoformat(item["date"]),
+            meal_type=item["meal_type"],
+            food_name=item["food_name"],
+            quantity=item["quantity"],
+            unit=item["unit"],
+            calories=item["calories"],
+            protein=item["protein"],
+            carbs=item["carbs"],
+            fat=item["fat"],
+            total_calories=item["calories"] * item["quantity"],
+            total_protein=item["protein"] * item["quantity"],
+            total_carbs=item["carbs"] * item["quantity"],
+            total_fat=item["fat"] * item["quantity"],
+        )
+        db.add(log)
+        refresh_daily_rollups(db, user_id, [log.date])
+        db.commit()
+
+
+def batch_sync(db, user_id, items):
+    synced_items, failed_items = apply_sync_batch(db, user_id, {"nutrition": items})
+    db.commit()
+    assert not failed_items, failed_items
+
+
+def run(label, fn, items):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        enable_sqlite_savepoints(engine)
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+
+        user = User(email="sync@example.com", username="sync", hashed_password="x")
+        db.add(user)
+        db.commit()
+
+        start = time.perf_counter()
+        fn(db, user.id, items)
+        elapsed = time.perf_counter() - start
+
+        db.close()
+        engine.dispose()
+
+    print(f"{label:<18} {elapsed:8.3f} s {len(items) / elapsed:12.0f} items/sec")
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    items = make_items(count)
+
+    print(f"Batch size: {count} nutrition INSERTs")
+    before = run("per-item commits", per_item_commits, items)
+    after = run("batch engine", batch_sync, items)
+    print(f"Speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
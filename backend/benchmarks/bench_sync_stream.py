@@ -0,0 +1,88 @@
+"""
+Benchmark peak memory of NDJSON streaming sync against backlog size.
+
+Drives stream_sync_chunks() with generated NDJSON bodies of increasing size
+and reports the tracemalloc peak; with chunked commits it should stay flat
+instead of growing with the backlog.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_sync_stream [items ...]
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base, create_async_db_engine
+from app.models import User
+from app.sync_engine import stream_sync_chunks
+
+
+async def ndjson_body(count):
+    start = datetime.now() - timedelta(days=count // 5)
+    for i in range(count):
+        item = {
+            "table": "nutrition",
+            "local_id": f"n{i}",
+            "client_uuid": f"bench-{i}",
+            "date": (start + timedelta(hours=i * 5)).isoformat(),
+            "meal_type": "snack",
+            "food_name": "Apple",
+            "quantity": 1,
+            "unit": "piece",
+            "calories": 95,
+        }
+        yield (json.dumps(item) + "\n").encode()
+
+
+async def consume(url, user_id, count):
+    engine = create_async_db_engine(url)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    synced = 0
+    async for result in stream_sync_chunks(session_factory, user_id, ndjson_body(count)):
+        synced += result["synced_count"]
+    await engine.dispose()
+    return synced
+
+
+def run(count):
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = create_engine(url)
+        Base.metadata.create_all(bind=engine)
+
+        db = sessionmaker(bind=engine)()
+        user = User(email="stream@example.com", username="stream", hashed_password="x")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+        db.close()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        synced = asyncio.run(consume(url, user_id, count))
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        engine.dispose()
+
+    assert synced == count, (synced, count)
+    print(f"{count:>8} items {elapsed:8.2f} s {count / elapsed:10.0f} items/sec  peak {peak / 1024 / 1024:7.1f} MiB")
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [2000, 10000, 20000]
+    for count in counts:
+        run(count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Benchmark the vectorized trend analytics against a pure-Python loop.
+
+Generates synthetic daily calories and weigh-ins with gaps, computes the
+rolling means, weight trend, slope and adaptive TDEE with app.trends and
+with a straightforward per-day loop, checks the two agree and reports the
+time of each. Then seeds the same history into a temporary database and
+times the /api/analytics/trends endpoint with the response cache cleared.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_trends [--years 10] [--rounds 20]
+"""
+import argparse
+import math
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("LIFELOG_DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+
+import numpy as np  # noqa: E402
+
+from app import trends  # noqa: E402
+
+
+def synthetic_series(days, seed=7):
+    rng = random.Random(seed)
+    calories, weights = [], []
+    weight = 85.0
+    for day in range(days):
+        intake = 2300 + 300 * math.sin(day / 45) + rng.gauss(0, 250)
+        weight += (intake - 2450) / trends.KCAL_PER_KG
+        calories.append(round(intake) if rng.random() < 0.8 else None)
+        weights.append(round(weight + rng.gauss(0, 0.6), 1) if rng.random() < 0.5 else None)
+    return calories, weights
+
+
+def python_trends(calories, weights, alpha):
+    """Reference implementation: one pass per series, day by day"""
+    def rolling(values, window):
+        out = []
+        for end in range(len(values)):
+            logged = [value for value in values[max(0, end - window + 1):end + 1] if value is not None]
+            out.append(sum(logged) / len(logged) if logged else None)
+        return out
+
+    trend, current, last = [], None, None
+    for value in weights:
+        last = value if value is not None else last
+        if last is not None:
+            current = last if current is None else current + alpha * (last - current)
+        trend.append(current)
+
+    points = [(day, value) for day, value in enumerate(weights) if value is not None]
+    mean_x = sum(day for day, _ in points) / len(points)
+    mean_y = sum(value for _, value in points) / len(points)
+    slope = sum((day - mean_x) * (value - mean_y) for day, value in points) / \
+        sum((day - mean_x) ** 2 for day, _ in points)
+
+    window = trends.TDEE_WINDOW_DAYS
+    intake = rolling(calories, window)
+    tdee = []
+    for day in range(len(calories)):
+        logged = sum(value is not None for value in calories[max(0, day - window + 1):day + 1])
+        if day < window or trend[day - window] is None or logged < window * trends.TDEE_MIN_LOGGED_FRACTION:
+            tdee.append(None)
+        else:
+            tdee.append(intake[day] - trends.KCAL_PER_KG * (trend[day] - trend[day - window]) / window)
+
+    series = {"weight_trend": trend, "tdee": tdee}
+    for size in trends.ROLLING_WINDOWS:
+        series[f"calories_avg_{size}"] = rolling(calories, size)
+        series[f"weight_avg_{size}"] = rolling(weights, size)
+    return series, slope
+
+
+def numpy_trends(calories, weights, alpha):
+    calories = np.array(calories, dtype=float)
+    weights = np.array(weights, dtype=float)
+    return trends.compute_trends(calories, weights, alpha), trends.linear_slope(weights)
+
+
+def timed(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = fn()
+    return (time.perf_counter() - start) / rounds * 1000, result
+
+
+def check(expected, actual):
+    (series, slope), (arrays, array_slope) = expected, actual
+    assert math.isclose(slope, array_slope, rel_tol=1e-9), (slope, array_slope)
+    for name, values in series.items():
+        reference = np.array(values, dtype=float)
+        assert np.allclose(reference, arrays[name], equal_nan=True, rtol=1e-9, atol=1e-6), name
+
+
+def bench_endpoint(calories, weights, rounds):
+    from fastapi.testclient import TestClient
+
+    import main as app_main
+    from app.db import SessionLocal
+    from app.models import DailyRollup, User
+    from app.response_cache import get_cache_backend
+
+    today = datetime.now().date()
+    first_day = today - timedelta(days=len(calories) - 1)
+    with TestClient(app_main.app) as client, SessionLocal() as db:
+        user = User(email="trends@example.com", username="trends", hashed_password="x")
+        db.add(user)
+        db.flush()
+        db.add_all(
+            DailyRollup(
+                user_id=user.id,
+                day=first_day + timedelta(days=offset),
+                total_calories=calories[offset] or 0,
+                weight=weights[offset],
+                has_activity=calories[offset] is not None
+            )
+            for offset in range(len(calories))
+            if calories[offset] is not None or weights[offset] is not None
+        )
+        db.commit()
+
+        params = {"user_id": user.id, "days": len(calories) - trends.WARMUP_DAYS}
+
+        def fetch():
+            get_cache_backend().clear()
+            response = client.get("/api/analytics/trends", params=params)
+            assert response.status_code == 200, response.text
+            return response
+
+        fetch()
+        return timed(fetch, rounds)[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    days = args.years * 365
+    calories, weights = synthetic_series(days)
+
+    python_ms, expected = timed(lambda: python_trends(calories, weights, trends.WEIGHT_TREND_ALPHA), max(1, args.rounds // 10))
+    numpy_ms, actual = timed(lambda: numpy_trends(calories, weights, trends.WEIGHT_TREND_ALPHA), args.rounds)
+    check(expected, actual)
+
+    print(f"{days} days ({args.years} years), results match")
+    print(f"  python loop {python_ms:10.2f} ms")
+    print(f"  numpy       {numpy_ms:10.2f} ms ({python_ms / numpy_ms:.0f}x)")
+    print(f"  endpoint    {bench_endpoint(calories, weights, args.rounds):10.2f} ms per uncached request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Query count check for the workout list endpoints.
+
+Serializes pages of different sizes through the Workout response schema,
+the same way FastAPI does, and counts the statements issued. Exits non-zero
+if the count grows with the page size (an N+1 lazy load of exercises).
+
+Usage (from the backend directory):
+    python -m benchmarks.check_query_counts
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base, create_async_db_engine
+from app.models import User, Workout, Exercise
+from app.schemas import Workout as WorkoutSchema
+from app.routes import fitness
+
+
+def seed(db, count):
+    user = User(email="counts@example.com", username="counts", hashed_password="x")
+    db.add(user)
+    db.flush()
+
+    start = datetime.now() - timedelta(days=count)
+    for i in range(count):
+        workout = Workout(user_id=user.id, date=start + timedelta(days=i), name=f"Workout {i}")
+        for order in range(3):
+            workout.exercises.append(Exercise(name="Squat", sets=3, reps=5, weight=100, order=order))
+        db.add(workout)
+    db.commit()
+    return user.id
+
+
+def endpoints(user_id):
+    yield "fitness.list", lambda db, limit: fitness.get_fitness_sessions(user_id, limit=limit, db=db)
+    yield "fitness.list include=", lambda db, limit: fitness.get_fitness_sessions(
+        user_id, limit=limit, include="", db=db
+    )
+    yield "fitness.recent", lambda db, limit: fitness.get_recent_fitness_sessions(user_id, limit, db=db)
+
+
+async def check_counts(url, user_id):
+    engine = create_async_db_engine(url)
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+
+    failures = 0
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    for label, run in endpoints(user_id):
+        counts = []
+        for limit in (10, 100):
+            async with session_factory() as db:
+                statements.clear()
+                [WorkoutSchema.model_validate(workout) for workout in await run(db, limit)]
+                counts.append(len(statements))
+
+        status = "OK" if counts[0] == counts[1] else "FAIL"
+        failures += status == "FAIL"
+        print(f"[{status}] {label}: {counts[0]} statements for 10 rows, {counts[1]} for 100 rows")
+
+    event.remove(engine.sync_engine, "before_cursor_execute", count)
+    await engine.dispose()
+    return failures
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'counts.db')}"
+        engine = create_engine(url)
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        user_id = seed(db, 100)
+        db.close()
+        engine.dispose()
+
+        failures = asyncio.run(check_counts(url, user_id))
+
+    if failures:
+        print(f"\n{failures} endpoint(s) issue a query per row")
+        sys.exit(1)
+    print("\nStatement counts are constant per page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Query plan regression check for the hot read and write paths.
+
+Runs the analytics, summary, listing, rollup and copy code against a
+temporary SQLite database, through the same async sessions the routes use,
+while capturing EXPLAIN QUERY PLAN for every SELECT and INSERT ... SELECT
+it issues. Exits non-zero if any statement falls back to a full table scan.
+
+Usage (from the backend directory):
+    python -m benchmarks.check_query_plans
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base, create_async_db_engine
+from app.models import User, Workout, Exercise, NutritionLog, BodyStat, Food
+from app.aggregation import get_daily_range, get_week_summary
+from app.rollups import refresh_daily_rollups, rebuild_daily_rollups
+from app.records import refresh_personal_records, rebuild_personal_records
+from app.changes import get_changes
+from app.export import DATASETS, stream_csv
+from app.foods import get_food_index, recent_food_ids
+from app.exercise_catalog import ensure_exercise_catalog, get_exercise_catalog
+from app.log_copy import COPY_TABLES, copy_day
+from app.pagination import encode_cursor
+from app.routes import analytics, summary, fitness, nutrition, body_stats
+
+
+def seed(db):
+    user = User(email="plans@example.com", username="plans", hashed_password="x")
+    db.add(user)
+    food = Food(name="Food", unit="serving", calories=500)
+    db.add(food)
+    db.flush()
+
+    today = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+    for i in range(14):
+        day = today - timedelta(days=i)
+        db.add(NutritionLog(
+            user_id=user.id, food_id=food.id, date=day, meal_type="lunch", food_name="Food", quantity=1,
+            unit="serving", calories=500, total_calories=500
+        ))
+        workout = Workout(user_id=user.id, date=day, name="Workout", duration_minutes=45)
+        workout.exercises.append(Exercise(user_id=user.id, name="Squat", sets=3, reps=5, weight=100))
+        db.add(workout)
+        db.add(BodyStat(user_id=user.id, date=day, weight=80))
+    rebuild_daily_rollups(db)
+    rebuild_personal_records(db)
+    db.commit()
+
+    # Loading the search indexes reads the whole catalogs once; build them
+    # here so the checked searches only hit the per-request queries
+    ensure_exercise_catalog(db)
+    get_food_index(db)
+    get_exercise_catalog(db)
+    return user.id
+
+
+def request(path):
+    """Bare GET request for handlers that key the response cache on it"""
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": []})
+
+
+async def drain(chunks):
+    async for _ in chunks:
+        pass
+
+
+def hot_paths(db, user_id):
+    today = datetime.now().date()
+    week_ago = today - timedelta(days=6)
+
+    yield "aggregation.get_daily_range", lambda: db.run_sync(get_daily_range, user_id, week_ago, today)
+    yield "aggregation.get_week_summary", lambda: db.run_sync(get_week_summary, user_id, week_ago)
+    yield "rollups.refresh_daily_rollups", lambda: db.run_sync(refresh_daily_rollups, user_id, [today])
+    yield "analytics.daily", lambda: analytics.get_daily_analytics(
+        request("/api/analytics/daily"), date=today.isoformat(), user_id=user_id, db=db
+    )
+    yield "analytics.streak", lambda: analytics.get_consistency_streak(request("/api/analytics/streak"), user_id, db)
+    yield "analytics.progress", lambda: analytics.get_progress_metrics(request("/api/analytics/progress"), user_id, 30, db)
+    yield "analytics.trends", lambda: analytics.get_trend_analytics(request("/api/analytics/trends"), user_id, 90, None, 0.1, db)
+    yield "analytics.dashboard", lambda: analytics.get_dashboard_analytics(
+        request("/api/analytics/dashboard"), user_id, today.isoformat(), None, 30, db
+    )
+    yield "summary.recent", lambda: summary.get_recent_summary(request("/api/summary/recent/30"), 30, user_id, db)
+    yield "fitness.list", lambda: fitness.get_fitness_sessions(user_id, 0, 100, week_ago, today, db=db)
+    yield "fitness.page", lambda: fitness.get_fitness_sessions(
+        user_id, limit=5, cursor=encode_cursor(datetime.now() - timedelta(days=3), 10 ** 6), db=db
+    )
+    yield "fitness.recent", lambda: fitness.get_recent_fitness_sessions(user_id, 5, db=db)
+    yield "records.refresh_personal_records", lambda: db.run_sync(refresh_personal_records, user_id, [today])
+    yield "fitness.records", lambda: fitness.get_personal_records(user_id, db)
+    yield "fitness.exercise_search", lambda: fitness.search_exercise_catalog("squat", 10, None, user_id, db)
+    yield "fitness.progress", lambda: fitness.get_exercise_progress("Squat", user_id, None, None, 500, db)
+    yield "nutrition.list", lambda: nutrition.get_nutrition_logs(user_id, 0, 100, week_ago, today, None, db=db)
+    yield "nutrition.daily", lambda: nutrition.get_daily_nutrition(today, user_id, db)
+    yield "foods.recent_food_ids", lambda: db.run_sync(recent_food_ids, user_id)
+    yield "nutrition.food_search", lambda: nutrition.search_food_catalog("foo", 10, user_id, db)
+    yield "body.list", lambda: body_stats.get_body_stats(user_id, 0, 100, week_ago, today, db=db)
+    yield "body.latest", lambda: body_stats.get_latest_body_stat(user_id, db)
+    yield "body.weight_history", lambda: body_stats.get_weight_history(user_id, 30, db)
+    yield "sync.changes", lambda: db.run_sync(get_changes, user_id, 0, 500)
+    yield "logs.copy_day", lambda: db.run_sync(
+        copy_day, user_id, today - timedelta(days=1), today + timedelta(days=1), COPY_TABLES
+    )
+    for dataset, query in DATASETS.items():
+        yield f"export.{dataset}", lambda query=query: drain(stream_csv(db, query(user_id)))
+
+
+async def check_plans(url, user_id):
+    engine = create_async_db_engine(url)
+    plans = []
+
+    def explain(conn, cursor, statement, parameters, context, executemany):
+        # INSERT ... SELECT copies read their source rows like any query
+        head = statement.lstrip().upper()
+        if head.startswith("SELECT") or (head.startswith("INSERT") and " SELECT " in head):
+            cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+            plans.append((statement, [row[-1] for row in cursor.fetchall()]))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", explain)
+
+    failures = 0
+    async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+        for label, run in hot_paths(db, user_id):
+            plans.clear()
+            await run()
+            scans = [
+                (statement, detail)
+                for statement, details in plans
+                for detail in details
+                if detail.startswith("SCAN ") and " USING " not in detail
+            ]
+            status = "FAIL" if scans else "OK"
+            print(f"[{status}] {label} ({len(plans)} statements)")
+            for statement, detail in scans:
+                failures += 1
+                print(f"    {detail}: {' '.join(statement.split())[:160]}")
+
+    event.remove(engine.sync_engine, "before_cursor_execute", explain)
+    await engine.dispose()
+    return failures
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'plans.db')}"
+        engine = create_engine(url)
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        user_id = seed(db)
+        db.close()
+        engine.dispose()
+
+        failures = asyncio.run(check_plans(url, user_id))
+
+    if failures:
+        print(f"\n{failures} full table scan(s) found")
+        sys.exit(1)
+    print("\nNo full table scans on hot paths")
+
+
+if __name__ == "__main__":
+    main()
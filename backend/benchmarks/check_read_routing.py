@@ -0,0 +1,90 @@
+"""
+Read-replica routing check using two local SQLite files.
+
+Points LIFELOG_DATABASE_URL and LIFELOG_DATABASE_REPLICA_URL at a primary
+and a replica file, writes through the API and verifies that read-only
+routes only see the data once it has been copied to the replica, while
+writes and single-record reads stay on the primary.
+
+Usage (from the backend directory):
+    python -m benchmarks.check_read_routing
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime
+
+tmp = tempfile.mkdtemp()
+PRIMARY = os.path.join(tmp, "primary.db")
+REPLICA = os.path.join(tmp, "replica.db")
+os.environ["LIFELOG_DATABASE_URL"] = f"sqlite:///{PRIMARY}"
+os.environ["LIFELOG_DATABASE_REPLICA_URL"] = f"sqlite:///{REPLICA}"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.db import engine, replica_engine  # noqa: E402
+import main as app_main  # noqa: E402
+
+
+def replicate():
+    """Stand-in for replication: copy the primary file onto the replica"""
+    replica_engine.dispose()
+    source = sqlite3.connect(PRIMARY)
+    target = sqlite3.connect(REPLICA)
+    source.backup(target)
+    target.close()
+    source.close()
+
+
+def main():
+    failures = 0
+
+    def check(label, ok):
+        nonlocal failures
+        failures += not ok
+        print(f"[{'OK' if ok else 'FAIL'}] {label}")
+
+    with TestClient(app_main.app) as client:
+        replicate()
+        user = client.post("/api/users/register", json={
+            "email": "replica@example.com", "username": "replica", "password": "secret123"
+        }).json()
+        user_id = user["id"]
+        replicate()
+
+        created = client.post(f"/api/nutrition/?user_id={user_id}", json={
+            "date": datetime.now().isoformat(), "meal_type": "lunch", "food_name": "Rice",
+            "quantity": 1, "unit": "cup", "calories": 200
+        }).json()
+
+        check("write lands on the primary", "id" in created)
+        check(
+            "single-record read uses the primary",
+            client.get(f"/api/nutrition/{created['id']}", params={"user_id": user_id}).status_code == 200
+        )
+        check(
+            "listing reads the replica (not yet replicated)",
+            client.get("/api/nutrition/", params={"user_id": user_id}).json() == []
+        )
+
+        replicate()
+        check(
+            "listing reads the replica (after replication)",
+            len(client.get("/api/nutrition/", params={"user_id": user_id}).json()) == 1
+        )
+        check(
+            "analytics reads the replica",
+            client.get("/api/analytics/daily", params={"user_id": user_id, "date": datetime.now().date().isoformat()}).json()["total_calories"] == 200
+        )
+
+    engine.dispose()
+    replica_engine.dispose()
+
+    if failures:
+        sys.exit(1)
+    print("\nRead-only routes are served by the replica")
+
+
+if __name__ == "__main__":
+    main()
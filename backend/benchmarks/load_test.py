@@ -0,0 +1,304 @@
+"""
+Reproducible load test of the API with synthetic users.
+
+Generates --users users with --days days of meals, workouts (with
+exercises) and weigh-ins into a temporary SQLite database with bulk
+inserts, then rebuilds the rollups, streaks and personal records. The
+real FastAPI app is then driven in-process (httpx ASGI transport, no
+sockets) with --concurrency concurrent clients per scenario: sync, the
+analytics and summary range reads, the listings and login. Each request
+picks a user at random from a seeded generator, so two runs with the same
+arguments issue the same requests.
+
+For each scenario the results record throughput, p50/p99 latency, errors
+and SQL statements per request (from the Server-Timing header). They are
+written as JSON, by default to benchmarks/results/<git revision>.json.
+--compare prints the change against an earlier result file, e.g. one
+recorded on the previous commit. The response cache is replaced by a
+no-op backend unless --cache is given, so repeated reads measure the
+query path.
+
+Usage (from the backend directory):
+    python -m benchmarks.load_test [--users 200] [--days 365] [--requests 400]
+        [--concurrency 8] [--scenarios progress,login] [--output FILE] [--compare FILE]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("LIFELOG_DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'load.db')}")
+os.environ.setdefault("LIFELOG_SERVER_TIMING", "true")
+os.environ.setdefault("LIFELOG_LOG_LEVEL", "WARNING")
+
+import httpx  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+import main as app_main  # noqa: E402
+from app.db import Base, SessionLocal, engine  # noqa: E402
+from app.models import BodyStat, Exercise, NutritionLog, User, Workout  # noqa: E402
+from app.passwords import get_password_hash  # noqa: E402
+from app.records import rebuild_personal_records  # noqa: E402
+from app.response_cache import CacheBackend, set_cache_backend  # noqa: E402
+from app.rollups import rebuild_daily_rollups  # noqa: E402
+from benchmarks.bench_concurrency import BACKEND_DIR, percentile  # noqa: E402
+
+# The in-process client would otherwise log every request
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+PASSWORD = "secret123"
+MEALS = ("breakfast", "lunch", "dinner", "snack")
+LIFTS = ("Squat", "Bench Press", "Deadlift", "Overhead Press", "Row")
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+class NoCache(CacheBackend):
+    """Response cache backend that never stores anything"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def keys(self, prefix):
+        return []
+
+
+def generate(users, days, meals_per_day, seed, batch_users=50):
+    """Bulk-insert the synthetic history; returns [(user_id, email)] and row counts"""
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(seed)
+    hashed_password = get_password_hash(PASSWORD)
+    first_day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+    counts = {"users": users, "nutrition": 0, "workouts": 0, "exercises": 0, "body_stats": 0}
+    accounts = []
+    workout_id = 0
+
+    with SessionLocal() as db:
+        for batch_start in range(0, users, batch_users):
+            user_rows = [
+                {"email": f"user{index}@example.com", "username": f"user{index}", "hashed_password": hashed_password}
+                for index in range(batch_start, min(users, batch_start + batch_users))
+            ]
+            db.execute(insert(User), user_rows)
+            batch = db.query(User.id, User.email).filter(
+                User.email.in_([row["email"] for row in user_rows])
+            ).order_by(User.id).all()
+            accounts.extend((row.id, row.email) for row in batch)
+
+            nutrition, workouts, exercises, body_stats = [], [], [], []
+            for user_id, _ in batch:
+                weight = rng.uniform(60, 100)
+                for offset in range(days):
+                    day = first_day + timedelta(days=offset)
+                    for meal in range(meals_per_day):
+                        calories = rng.uniform(200, 900)
+                        nutrition.append({
+                            "user_id": user_id, "date": day + timedelta(hours=7 + meal * 4),
+                            "meal_type": MEALS[meal % len(MEALS)], "food_name": f"Food {rng.randrange(300)}",
+                            "quantity": 1.0, "unit": "serving", "calories": calories,
+                            "protein": calories / 20, "carbs": calories / 8, "fat": calories / 30,
+                            "total_calories": calories, "total_protein": calories / 20,
+                            "total_carbs": calories / 8, "total_fat": calories / 30
+                        })
+                    if rng.random() < 0.5:
+                        workout_id += 1
+                        workouts.append({
+                            "id": workout_id, "user_id": user_id, "date": day + timedelta(hours=18),
+                            "name": "Strength", "duration_minutes": rng.randrange(30, 90)
+                        })
+                        for order, lift in enumerate(rng.sample(LIFTS, 3)):
+                            exercises.append({
+                                "workout_id": workout_id, "user_id": user_id, "name": lift, "sets": 3,
+                                "reps": rng.randrange(3, 12), "weight": rng.uniform(40, 160), "order": order
+                            })
+                    if rng.random() < 0.6:
+                        weight += rng.gauss(0, 0.3)
+                        body_stats.append({"user_id": user_id, "date": day + timedelta(hours=6), "weight": weight})
+
+            for model, rows, key in (
+                (NutritionLog, nutrition, "nutrition"), (Workout, workouts, "workouts"),
+                (Exercise, exercises, "exercises"), (BodyStat, body_stats, "body_stats")
+            ):
+                if rows:
+                    db.execute(insert(model), rows)
+                counts[key] += len(rows)
+
+            # Derived tables per user keep the rebuild's memory bounded
+            for user_id, _ in batch:
+                rebuild_daily_rollups(db, user_id)
+                rebuild_personal_records(db, user_id)
+            db.commit()
+
+    return accounts, counts
+
+
+def scenarios():
+    """Scenario name -> function(rng, user_id, email, sequence) -> (method, path, json body)"""
+    today = datetime.now()
+
+    def sync(rng, user_id, email, sequence):
+        return "POST", "/api/sync/sync", {"user_id": user_id, "data": {"nutrition": [{
+            "local_id": f"load-{sequence}", "operation": "INSERT", "date": today.isoformat(),
+            "meal_type": "snack", "food_name": "Apple", "quantity": 1, "unit": "piece",
+            "calories": 95, "protein": 0.5, "carbs": 25, "fat": 0.3
+        }]}}
+
+    return {
+        "sync": sync,
+        "progress": lambda rng, user_id, email, sequence: (
+            "GET", f"/api/analytics/progress?user_id={user_id}&days=90", None),
+        "summary_recent": lambda rng, user_id, email, sequence: (
+            "GET", f"/api/summary/recent/30?user_id={user_id}", None),
+        "fitness_list": lambda rng, user_id, email, sequence: (
+            "GET", f"/api/fitness/?user_id={user_id}&limit=20", None),
+        "nutrition_list": lambda rng, user_id, email, sequence: (
+            "GET", f"/api/nutrition/?user_id={user_id}&limit=50", None),
+        "body_list": lambda rng, user_id, email, sequence: (
+            "GET", f"/api/body/?user_id={user_id}&limit=30", None),
+        "login": lambda rng, user_id, email, sequence: (
+            "POST", "/api/users/login", {"email": email, "password": PASSWORD}),
+    }
+
+
+async def run_scenario(client, build, accounts, requests, concurrency, seed):
+    rng = random.Random(seed)
+    plan = [(build(rng, *rng.choice(accounts), sequence), sequence) for sequence in range(requests)]
+    latencies, queries = [], []
+    errors = 0
+    position = 0
+
+    async def worker():
+        nonlocal errors, position
+        while position < len(plan):
+            (method, path, body), _ = plan[position]
+            position += 1
+            start = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+            match = SERVER_TIMING_QUERIES.search(response.headers.get("server-timing", ""))
+            if match:
+                queries.append(int(match.group(1)))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "queries_per_request": round(sum(queries) / len(queries), 2) if queries else None,
+        "max_queries": max(queries) if queries else None,
+    }
+
+
+async def run(accounts, names, requests, concurrency, seed):
+    builders = scenarios()
+    results = {}
+    async with app_main.lifespan(app_main.app):
+        transport = httpx.ASGITransport(app=app_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=300) as client:
+            for index, name in enumerate(names):
+                # bcrypt dominates logins, so fewer of them keep the run short
+                count = max(concurrency, requests // 10) if name == "login" else requests
+                results[name] = await run_scenario(
+                    client, builders[name], accounts, count, concurrency, seed + index
+                )
+                print(f"  {name:<15} {results[name]['throughput_rps']:>8.1f} req/s"
+                      f"  p50 {results[name]['p50_ms']:>8.2f} ms  p99 {results[name]['p99_ms']:>8.2f} ms"
+                      f"  queries {results[name]['queries_per_request']}  errors {results[name]['errors']}")
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(baseline, current):
+    print(f"\ncompared with {baseline['meta']['revision']} ({baseline['meta']['recorded_at']})")
+    for name, result in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if not before:
+            continue
+        changes = []
+        for metric in ("throughput_rps", "p50_ms", "p99_ms", "queries_per_request"):
+            if before.get(metric) and result.get(metric) is not None:
+                changes.append(f"{metric} {(result[metric] - before[metric]) / before[metric] * 100:+6.1f}%")
+        print(f"  {name:<15} " + "  ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--meals-per-day", type=int, default=3)
+    parser.add_argument("--requests", type=int, default=400, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--scenarios", default=",".join(scenarios()))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cache", action="store_true", help="keep the response cache enabled")
+    parser.add_argument("--output", help="result file (default benchmarks/results/<revision>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(names) - set(scenarios())
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    if not args.cache:
+        set_cache_backend(NoCache())
+
+    start = time.perf_counter()
+    accounts, counts = generate(args.users, args.days, args.meals_per_day, args.seed)
+    print(f"generated {counts} in {time.perf_counter() - start:.1f}s")
+
+    revision = git_revision()
+    result = {
+        "meta": {
+            "revision": revision,
+            "recorded_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+            "rows": counts,
+        },
+        "scenarios": asyncio.run(run(accounts, names, args.requests, args.concurrency, args.seed)),
+    }
+
+    output = args.output or os.path.join(BACKEND_DIR, "benchmarks", "results", f"{revision}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as handle:
+        json.dump(result, handle, indent=2)
+    print(f"results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as handle:
+            compare(json.load(handle), result)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
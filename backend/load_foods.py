@@ -0,0 +1,47 @@
+"""
+Bulk-load the food catalog from a local CSV file.
+The header must name the columns name, brand, category, unit, calories,
+protein, carbs, fat, fiber, sugar and sodium, with nutrient values per
+unit; only name, unit and calories are required on each row. Foods already
+in the catalog (same name, brand and unit) are skipped, so the same file
+can be loaded again after it grows. Run add_food_catalog.py first on
+existing databases.
+
+Usage: python load_foods.py foods.csv
+"""
+import csv
+import sys
+
+from sqlalchemy import func
+
+from app.db import SessionLocal
+from app.foods import import_foods, parse_food_row
+from app.models import Food
+
+if len(sys.argv) != 2:
+    print(__doc__)
+    sys.exit(1)
+
+skipped = 0
+
+def rows(path):
+    global skipped
+    with open(path, newline="", encoding="utf-8") as csv_file:
+        for line_number, row in enumerate(csv.DictReader(csv_file), start=2):
+            try:
+                yield parse_food_row(row)
+            except ValueError as e:
+                skipped += 1
+                print(f"[SKIP] line {line_number}: {e}")
+
+db = SessionLocal()
+try:
+    before = db.query(func.count(Food.id)).scalar()
+    import_foods(db, rows(sys.argv[1]))
+    db.commit()
+    added = db.query(func.count(Food.id)).scalar() - before
+    print(f"[OK] Added {added} foods ({skipped} invalid rows skipped)")
+finally:
+    db.close()
+
+print("\n[DONE] Food catalog loaded!")
@@ -1,17 +1,32 @@
+import logging
+import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
-from app.db import engine, Base
-from app.routes import users, fitness, nutrition, body_stats, summary, sync, analytics
+from app.db import engine, async_engine, async_replica_engine, Base, SessionLocal
+from app.exercise_catalog import ensure_exercise_catalog
+from app.metrics import MetricsMiddleware, render_metrics
+from app.passwords import hashing_queue_depth, shutdown_hashing_pool
+from app.routes import users, fitness, nutrition, body_stats, summary, sync, analytics, export, logs
+
+logging.basicConfig(
+    level=os.getenv("LIFELOG_LOG_LEVEL", "INFO"),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
 
 # Create database tables
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        ensure_exercise_catalog(db)
     yield
-    # Shutdown
-    pass
+    # Shutdown: close pooled async connections (aiosqlite runs a thread per connection)
+    await async_engine.dispose()
+    await async_replica_engine.dispose()
+    shutdown_hashing_pool()
 
 app = FastAPI(
     title="Lifelog API",
@@ -27,8 +42,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Content-Disposition"],
 )
 
+# Per-route latency and SQL usage for /metrics; outermost, so it times the whole stack
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(fitness.router, prefix="/api/fitness", tags=["fitness"])
@@ -37,6 +56,8 @@ app.include_router(body_stats.router, prefix="/api/body", tags=["body-stats"])
 app.include_router(summary.router, prefix="/api/summary", tags=["summary"])
 app.include_router(sync.router, prefix="/api/sync", tags=["sync"])
 app.include_router(analytics.router, prefix="/api/analytics", tags=["analytics"])
+app.include_router(export.router, prefix="/api/export", tags=["export"])
+app.include_router(logs.router, prefix="/api/logs", tags=["logs"])
 
 @app.get("/")
 async def root():
@@ -44,4 +65,14 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {"status": "healthy", "password_hash_queue": hashing_queue_depth()}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(
+        render_metrics({
+            "lifelog_password_hash_queue": ("Password hashes queued or running", hashing_queue_depth()),
+        }),
+        media_type="text/plain; version=0.0.4"
+    )
@@ -0,0 +1,30 @@
+"""
+Backfill script for the daily_rollups and user_streaks tables.
+Creates the tables if they are missing and rebuilds every user's rollups and
+streaks from the raw workout, nutrition and body stat logs. Safe to run more
+than once.
+
+Usage: python rebuild_daily_rollups.py [user_id]
+"""
+import sys
+
+from app.db import engine, SessionLocal
+from app.models import DailyRollup, UserStreak
+from app.rollups import rebuild_daily_rollups
+
+user_id = int(sys.argv[1]) if len(sys.argv) > 1 else None
+
+DailyRollup.__table__.create(bind=engine, checkfirst=True)
+UserStreak.__table__.create(bind=engine, checkfirst=True)
+print("[OK] daily_rollups and user_streaks tables ready")
+
+db = SessionLocal()
+try:
+    row_count = rebuild_daily_rollups(db, user_id)
+    db.commit()
+    scope = f"user {user_id}" if user_id is not None else "all users"
+    print(f"[OK] Rebuilt {row_count} rollup rows for {scope}")
+finally:
+    db.close()
+
+print("\n[DONE] Rollup rebuild complete!")
@@ -127,6 +127,19 @@ class ApiService {
     return response.data;
   }
 
+  // Exercise library typeahead; the user's most logged exercises come first
+  async searchExercises(userId: number, query: string, limit: number = 10, category?: string) {
+    let url = `/fitness/exercises/search?user_id=${userId}&q=${encodeURIComponent(query)}&limit=${limit}`;
+    if (category) url += `&category=${category}`;
+    const response = await api.get(url);
+    return response.data;
+  }
+
+  async getCatalogExercise(userId: number, slug: string) {
+    const response = await api.get(`/fitness/exercises/${slug}?user_id=${userId}`);
+    return response.data;
+  }
+
   // Nutrition endpoints
   async createNutritionLog(nutritionData: any) {
     // Extract and map fields to match backend schema
@@ -175,6 +188,14 @@ class ApiService {
     return response.data;
   }
 
+  // Food catalog typeahead; the user's recent foods come first
+  async searchFoods(userId: number, query: string, limit: number = 10) {
+    const response = await api.get(
+      `/nutrition/foods/search?user_id=${userId}&q=${encodeURIComponent(query)}&limit=${limit}`
+    );
+    return response.data;
+  }
+
   // Body stats endpoints
   async createBodyStat(bodyStatData: any) {
     const { user_id, ...data } = bodyStatData;
@@ -218,6 +239,80 @@ class ApiService {
     return response.data;
   }
 
+  // Rolling averages, weight trend and adaptive TDEE
+  async getTrends(userId: number, days: number = 90) {
+    const response = await api.get(`/analytics/trends?user_id=${userId}&days=${days}`);
+    return response.data;
+  }
+
+  // Daily, weekly, streak and progress analytics in one request
+  async getDashboard(userId: number, date: string, days: number = 30) {
+    const response = await api.get(`/analytics/dashboard?user_id=${userId}&date=${date}&days=${days}`);
+    return response.data;
+  }
+
+  // Copy a day's logs to another date in one request; the new rows are
+  // listed in the sync change feed
+  async copyDay(
+    userId: number,
+    sourceDate: string,
+    targetDate: string,
+    tables: string[] = ['workouts', 'nutrition'],
+    mealTypes?: string[]
+  ) {
+    const response = await api.post(`/logs/copy-day?user_id=${userId}`, {
+      source_date: sourceDate,
+      target_date: targetDate,
+      tables,
+      ...(mealTypes && { meal_types: mealTypes }),
+    });
+    return response.data;
+  }
+
+  // Saved meal and routine templates
+  async getMealTemplates(userId: number) {
+    const response = await api.get(`/logs/templates/meals?user_id=${userId}`);
+    return response.data;
+  }
+
+  async createMealTemplate(userId: number, templateData: any) {
+    const response = await api.post(`/logs/templates/meals?user_id=${userId}`, templateData);
+    return response.data;
+  }
+
+  async applyMealTemplate(userId: number, templateId: number, date: string, mealType?: string) {
+    const response = await api.post(`/logs/templates/meals/${templateId}/apply?user_id=${userId}`, {
+      date,
+      ...(mealType && { meal_type: mealType }),
+    });
+    return response.data;
+  }
+
+  async deleteMealTemplate(userId: number, templateId: number) {
+    const response = await api.delete(`/logs/templates/meals/${templateId}?user_id=${userId}`);
+    return response.data;
+  }
+
+  async getRoutineTemplates(userId: number) {
+    const response = await api.get(`/logs/templates/routines?user_id=${userId}`);
+    return response.data;
+  }
+
+  async createRoutineTemplate(userId: number, templateData: any) {
+    const response = await api.post(`/logs/templates/routines?user_id=${userId}`, templateData);
+    return response.data;
+  }
+
+  async applyRoutineTemplate(userId: number, templateId: number, date: string) {
+    const response = await api.post(`/logs/templates/routines/${templateId}/apply?user_id=${userId}`, { date });
+    return response.data;
+  }
+
+  async deleteRoutineTemplate(userId: number, templateId: number) {
+    const response = await api.delete(`/logs/templates/routines/${templateId}?user_id=${userId}`);
+    return response.data;
+  }
+
   // Sync endpoints
   async syncData(syncData: any) {
     const response = await api.post('/sync', syncData);